@@ -24,3 +24,14 @@ async def global_exception_handler(request: Request, exc: Exception):
         status_code=500,
         content={"detail": "Internal server error", "request_id": request_id},
     )
+
+
+async def circuit_open_handler(request: Request, exc: Exception):
+    """A dependency behind an open circuit breaker: fail fast with 503."""
+    retry_after = max(1, int(round(getattr(exc, "retry_after", 30))))
+    logger.warning(f"Circuit open | {request.method} {request.url.path} | {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Calendar service is temporarily unavailable. Please try again shortly."},
+        headers={"Retry-After": str(retry_after)},
+    )
@@ -21,13 +21,14 @@ setup_logger()
 logger = logging.getLogger("app")
 
 from middleware import log_requests_middleware
-from exceptions import global_exception_handler
+from exceptions import global_exception_handler, circuit_open_handler
 
 GENERATED_PDFS_DIR = os.path.join(os.path.dirname(__file__), "generated_pdfs")
 os.makedirs(GENERATED_PDFS_DIR, exist_ok=True)
 
 
 from starlette.middleware.cors import CORSMiddleware
+import httpx
 from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic import BaseModel, Field, ConfigDict, EmailStr, field_validator, model_validator
 from typing import List, Optional
@@ -43,14 +44,9 @@ DEFAULT_TZ = 'Europe/Rome'
 BUSINESS_TZ_STR = os.environ.get('BUSINESS_TZ', DEFAULT_TZ)
 BUSINESS_TZ = ZoneInfo(BUSINESS_TZ_STR)
 
-def get_business_offset():
-    """Helper to get current offset string for BUSINESS_TZ (e.g. +05:30)"""
-    now = datetime.now(BUSINESS_TZ)
-    offset = now.strftime('%z')
-    # Convert +0530 to +05:30
-    if len(offset) == 5:
-        return f"{offset[:3]}:{offset[3:]}"
-    return offset
+# Per-date offsets and day boundaries (correct across DST switches)
+from services.business_time import BusinessTime, utc_to_local, get_zone, UTC_FORMAT
+business_time = BusinessTime(BUSINESS_TZ_STR)
 from services.payment_service import payment_service
 from services.email_service import send_password_reset_otp, send_booking_confirmation_to_client, send_booking_notification_to_tejashvini
 from services import zoom_service
@@ -62,7 +58,19 @@ import re
 from fastapi.responses import FileResponse
 from services.pdf_service import generate_invoice_pdf_v2, generate_booking_details_pdf_v2
 from services.template_selector import get_template_for_service
-from services.calendar_service import calendar_service
+from services.calendar_service import calendar_service, async_calendar_service, parse_event_time
+from services.calendar_sync import CalendarMirror, is_opaque_window
+from services.slot_engine import free_slots, overlapping, subtract_intervals
+from services.slot_inventory import SlotInventory, INVENTORY_DURATIONS, INVENTORY_TYPES
+from services.slot_holds import SlotHolds
+from services.payment_events import PaymentEvents
+from services.post_payment import PostPayment
+from services.circuit_breaker import CircuitOpenError
+from services.single_flight import SingleFlight
+from services.http_cache import ResourceVersions, conditional, content_etag, CATALOG_CACHE_CONTROL
+from services.availability_import import parse_csv as parse_availability_csv, parse_ics as parse_availability_ics, expand_weekly_template, make_window, WEEKDAYS
+from services.availability_rules import AvailabilityRules, build_rrule
+from services.pricing import PricingSnapshot, PRICING_WATCH_CHANGES
 
 # Email Regex
 EMAIL_REGEX = r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$'
@@ -85,45 +93,30 @@ if not MONGO_URL:
 client = AsyncIOMotorClient(MONGO_URL)
 db = client[DB_NAME]
 
+# Local mirror of Google Calendar; only its sync worker reads from Google
+calendar_mirror = CalendarMirror(db, async_calendar_service, tz_name=BUSINESS_TZ_STR)
+
+
+# Coalesces identical concurrent calendar-backed reads (slots, availability)
+read_flight = SingleFlight('calendar_reads')
+
+# Change counters behind ETags: "day:<date>" for calendar days, collection names for catalog data
+resource_versions = ResourceVersions()
+calendar_mirror.add_listener(resource_versions.bump_days)
+
+# Recurring windows (RRULE series) expanded locally; no calendar events behind them
+availability_rules = AvailabilityRules(db)
+availability_rules.add_listener(lambda: resource_versions.bump("availability_rules"))
+
+
+def mark_stale(response: Response):
+    """Flags a response served from the last good calendar snapshot."""
+    response.headers["X-Data-Stale"] = "true"
+    response.headers["Warning"] = '110 - "Response is Stale"'
+
 # Initialize Rate Limiter
 limiter = Limiter(key_func=get_remote_address)
 
-# Background Task for Cleanup
-async def cleanup_stale_bookings():
-    """Delete pending bookings older than 2 hours periodically"""
-    while True:
-        try:
-            two_hours_ago = datetime.now(timezone.utc) - timedelta(hours=2)
-            # Find and delete pending bookings where created_at is older than 2 hours
-            # and they have no transaction_id
-            query = {
-                "status": "pending",
-                "payment_status": "pending",
-                "transaction_id": None,
-                "created_at": {"$lt": two_hours_ago}
-            }
-            count = await db.bookings.count_documents(query)
-            if count > 0:
-                logger.info(f"Cleanup: Found {count} stale pending bookings. Cleaning slots...")
-                # Note: If GCal events were created (legacy flow), we clean them up to free slots.
-                # We do NOT delete the booking record as it is needed for reminders/analytics.
-                cursor = db.bookings.find(query)
-                async for b in cursor:
-                    if b.get('gcal_event_id'):
-                        try:
-                            # Pass to thread since it's a synchronous blocking call
-                            await asyncio.to_thread(calendar_service.delete_event, b['gcal_event_id'])
-                            # Mark as slot_released so we don't try again
-                            await db.bookings.update_one({"_id": b["_id"]}, {"$set": {"gcal_event_id": None, "slot_released": True}})
-                        except Exception as ge:
-                            logger.error(f"Cleanup GCal Error for {b.get('booking_id')}: {ge}")
-                
-                logger.info(f"Cleanup: Successfully freed slots for {count} stale bookings. Records preserved for analytics.")
-        except Exception as e:
-            logger.error(f"Cleanup Error: {e}")
-        
-        await asyncio.sleep(3600) # Run hourly
-
 # Ensure unique index for slots to prevent duplicates at DB level
 from contextlib import asynccontextmanager
 
@@ -133,6 +126,22 @@ async def lifespan(app: FastAPI):
         logger.info("Application starting up...")
         await db.slots.create_index([("date", 1), ("time", 1)], unique=True)
         logger.info("Ensured unique index on slots (date, time)")
+        await calendar_mirror.ensure_indexes()
+        logger.info("Ensured calendar mirror indexes")
+        await slot_inventory.ensure_indexes()
+        logger.info("Ensured slot inventory index on (date, type, duration)")
+        await slot_holds.ensure_indexes()
+        logger.info("Ensured slot hold indexes (booking id, TTL on expires_at)")
+        await availability_rules.ensure_indexes()
+        logger.info("Loaded recurring availability rules")
+        await db.bookings.create_index("gcal_event_id")
+        await db.bookings.create_index([("preferred_date", 1), ("status", 1)])
+        await db.bookings.create_index("payment_id")
+        logger.info("Ensured booking indexes on gcal_event_id, (preferred_date, status) and payment_id")
+        await payment_events.ensure_indexes()
+        logger.info("Ensured payment event indexes (unique event_id)")
+        await post_payment.ensure_indexes()
+        logger.info("Ensured post-payment index on bookings")
         
         # Seed Service Prices if empty
         if await db.services.count_documents({}) == 0:
@@ -154,17 +163,29 @@ async def lifespan(app: FastAPI):
                     "category": cat,
                     "created_at": datetime.now(timezone.utc).isoformat()
                 })
+            pricing_snapshot.invalidate()
             logger.info("Service Prices seeded.")
             
     except Exception as e:
         logger.error(f"Error creating index or seeding: {e}", exc_info=True)
 
-    # Start cleanup task
-    cleanup_task = asyncio.create_task(cleanup_stale_bookings())
+    # Start calendar warm-up and sync tasks (unpaid slot holds expire via their TTL index).
+    # Nothing calendar-related blocks startup; credentials load on first use.
+    calendar_warmup_task = asyncio.create_task(async_calendar_service.warm_up())
+    calendar_sync_task = asyncio.create_task(calendar_mirror.run())
+    pricing_watch_task = asyncio.create_task(pricing_snapshot.watch()) if PRICING_WATCH_CHANGES else None
+    # Retries failed webhook events and unfinished post-payment steps (PayPal never redelivers after a 2xx)
+    payment_retry_task = asyncio.create_task(post_payment.run())
     
     yield
     # Cleanup background tasks on shutdown
-    cleanup_task.cancel()
+    calendar_warmup_task.cancel()
+    calendar_sync_task.cancel()
+    payment_retry_task.cancel()
+    if pricing_watch_task:
+        pricing_watch_task.cancel()
+    await async_calendar_service.aclose()
+    await payment_service.aclose()
     logger.info("Application shutting down...")
 
 # Create the main app without a prefix
@@ -177,6 +198,7 @@ app.middleware("http")(log_requests_middleware)
 
 # Register global exception handler
 app.add_exception_handler(Exception, global_exception_handler)
+app.add_exception_handler(CircuitOpenError, circuit_open_handler)
 
 # Add CORS middleware
 frontend_url = os.environ.get('FRONTEND_URL', '')
@@ -194,6 +216,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Data-Stale", "Retry-After"],
 )
 
 @app.get("/")
@@ -282,6 +305,7 @@ class Booking(BaseModel):
     is_emergency: bool = False
     payment_status: str = "pending"
     transaction_id: Optional[str] = None
+    payment_id: Optional[str] = None  # PayPal payment created at checkout
     amount: Optional[float] = None
     currency: Optional[str] = None
     status: str = "pending"  # 'pending', 'confirmed', 'canceled'
@@ -337,6 +361,9 @@ class Slot(BaseModel):
     is_booked: bool = False
     booked_by: Optional[str] = None  # booking_id
     duration: Optional[int] = 20  # Duration in minutes
+    # Set when date/time were rendered in a client timezone (?tz=); booking uses these
+    business_date: Optional[str] = None
+    business_time: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class SlotCreate(BaseModel):
@@ -627,6 +654,17 @@ PRICING_MAP = {
     'aura': {'amount': 15.00, 'currency': 'EUR', 'name': 'Aura Scanning'}
 }
 
+# Services, promotions, campaigns, offers and taxes in memory; pricing writes invalidate it
+pricing_snapshot = PricingSnapshot(db)
+
+
+async def deactivate_expired_campaigns(pricing):
+    """Marks campaigns past their expiry inactive (as the campaign readers always have)."""
+    expired = pricing.discounts.expired_automatic()
+    if expired:
+        await db.campaigns.update_many({"id": {"$in": [rule.id for rule in expired]}}, {"$set": {"is_active": False}})
+        pricing_snapshot.invalidate()
+
 # --- Offer Management System ---
 
 class Offer(BaseModel):
@@ -656,37 +694,22 @@ class OfferValidate(BaseModel):
 
 # Helper: Get current ACTIVE WEBSITE offer (using GlobalCampaign)
 async def get_current_offer() -> dict:
-    # 1. Look for active campaigns within date range
-    now = datetime.now(timezone.utc)
-    
-    # Sort by discount_percentage descending to give best offer if multiple exist
-    cursor = db.campaigns.find({
-        "is_active": True
-    }).sort("discount_percentage", -1).limit(1)
-    
-    campaigns = await cursor.to_list(length=1)
-    
-    if campaigns:
-        campaign = campaigns[0]
-        
-        # Check expiry
-        expiry = campaign.get('expiry_date')
-        if isinstance(expiry, str):
-            expiry = datetime.fromisoformat(expiry.replace("Z", "+00:00"))
-        
-        if isinstance(expiry, datetime) and expiry.replace(tzinfo=timezone.utc) > now:
-            # Return strict format expected by frontend Offer components
-            return {
-                "is_active": True,
-                "text": "Special Campaign", # Default text if no code is present
-                "offer_text": campaign.get("message", "Special Campaign"), 
-                "discount_percent": campaign.get("discount_percentage", 0),
-                "code": "CAMPAIGN", # Dummy code
-                "type": "website"
-            }
-        else:
-             # Deactivate expired campaign automatically
-             await db.campaigns.update_one({"id": campaign['id']}, {"$set": {"is_active": False}})
+    pricing = await pricing_snapshot.get()
+    await deactivate_expired_campaigns(pricing)
+
+    # Best automatic discount in effect (same precedence as checkout)
+    rule = pricing.discounts.automatic_rule()
+    if rule:
+        campaign = rule.doc
+        # Return strict format expected by frontend Offer components
+        return {
+            "is_active": True,
+            "text": "Special Campaign", # Default text if no code is present
+            "offer_text": campaign.get("message", "Special Campaign"), 
+            "discount_percent": campaign.get("discount_percentage", 0),
+            "code": "CAMPAIGN", # Dummy code
+            "type": "website"
+        }
 
     # Default Inactive
     return {"is_active": False, "text": "", "discount_percent": 0.0}
@@ -728,6 +751,7 @@ async def create_offer(offer_data: OfferCreate, admin=Depends(get_current_admin)
     )
     
     await db.offers.insert_one(new_offer.model_dump())
+    pricing_snapshot.invalidate()
     return new_offer
 
 # Admin: Delete Offer
@@ -736,6 +760,7 @@ async def delete_offer(offer_id: str, admin=Depends(get_current_admin)):
     result = await db.offers.delete_one({"id": offer_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Offer not found")
+    pricing_snapshot.invalidate()
     return {"success": True}
 
 # Admin: Toggle Offer
@@ -747,6 +772,7 @@ async def toggle_offer(offer_id: str, admin=Depends(get_current_admin)):
     
     new_status = not offer.get("is_active", False)
     await db.offers.update_one({"id": offer_id}, {"$set": {"is_active": new_status}})
+    pricing_snapshot.invalidate()
     return {"success": True, "is_active": new_status}
 
 # Public: Validate Promo Code
@@ -755,23 +781,21 @@ async def validate_promo_code_endpoint(data: OfferValidate):
     now = datetime.now(timezone.utc)
     
     # Case insensitive search might be better, but strict for now
-    offer = await db.offers.find_one({
-        "code": data.code,
-        "is_active": True,
-        "start_date": {"$lte": now},
-        "end_date": {"$gte": now}
-    })
+    # Any code source (promotion or offer), resolved by the shared discount rules
+    rule = (await pricing_snapshot.get()).discounts.code_rule(data.code, now)
     
-    if not offer:
+    if not rule:
         # Check if it exists but expired? No, simply Invalid for user.
         return {"valid": False, "message": "Invalid or expired code"}
     
     return {
         "valid": True,
-        "discount_percent": offer["discount_percent"],
-        "text": offer["text"],
-        "code": offer["code"],
-        "type": offer["type"]
+        "discount_percent": rule.value if rule.discount_type == "percentage" else 0.0,
+        "discount_type": rule.discount_type,
+        "discount_value": rule.value,
+        "text": rule.text,
+        "code": rule.doc["code"],
+        "type": rule.offer_type
     }
 
 # --- Availability Models & Routes ---
@@ -782,6 +806,7 @@ class Availability(BaseModel):
     start_time: str  # HH:MM
     end_time: str  # HH:MM
     type: str = "regular"  # 'regular' or 'emergency'
+    recurring_rule_id: Optional[str] = None  # set for occurrences of a recurring rule
 
 class AvailabilityCreate(BaseModel):
     date: str
@@ -789,8 +814,26 @@ class AvailabilityCreate(BaseModel):
     end_time: str
     type: str = "regular"
 
+def window_summary(window_type):
+    return "EMERGENCY_TIMING" if (window_type or "").lower() == 'emergency' else "REGULAR_TIMING"
+
+
+def recurring_window_spans(date):
+    """[(start_dt, end_dt, summary)] for recurring-rule windows on one business day."""
+    spans = []
+    for start_time, end_time, window_type, _ in availability_rules.windows_for(date):
+        spans.append((
+            datetime.fromisoformat(f"{date}T{start_time}:00").replace(tzinfo=BUSINESS_TZ),
+            datetime.fromisoformat(f"{date}T{end_time}:00").replace(tzinfo=BUSINESS_TZ),
+            f"{window_summary(window_type)} (recurring)"
+        ))
+    return spans
+
+
 @api_router.post("/availability")
 async def set_availability(avail: Availability):
+    # Fail fast instead of waiting on Google while its circuit is open
+    calendar_mirror.ensure_writable()
     try:
         # Use Business Timezone for formatting/logic
         target_tz = BUSINESS_TZ
@@ -808,7 +851,7 @@ async def set_availability(avail: Availability):
         search_start = req_start_dt.replace(hour=0, minute=0).isoformat()
         search_end = req_end_dt.replace(hour=23, minute=59).isoformat()
         
-        existing_events = calendar_service.list_events(search_start, search_end)
+        existing_events = await calendar_mirror.list_events(search_start, search_end)
         
         overlaps = []
         existing_intervals = []
@@ -831,29 +874,16 @@ async def set_availability(avail: Availability):
                     overlaps.append(f"{summary}: {estart.astimezone(target_tz).strftime('%H:%M')} - {eend.astimezone(target_tz).strftime('%H:%M')}")
                     existing_intervals.append((estart.timestamp(), eend.timestamp()))
 
+        for r_start, r_end, r_summary in recurring_window_spans(avail.date):
+            if req_start_dt < r_end and req_end_dt > r_start:
+                overlaps.append(f"{r_summary}: {r_start.strftime('%H:%M')} - {r_end.strftime('%H:%M')}")
+                existing_intervals.append((r_start.timestamp(), r_end.timestamp()))
+
         if overlaps:
             # Calculate Non-Overlapping Segments
-            req_s_ts = req_start_dt.timestamp()
-            req_e_ts = req_end_dt.timestamp()
-            
-            existing_intervals.sort()
-            
-            current = req_s_ts
-            proposed_segments = []
-            
-            for ex_s, ex_e in existing_intervals:
-                if ex_e <= current: continue
-                if ex_s >= req_e_ts: break
-                
-                if ex_s > current:
-                    proposed_segments.append((current, ex_s))
-                
-                current = max(current, ex_e)
-                
-                if current >= req_e_ts: break
-                
-            if current < req_e_ts:
-                proposed_segments.append((current, req_e_ts))
+            proposed_segments = subtract_intervals(
+                (req_start_dt.timestamp(), req_end_dt.timestamp()), existing_intervals
+            )
             
             proposed_list = []
             for s_ts, e_ts in proposed_segments:
@@ -879,7 +909,7 @@ async def set_availability(avail: Availability):
         if avail.type.lower() == 'emergency':
             summary = "EMERGENCY_TIMING"
         
-        event = calendar_service.create_event(
+        event = await calendar_mirror.create_event(
             summary,
             req_start_dt.isoformat(),
             req_end_dt.isoformat(),
@@ -887,28 +917,183 @@ async def set_availability(avail: Availability):
         )
         
         if event:
+            slot_inventory.schedule({avail.date})
             return {"status": "success", "event_id": event['id']}
         else:
              raise HTTPException(status_code=500, detail="Failed to create event in Google Calendar")
 
-    except HTTPException as he:
+    except (HTTPException, CircuitOpenError) as he:
         raise he
     except Exception as e:
         logger.error(f"Error setting availability: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/availability", response_model=List[Availability])
-async def get_availability(date: Optional[str] = None):
-    # This endpoint is strictly "What windows are set?".
-    # We fetch GCal events with the keywords.
-    if not date: 
-        return []
-        
-    current_offset = get_business_offset()
-    day_start_iso = f"{date}T00:00:00{current_offset}"
-    day_end_iso = f"{date}T23:59:59{current_offset}"
+class AvailabilityBulkCreate(BaseModel):
+    windows: List[AvailabilityCreate]
+
+class AvailabilityTemplateEntry(BaseModel):
+    weekday: str  # mon..sun or 0-6 (Monday = 0)
+    start_time: str
+    end_time: str
+    type: str = "regular"
+
+class AvailabilityTemplate(BaseModel):
+    start_date: str
+    end_date: str
+    weekly: List[AvailabilityTemplateEntry]
+
+# Largest number of windows accepted by one bulk request
+MAX_BULK_WINDOWS = 500
+
+
+async def create_availability_windows(windows, rejected=None):
+    """
+    Validates window dicts ({date, start_time, end_time, type}) against one
+    range fetch and creates the accepted ones with batched calendar writes.
+    Overlapping windows are rejected with the same `overlaps` /
+    `proposed_segments` detail as POST /availability.
+    """
+    target_tz = BUSINESS_TZ
+    accepted, rejected = [], list(rejected or [])
+    if len(windows) > MAX_BULK_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_WINDOWS} windows per request.")
+
+    candidates = []
+    for w in windows:
+        try:
+            w_start = datetime.fromisoformat(f"{w['date']}T{w['start_time']}:00").replace(tzinfo=target_tz)
+            w_end = datetime.fromisoformat(f"{w['date']}T{w['end_time']}:00").replace(tzinfo=target_tz)
+        except ValueError:
+            rejected.append({**w, "reason": "Invalid date or time format"})
+            continue
+        if w_end <= w_start:
+            rejected.append({**w, "reason": "End time must be after start time"})
+            continue
+        candidates.append((w, w_start, w_end))
+
+    if not candidates:
+        return {"accepted": accepted, "rejected": rejected}
+
+    def label(summary, s_ts, e_ts):
+        return f"{summary}: {datetime.fromtimestamp(s_ts, target_tz).strftime('%H:%M')} - {datetime.fromtimestamp(e_ts, target_tz).strftime('%H:%M')}"
+
+    # One calendar fetch covering every requested day
+    range_start = min(c[1] for c in candidates).replace(hour=0, minute=0)
+    range_end = max(c[2] for c in candidates).replace(hour=23, minute=59)
+    existing_events = await calendar_mirror.list_events(range_start.isoformat(), range_end.isoformat())
+    taken = []  # (start_ts, end_ts, summary)
+    for e in existing_events:
+        summary = e.get('summary', '')
+        if "REGULAR_TIMING" in summary or "EMERGENCY_TIMING" in summary:
+            s_raw = e['start'].get('dateTime')
+            e_raw = e['end'].get('dateTime')
+            if not s_raw or not e_raw: continue
+            taken.append((parse_event_time(s_raw).timestamp(), parse_event_time(e_raw).timestamp(), summary))
+    for date in sorted({w['date'] for w, _, _ in candidates}):
+        taken.extend((r_start.timestamp(), r_end.timestamp(), r_summary) for r_start, r_end, r_summary in recurring_window_spans(date))
+
+    to_create = []
+    for w, w_start, w_end in candidates:
+        span = (w_start.timestamp(), w_end.timestamp())
+        hits = overlapping(span, taken)
+        if hits:
+            proposed = [
+                {"start_time": datetime.fromtimestamp(s_ts, target_tz).strftime("%H:%M"),
+                 "end_time": datetime.fromtimestamp(e_ts, target_tz).strftime("%H:%M")}
+                for s_ts, e_ts in subtract_intervals(span, [(h[0], h[1]) for h in hits])
+            ]
+            rejected.append({
+                **w,
+                "reason": "Overlaps an existing availability window",
+                "overlaps": [label(h[2], h[0], h[1]) for h in hits],
+                "proposed_segments": proposed
+            })
+            continue
+        summary = "EMERGENCY_TIMING" if w['type'].lower() == 'emergency' else "REGULAR_TIMING"
+        # Later windows in the same request must not overlap accepted ones either
+        taken.append((span[0], span[1], summary))
+        to_create.append((w, {
+            "summary": summary,
+            "start_iso": w_start.isoformat(),
+            "end_iso": w_end.isoformat(),
+            "description": "Antigravity System Availability Block"
+        }))
+
+    events = await calendar_mirror.create_events([spec for _, spec in to_create]) if to_create else []
+    for (w, _), event in zip(to_create, events):
+        if event:
+            accepted.append({**w, "event_id": event['id']})
+        else:
+            rejected.append({**w, "reason": "Failed to create event in Google Calendar"})
+    slot_inventory.schedule({w["date"] for w in accepted})
+    return {"accepted": accepted, "rejected": rejected}
+
+
+@api_router.post("/availability/bulk")
+async def set_availability_bulk(data: AvailabilityBulkCreate):
+    """Create many availability windows with one range fetch and batched calendar writes."""
+    if not data.windows:
+        return {"accepted": [], "rejected": []}
+    calendar_mirror.ensure_writable()
+    return await create_availability_windows([w.model_dump() for w in data.windows])
+
+
+@api_router.post("/availability/import")
+async def import_availability(request: Request, format: Optional[str] = None):
+    """
+    Bulk availability from a CSV (date,start_time,end_time[,type]) or ICS
+    file sent as the raw request body. The format comes from `format`
+    (csv|ics) or the Content-Type (text/csv, text/calendar).
+    """
+    content_type = request.headers.get("content-type", "")
+    fmt = (format or ("ics" if "calendar" in content_type else "csv" if "csv" in content_type else "")).lower()
+    if fmt not in ("csv", "ics"):
+        raise HTTPException(status_code=400, detail="Specify format=csv or format=ics (or send text/csv / text/calendar).")
+    try:
+        text = (await request.body()).decode("utf-8")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded.")
+
+    if fmt == "csv":
+        windows, errors = parse_availability_csv(text)
+    else:
+        windows, errors = parse_availability_ics(text, BUSINESS_TZ_STR)
+    logger.info(f"Action=availability_import Format={fmt} Windows={len(windows)} ParseErrors={len(errors)}")
+    if not windows:
+        return {"accepted": [], "rejected": errors}
+    calendar_mirror.ensure_writable()
+    return await create_availability_windows(windows, rejected=errors)
+
+
+@api_router.post("/availability/template")
+async def apply_availability_template(template: AvailabilityTemplate):
+    """Repeats a weekly set of windows over every date in [start_date, end_date]."""
+    try:
+        start_day = datetime.strptime(template.start_date, "%Y-%m-%d").date()
+        end_day = datetime.strptime(template.end_date, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="End date must not be before start date.")
+    if (end_day - start_day).days >= MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_SLOT_RANGE_DAYS} days.")
+
+    windows, errors = expand_weekly_template(start_day, end_day, [e.model_dump() for e in template.weekly])
+    if not windows:
+        return {"accepted": [], "rejected": errors}
+    calendar_mirror.ensure_writable()
+    return await create_availability_windows(windows, rejected=errors)
+
+async def load_availability(date):
+    """Availability windows set on one day (shared by coalesced callers; do not mutate)."""
+    day_start_iso, day_end_iso = business_time.day_bounds(date)
     
-    events = calendar_service.list_events(day_start_iso, day_end_iso)
+    events = await calendar_mirror.list_events(day_start_iso, day_end_iso)
+    return availability_from_events(date, events)
+
+
+def availability_from_events(date, events):
+    """Availability windows of one business day from its calendar events plus recurring rules."""
     avail_list = []
     
     for e in events:
@@ -955,8 +1140,135 @@ async def get_availability(date: Optional[str] = None):
                  end_time=e_time,
                  type=t_type
              ))
+
+    # Recurring windows are expanded from the cached rules, not read from the calendar
+    for start_time, end_time, window_type, rule_id in availability_rules.windows_for(date):
+        avail_list.append(Availability(
+            id=f"rule:{rule_id}:{date}",
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
+            type=window_type,
+            recurring_rule_id=rule_id
+        ))
     return avail_list
 
+class AvailabilityRuleCreate(BaseModel):
+    start_date: str  # first day the rule applies
+    type: str = "regular"
+    rrule: Optional[str] = None  # e.g. FREQ=WEEKLY;BYDAY=MO,WE,FR
+    weekdays: Optional[List[str]] = None  # mon..sun or 0-6, used when rrule is omitted
+    until: Optional[str] = None  # last day, used with weekdays
+    start_time: Optional[str] = None  # defaults to the type's standard window
+    end_time: Optional[str] = None
+    exdates: List[str] = []
+
+class AvailabilityRuleException(BaseModel):
+    date: str
+
+
+@api_router.get("/availability/rules")
+async def list_availability_rules():
+    return availability_rules.list()
+
+
+@api_router.post("/availability/rules")
+async def create_availability_rule(data: AvailabilityRuleCreate):
+    """
+    Recurring availability as one rule (RRULE plus exception dates). Start and
+    end times default to the standard window for the type, so a plain weekly
+    schedule needs no calendar events at all.
+    """
+    window_type = (data.type or "regular").lower()
+    default_start, default_end = DEFAULT_WINDOW_TIMES.get(window_type, DEFAULT_WINDOW_TIMES["regular"])
+    try:
+        window = make_window(data.start_date, data.start_time or default_start, data.end_time or default_end, window_type)
+        exdates = [make_window(d, "00:00", "00:01")["date"] for d in data.exdates]
+        if data.rrule:
+            rrule = data.rrule
+        elif data.weekdays:
+            weekdays = []
+            for day in data.weekdays:
+                day = str(day).strip().lower()
+                if day.isdigit() and int(day) <= 6:
+                    weekdays.append(int(day))
+                elif day[:3] in WEEKDAYS:
+                    weekdays.append(WEEKDAYS.index(day[:3]))
+                else:
+                    raise ValueError(f"Invalid weekday '{day}'")
+            until = make_window(data.until, "00:00", "00:01")["date"] if data.until else None
+            rrule = build_rrule(weekdays, until=until)
+        else:
+            raise ValueError("Provide an rrule or weekdays")
+        rule = await availability_rules.create(
+            rrule, window["date"], window["start_time"], window["end_time"], window["type"], exdates
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await slot_inventory.invalidate_from(max(window["date"], business_time.today()))
+    return rule
+
+
+@api_router.delete("/availability/rules/{rule_id}")
+async def delete_availability_rule(rule_id: str):
+    if not await availability_rules.delete(rule_id):
+        raise HTTPException(status_code=404, detail="Rule not found")
+    await slot_inventory.invalidate_from(business_time.today())
+    return {"success": True}
+
+
+@api_router.post("/availability/rules/{rule_id}/exceptions")
+async def add_availability_rule_exception(rule_id: str, data: AvailabilityRuleException):
+    """Removes one date from a recurring rule (e.g. a holiday)."""
+    return await skip_recurring_occurrence(f"rule:{rule_id}:{data.date}")
+
+
+async def skip_recurring_occurrence(occurrence_id):
+    """Adds an exception date for a "rule:<id>:<date>" occurrence unless it has bookings."""
+    parts = occurrence_id.split(':')
+    if len(parts) != 3:
+        raise HTTPException(status_code=400, detail="Invalid recurring window id")
+    _, rule_id, date = parts
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+
+    rule = availability_rules.get(rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Rule not found")
+
+    # Same guard as deleting a calendar window: no bookings inside the occurrence
+    window_start = datetime.fromisoformat(f"{date}T{rule['start_time']}:00").replace(tzinfo=BUSINESS_TZ)
+    window_end = datetime.fromisoformat(f"{date}T{rule['end_time']}:00").replace(tzinfo=BUSINESS_TZ)
+    for e in await calendar_mirror.list_events(window_start.isoformat(), window_end.isoformat()):
+        summary = e.get('summary', '')
+        if "REGULAR_TIMING" in summary or "EMERGENCY_TIMING" in summary:
+            continue
+        if e.get('transparency') == 'transparent':
+            continue
+        raise HTTPException(status_code=400, detail="Cannot delete availability window with active bookings. Please delete the bookings first.")
+
+    await availability_rules.add_exception(rule_id, date)
+    slot_inventory.schedule({date})
+    return {"success": True}
+
+
+@api_router.get("/availability", response_model=List[Availability])
+async def get_availability(request: Request, response: Response, date: Optional[str] = None):
+    # This endpoint is strictly "What windows are set?".
+    # We fetch GCal events with the keywords.
+    if not date: 
+        return []
+    stale = calendar_mirror.stale
+    if stale:
+        mark_stale(response)
+    not_modified = conditional(request, response, resource_versions.etag("availability", date, stale, resource_versions.version(f"day:{date}"), resource_versions.version("availability_rules")))
+    if not_modified:
+        return not_modified
+    return await read_flight.do(("availability", date), lambda: load_availability(date))
+
 @api_router.delete("/availability/{event_id}")
 async def delete_availability(event_id: str):
     # 1. Fetch the event to get its time range
@@ -974,8 +1286,12 @@ async def delete_availability(event_id: str):
     
     # Option: Pass date/start/end in query params? No, standard DELETE is by ID.
     # We should fetch the event details.
+    if event_id.startswith("rule:"):
+        # One occurrence of a recurring window: skip that date in the rule
+        return await skip_recurring_occurrence(event_id)
+    calendar_mirror.ensure_writable()
     try:
-        event = calendar_service.service.events().get(calendarId='primary', eventId=event_id).execute()
+        event = await calendar_mirror.get_event(event_id)
         if not event:
              raise Exception("Event not found")
         
@@ -986,7 +1302,7 @@ async def delete_availability(event_id: str):
         # Valid bookings have 'summary' starting with 'BOOKED' (or just not REGULAR/EMERGENCY)
         
         # Re-fetch events in this range
-        overlaps = calendar_service.list_events(start_iso, end_iso)
+        overlaps = await calendar_mirror.list_events(start_iso, end_iso)
         has_booking = False
         for e in overlaps:
             if e['id'] == event_id: continue
@@ -1000,10 +1316,11 @@ async def delete_availability(event_id: str):
         if has_booking:
             raise HTTPException(status_code=400, detail="Cannot delete availability window with active bookings. Please delete the bookings first.")
 
-        calendar_service.delete_event(event_id)
+        await calendar_mirror.delete_event(event_id)
+        slot_inventory.schedule(calendar_mirror.event_dates(event))
         return {"success": True}
         
-    except HTTPException as he:
+    except (HTTPException, CircuitOpenError) as he:
         raise he
     except Exception as e:
         logger.error(f"Delete Avail Error: {e}")
@@ -1017,17 +1334,19 @@ class AvailabilityUpdate(BaseModel):
 
 @api_router.put("/availability/{event_id}")
 async def update_availability(event_id: str, avail: AvailabilityUpdate):
+    if event_id.startswith("rule:"):
+        raise HTTPException(status_code=400, detail="Recurring windows are changed through /availability/rules.")
     # 1. Check for Duplicate/Overlap (excluding self ideally, but simplified logic first)
     # Ideally we fetch the old event to know its ID, but here we just check overlap against others.
+    calendar_mirror.ensure_writable()
     
-    current_offset = get_business_offset()
-    day_start_iso = f"{avail.date}T00:00:00{current_offset}"
-    day_end_iso = f"{avail.date}T23:59:59{current_offset}"
-    existing_events = calendar_service.list_events(day_start_iso, day_end_iso)
+    day_start_iso, day_end_iso = business_time.day_bounds(avail.date)
+    existing_events = await calendar_mirror.list_events(day_start_iso, day_end_iso)
     
     new_start_min = int(avail.start_time.split(':')[0]) * 60 + int(avail.start_time.split(':')[1])
     new_end_min = int(avail.end_time.split(':')[0]) * 60 + int(avail.end_time.split(':')[1])
     
+    other_windows = []
     for e in existing_events:
         if e['id'] == event_id: continue # Skip self
         
@@ -1036,25 +1355,23 @@ async def update_availability(event_id: str, avail: AvailabilityUpdate):
              e_start_raw = e['start'].get('dateTime', '')
              e_end_raw = e['end'].get('dateTime', '')
              if not e_start_raw or 'T' not in e_start_raw: continue
-             
-             e_start_time = e_start_raw.split('T')[1].split('+')[0]
-             e_end_time = e_end_raw.split('T')[1].split('+')[0]
-             e_s_min = int(e_start_time.split(':')[0]) * 60 + int(e_start_time.split(':')[1])
-             e_e_min = int(e_end_time.split(':')[0]) * 60 + int(e_end_time.split(':')[1])
-             
-             if (new_start_min < e_e_min) and (new_end_min > e_s_min):
-                 raise HTTPException(status_code=400, detail="Overlapping availability window already exists.")
+             other_windows.append((to_day_minutes(e_start_raw, avail.date), to_day_minutes(e_end_raw, avail.date)))
+    for r_start, r_end, _ in recurring_window_spans(avail.date):
+        other_windows.append((r_start.hour * 60 + r_start.minute, r_end.hour * 60 + r_end.minute))
+
+    if overlapping((new_start_min, new_end_min), other_windows):
+        raise HTTPException(status_code=400, detail="Overlapping availability window already exists.")
 
     # 2. Perform Update
     summary = "REGULAR_TIMING"
     if avail.type.lower() == 'emergency':
         summary = "EMERGENCY_TIMING"
         
-    current_offset = get_business_offset()
-    start_dt_iso = f"{avail.date}T{avail.start_time}:00{current_offset}"
-    end_dt_iso = f"{avail.date}T{avail.end_time}:00{current_offset}"
+    start_dt_iso = business_time.local_iso(avail.date, avail.start_time)
+    end_dt_iso = business_time.local_iso(avail.date, avail.end_time)
     
-    updated = calendar_service.update_event(
+    previous = await calendar_mirror.get_event(event_id)
+    updated = await calendar_mirror.update_event(
         event_id,
         summary,
         start_dt_iso,
@@ -1065,6 +1382,7 @@ async def update_availability(event_id: str, avail: AvailabilityUpdate):
     if not updated:
         raise HTTPException(status_code=500, detail="Failed to update event")
         
+    slot_inventory.schedule({avail.date} | (calendar_mirror.event_dates(previous) if previous else set()))
     return Availability(
         id=updated['id'],
         date=avail.date,
@@ -1073,8 +1391,12 @@ async def update_availability(event_id: str, avail: AvailabilityUpdate):
         type=avail.type
     )
 @api_router.get("/testimonials", response_model=List[Testimonial])
-async def get_testimonials():
+async def get_testimonials(request: Request, response: Response):
     testimonials = await db.testimonials.find({}, {"_id": 0}).to_list(100)
+    # Tagged from the data, so edits made outside the API are never answered with a stale 304
+    not_modified = conditional(request, response, content_etag(testimonials), CATALOG_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
     return testimonials
 
 @api_router.post("/testimonials", response_model=Testimonial)
@@ -1095,6 +1417,8 @@ async def delete_testimonial(id: str):
 @api_router.delete("/bookings/{booking_id}")
 async def delete_booking(booking_id: str):
     # booking_id here is the Google Calendar Event ID (passed from frontend slot.id)
+    # Check the calendar first so a Google outage does not leave a half-cancelled booking
+    calendar_mirror.ensure_writable()
     try:
         # 1. Fetch booking details FIRST (to get email for notification)
         booking = await db.bookings.find_one({"gcal_event_id": booking_id})
@@ -1123,10 +1447,18 @@ async def delete_booking(booking_id: str):
         else:
             logger.warning(f"No DB booking found for GCal ID: {booking_id} (might be older booking or manual event)")
 
-        # 4. Hard Delete from Google Calendar (to free up slot)
-        calendar_service.delete_event(booking_id)
+        # 4. Hard Delete from Google Calendar and drop the slot hold (to free up slot)
+        await calendar_mirror.delete_event(booking_id)
+        if booking:
+            await slot_holds.release(booking['booking_id'])
+        if booking and booking.get('preferred_date'):
+            calendar_service.event_cache.invalidate_day(booking['preferred_date'], BUSINESS_TZ_STR)
+            slot_inventory.schedule({booking['preferred_date']})
+            resource_versions.bump_days({booking['preferred_date']})
         
         return {"success": True}
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Delete Booking Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1140,69 +1472,75 @@ REGULAR_WINDOW_END = "18:00"
 EMERGENCY_WINDOW_START = "20:00"
 EMERGENCY_WINDOW_END = "22:00"
 
+# Standard times for recurring rules created without explicit times
+DEFAULT_WINDOW_TIMES = {
+    "regular": (REGULAR_WINDOW_START, REGULAR_WINDOW_END),
+    "emergency": (EMERGENCY_WINDOW_START, EMERGENCY_WINDOW_END),
+}
 
 
-@api_router.get("/slots", response_model=List[Slot])
-async def get_slots(date: Optional[str] = None, available_only: bool = False, type: Optional[str] = None, duration: int = 20):
-    if not date:
-        return []
-    
-    logger.info(f"GET_SLOTS: date={date} type={type} duration={duration} avail_only={available_only}")
 
-    # 1. Fetch ALL events
-    current_offset = get_business_offset()
-    day_start_iso = f"{date}T00:00:00{current_offset}"
-    day_end_iso = f"{date}T23:59:59{current_offset}"
-    
-    events = calendar_service.list_events(day_start_iso, day_end_iso)
-    
+# Widest window accepted by /slots/range (two months of calendar view)
+MAX_SLOT_RANGE_DAYS = 62
+
+# How far ahead /slots/next looks, and how many slots it returns at most
+SLOT_SEARCH_HORIZON_DAYS = int(os.environ.get('SLOT_SEARCH_HORIZON_DAYS', '90'))
+MAX_NEXT_SLOTS = 50
+# First /slots/next chunk; each further chunk doubles up to MAX_SLOT_RANGE_DAYS
+NEXT_SLOTS_FIRST_CHUNK_DAYS = 7
+
+
+def to_day_minutes(time_str, date):
+    """Minutes since Business TZ midnight of `date` for a GCal dateTime/date value, clamped to the day."""
+    try:
+        if 'T' not in time_str:
+            # All-day events only carry YYYY-MM-DD
+            day_delta = (datetime.fromisoformat(time_str).date() - datetime.fromisoformat(date).date()).days
+            return max(0, min(1440, day_delta * 1440))
+
+        if time_str.endswith('Z'):
+            time_str = time_str.replace('Z', '+00:00')
+
+        # Convert to Business TZ and measure wall-clock minutes from that day's midnight
+        dt_local = datetime.fromisoformat(time_str).astimezone(BUSINESS_TZ).replace(tzinfo=None)
+        midnight = datetime.fromisoformat(date)
+        minutes = int((dt_local - midnight).total_seconds() // 60)
+        return max(0, min(1440, minutes))
+    except ValueError:
+        return 0
+
+
+def classify_day_events(date, events, type=None):
+    """
+    (availability_blocks, busy_blocks) for one business day, in minutes from
+    business midnight: recurring and calendar availability windows (of `type`
+    if given) and the opaque events that block them.
+    """
     availability_blocks = []
     busy_blocks = []
-    
-    def to_minutes(time_str):
-        try:
-            # Handle YYYY-MM-DD (Date only) -> All Day Event
-            if 'T' not in time_str:
-                return -1 
-            
-            # Helper to parse and convert to Calendar Timezone minutes
-            try:
-                if time_str.endswith('Z'):
-                    time_str = time_str.replace('Z', '+00:00')
-                
-                dt = datetime.fromisoformat(time_str)
-                
-                # Convert to Dynamic Calendar Timezone
-                # FORCE Timezone from Constant
-                target_tz = BUSINESS_TZ
-                
-                dt_local = dt.astimezone(target_tz)
-                
-                return dt_local.hour * 60 + dt_local.minute
-            except ValueError:
-                # Fallback to naive splitting if not ISO format (unlikely from GCal)
-                time_part = time_str.split('T')[1].split('+')[0]
-                h, m, _ = map(int, time_part.split(':'))
-                return h * 60 + m
-        except:
-             return 0
-
-    # 2. Filter Events
+
+    # 0. Recurring windows, expanded locally from the cached rules
+    for start_time, end_time, block_type, _ in availability_rules.windows_for(date):
+        if type and type.lower() != block_type:
+            continue
+        s_hours, s_minutes = start_time.split(':')
+        e_hours, e_minutes = end_time.split(':')
+        availability_blocks.append({'start': int(s_hours) * 60 + int(s_minutes), 'end': int(e_hours) * 60 + int(e_minutes), 'type': block_type})
+
+    # 1. Filter Events
     for e in events:
         summary = e.get('summary', '') or ""
         transparency = e.get('transparency', 'opaque') # Default is opaque (Busy)
-        
+
         start_raw = e['start'].get('dateTime', e['start'].get('date'))
         end_raw = e['end'].get('dateTime', e['end'].get('date'))
-        
-        # Handle All Day
-        if 'T' not in start_raw:
-            s_min = 0
-            e_min = 1440 # Full day
-        else:
-            s_min = to_minutes(start_raw)
-            e_min = to_minutes(end_raw)
-            
+
+        s_min = to_day_minutes(start_raw, date)
+        e_min = to_day_minutes(end_raw, date)
+        if e_min <= s_min:
+            # Event does not touch this day
+            continue
+
         # Check Keywords
         is_avail = False
         block_type = 'regular'
@@ -1212,105 +1550,88 @@ async def get_slots(date: Optional[str] = None, available_only: bool = False, ty
         elif "EMERGENCY_TIMING" in summary:
             is_avail = True
             block_type = 'emergency'
-            
+
         if is_avail:
             # Filter by requested type if present
             if type and type.lower() != block_type:
                 continue
             availability_blocks.append({'start': s_min, 'end': e_min, 'type': block_type})
         else:
-            # It's a Busy Block (unless transparent)
             # It's a Busy Block (unless transparent)
             if transparency != 'transparent':
                 busy_blocks.append({'start': s_min, 'end': e_min, 'summary': summary, 'id': e['id']})
 
-    # 3. Calculate Slots
+    return availability_blocks, busy_blocks
+
+
+async def calendar_slot_conflict(date, time_str, duration):
+    """
+    Why the calendar no longer offers [time_str, +duration) on a business
+    date, or None: 'busy' when an opaque event (manual entry, booking without
+    a hold) overlaps it, 'outside_availability' when no window covers it.
+
+    The mirror answers first. It can trail Google by a sync interval, so a
+    slot it still shows free is then checked against freebusy, one
+    coalesced and briefly cached call per business day.
+    """
+    if not await async_calendar_service.ready():
+        return None
+    start_iso = booking_start_iso(date, time_str)
+    start_min = to_day_minutes(start_iso, date)
+    span = (start_min, start_min + duration)
+    events = await calendar_mirror.list_events(*business_time.day_bounds(date))
+    availability_blocks, busy_blocks = classify_day_events(date, events)
+    if overlapping(span, [(b['start'], b['end']) for b in busy_blocks]):
+        return 'busy'
+    if subtract_intervals(span, [(b['start'], b['end']) for b in availability_blocks]):
+        return 'outside_availability'
+
+    if any(is_opaque_window(e) for e in events):
+        # Windows not yet made transparent would read as busy on freebusy; the mirror's answer stands
+        return None
+    start_dt = parse_event_time(start_iso)
+    try:
+        busy_now = await async_calendar_service.check_busy_intervals(
+            [(start_dt, start_dt + timedelta(minutes=duration))], tz_name=BUSINESS_TZ_STR
+        )
+    except (httpx.HTTPError, CircuitOpenError) as e:
+        logger.warning(f"Action=calendar_slot_conflict Status=freebusy_failed Date={date} Time={time_str} Error={str(e)}")
+        return None
+    return 'busy' if busy_now[0] else None
+
+
+def build_day_slots(date, events, canceled_bookings, type=None, duration=20, available_only=False):
+    """Turns one business day's calendar events, recurring windows (and canceled bookings) into Slots."""
+    availability_blocks, busy_blocks = classify_day_events(date, events, type)
+
+    # 2. Calculate Slots: back-to-back slots of `duration` per block, skipping busy time
     dynamic_slots = []
     busy_blocks.sort(key=lambda x: x['start'])
-    
+
     def format_time(m):
         h = m // 60
         mn = m % 60
         return f"{h:02d}:{mn:02d}"
 
-    # Iterate each Availability Block
-    seen_slots = set()
-    for block in availability_blocks:
-        current = block['start']
-        b_end = block['end']
-        b_type = block['type']
-        
-        # Step within the block
-        # Optimization: We could be smarter about skipping busy blocks, 
-        # but iterating by Duration is key requirement ("Segment that block into potential start times").
-        # Usually this means stepping by 'Duration' OR 'Interval'. 
-        # Standard booking is often "Slots every 30m". 
-        # If duration is 40m, slots might be 10:00, 10:30, 11:00... 
-        if is_avail:
-             # Create slots for this block
-            # Duration step
-            current_min = s_min
-            while current_min + duration <= e_min:
-                # Check if this sub-slot overlaps with any busy block
-                slot_start = current_min
-                slot_end = current_min + duration
-                
-                is_busy = False
-                for bb in busy_blocks:
-                    # Overlap logic: start < busy_end AND end > busy_start
-                    if slot_start < bb['end'] and slot_end > bb['start']:
-                        is_busy = True
-                        break
-                
-                if not is_busy:
-                    time_str = format_time(slot_start)
-                    
-                    # Calculate UTC Time for this slot
-                    # 1. Construct local time in Business TZ
-                    # We know 'date' and 'time_str'.
-                    # We need to rely on the fact that date is YYYY-MM-DD in Business TZ context if we assume simple calendar
-                    # BUT GCal returns ISO with offsets.
-                    # We used `to_minutes` which normalized to Business TZ.
-                    # So `slot_start` minutes is relative to Business TZ midnight.
-                    
-                    
-                    try:
-                        # Construct naive then localize
-                        dt_naive = datetime.fromisoformat(f"{date}T{time_str}:00")
-                        dt_aware = dt_naive.replace(tzinfo=BUSINESS_TZ)
-                        dt_utc = dt_aware.astimezone(timezone.utc)
-                        utc_iso = dt_utc.isoformat().replace('+00:00', 'Z')
-                    except Exception as ex:
-                        logger.error(f"Error calculating UTC for slot {time_str}: {ex}")
-                        utc_iso = None
-
-                    slot_key = f"{date}-{time_str}"
-                    if slot_key in seen_slots:
-                        current_min += duration
-                        continue
-                    seen_slots.add(slot_key)
-
-                    dynamic_slots.append(Slot(
-                        date=date,
-                        time=time_str,
-                        start_time_utc=utc_iso,
-                        type=block_type,
-                        duration=duration
-                    ))
-
-                current_min += duration
-                
+    windows = [(b['start'], b['end'], b['type']) for b in availability_blocks]
+    busy = [(bb['start'], bb['end']) for bb in busy_blocks]
+    open_slots = free_slots(windows, busy, duration)[duration]
+    # All of the day's UTC start times in one conversion
+    starts_utc = business_time.to_utc(date, [slot_start for slot_start, _ in open_slots])
+    for (slot_start, slot_type), start_utc in zip(open_slots, starts_utc):
+        dynamic_slots.append(Slot(
+            date=date,
+            time=format_time(slot_start),
+            start_time_utc=start_utc,
+            type=slot_type,
+            duration=duration
+        ))
 
     if not available_only:
         for busy in busy_blocks:
-             # Convert minutes to HH:MM
-             h = busy['start'] // 60
-             m = busy['start'] % 60
-             time_str = f"{h:02d}:{m:02d}"
-             
+             time_str = format_time(busy['start'])
              duration_mins = busy['end'] - busy['start']
-             if duration_mins <= 0: continue
-             
+
              dynamic_slots.append(Slot(
                  id=busy.get('id', f"busy-{date}-{time_str}"),
                  date=date,
@@ -1321,21 +1642,17 @@ async def get_slots(date: Optional[str] = None, available_only: bool = False, ty
                  duration=duration_mins
              ))
 
-    # 5. Fetch and Add "Canceled" Bookings for Visual History
+    # 3. Add "Canceled" Bookings for Visual History
     # We want to show these to the admin even if the slot is technically free now.
-    canceled_bookings = await db.bookings.find({"preferred_date": date, "status": "canceled"}, {"_id": 0}).to_list(100)
     for cb in canceled_bookings:
-        # Avoid duplicates if multiple cancellations for same time? 
-        # Just show them. Admin might want to see history.
-        # But if we have a NEW booking in that slot, this canceled one will appear alongside/beneath it?
-        # Yes, that's fine. It's a timeline.
-        
-        c_time = cb['preferred_time']
+        c_time = cb.get('preferred_time')
+        if not c_time:
+            continue
         # Determine duration
         c_dur = 20
         if cb.get('service_type') and '40' in cb['service_type']:
             c_dur = 40
-            
+
         dynamic_slots.append(Slot(
             id=f"canceled-{cb['booking_id']}",
             date=date,
@@ -1349,6 +1666,390 @@ async def get_slots(date: Optional[str] = None, available_only: bool = False, ty
     return sorted(dynamic_slots, key=lambda x: (x.date, x.time))
 
 
+def compact_slot(slot: Slot) -> dict:
+    """Minimal per-slot payload for multi-day responses."""
+    data = {"time": slot.time, "type": slot.type}
+    if slot.start_time_utc:
+        data["start_time_utc"] = slot.start_time_utc
+    if slot.is_booked:
+        data.update({"id": slot.id, "duration": slot.duration, "booked_by": slot.booked_by})
+    return data
+
+
+def slot_starts_utc(items):
+    """
+    UTC start for (business date, slot-like dict) pairs. Busy blocks only carry
+    a local HH:MM, canceled bookings their stored preferred_time (which may
+    include a UTC offset).
+    """
+    starts = []
+    for date, item in items:
+        if item.get("start_time_utc"):
+            starts.append(item["start_time_utc"])
+        else:
+            start_min = to_day_minutes(booking_start_iso(date, item["time"]), date)
+            starts.append(business_time.to_utc(date, [start_min])[0])
+    return starts
+
+
+def localize_slots(slots, tz_name):
+    """Copies of business-day Slots with date/time in `tz_name`, converted in one batch."""
+    local = utc_to_local(slot_starts_utc([(s.date, {"time": s.time, "start_time_utc": s.start_time_utc}) for s in slots]), tz_name)
+    localized = [
+        s.model_copy(update={"date": l_date, "time": l_time, "business_date": s.date, "business_time": s.time})
+        for s, (l_date, l_time) in zip(slots, local)
+    ]
+    return sorted(localized, key=lambda x: (x.date, x.time))
+
+
+def localize_days(days, tz_name, start, end):
+    """Regroups {business date: [compact slot]} by date in `tz_name`, keeping [start, end]."""
+    items = [(date, slot) for date in sorted(days) for slot in days[date]]
+    local_days = {}
+    for (date, slot), (l_date, l_time) in zip(items, utc_to_local(slot_starts_utc(items), tz_name)):
+        if start <= l_date <= end:
+            local_days.setdefault(l_date, []).append({**slot, "time": l_time, "business_date": date, "business_time": slot["time"]})
+    for slots in local_days.values():
+        slots.sort(key=lambda x: x["time"])
+    return local_days
+
+
+def business_dates_for(start, end, tz):
+    """Business dates covering the client days [start, end] in `tz` (400 on a bad zone)."""
+    try:
+        return business_time.dates_for_zone(start, end, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def compute_slot_inventory(date):
+    """Builds every materialized (type, duration) slot list for one business day."""
+    breaker = async_calendar_service.breaker
+    if not calendar_mirror.ready and breaker.is_open:
+        # No mirror to read and Google is down: keep the stored inventory rather than blank it
+        raise CircuitOpenError(breaker.name, breaker.retry_after())
+    events = await calendar_mirror.list_events(*business_time.day_bounds(date))
+    entries = {}
+    for slot_type in INVENTORY_TYPES:
+        for duration in INVENTORY_DURATIONS:
+            slots = build_day_slots(date, events, [], None if slot_type == "all" else slot_type, duration, True)
+            entries[(slot_type, duration)] = [slot.model_dump(exclude={"created_at"}) for slot in slots]
+    return entries
+
+# Precomputed public slots, refreshed whenever windows or bookings change
+slot_inventory = SlotInventory(db, compute_slot_inventory)
+calendar_mirror.add_listener(slot_inventory.schedule)
+
+# Reservations taken at checkout; claims for a date are serialized on its day document
+slot_holds = SlotHolds(db)
+
+# PayPal webhook deliveries; the unique event_id index makes redeliveries no-ops
+payment_events = PaymentEvents(db)
+
+
+def booking_duration(service_type):
+    return 40 if '40' in (service_type or '') else 20
+
+
+def booking_start_iso(date, time_str):
+    """Start of a booking as an ISO string; bare HH:MM times are in Business TZ."""
+    if 'Z' in time_str or '+' in time_str:
+        return f"{date}T{time_str}"
+    return business_time.local_iso(date, time_str)
+
+
+def without_held(slots, holds):
+    """Drops open slots overlapping a live hold ((start_min, end_min) pairs)."""
+    if not holds:
+        return slots
+    kept = []
+    for slot in slots:
+        if not slot.is_booked and slot.type != 'canceled':
+            hours, minutes = slot.time.split(':')
+            start_min = int(hours) * 60 + int(minutes)
+            if overlapping((start_min, start_min + (slot.duration or 20)), holds):
+                continue
+        kept.append(slot)
+    return kept
+
+
+async def load_day_slots(date, type, duration, available_only, stale, holds):
+    """One day's slots as served by GET /slots (shared by coalesced callers; do not mutate)."""
+    # Public reads are a single indexed lookup in the materialized inventory
+    if available_only:
+        stored = await slot_inventory.get(date, type, duration, allow_stale=stale)
+        if stored is not None:
+            return without_held([Slot(**slot) for slot in stored], holds)
+
+    # 1. Fetch ALL events
+    day_start_iso, day_end_iso = business_time.day_bounds(date)
+    
+    events = await calendar_mirror.list_events(day_start_iso, day_end_iso)
+
+    # 2. Fetch "Canceled" Bookings for Visual History (admin view only)
+    canceled_bookings = []
+    if not available_only:
+        canceled_bookings = await db.bookings.find({"preferred_date": date, "status": "canceled"}, {"_id": 0}).to_list(100)
+
+    slots = build_day_slots(date, events, canceled_bookings, type, duration, available_only)
+    if available_only and slot_inventory.key_for(type, duration):
+        slot_inventory.schedule({date})
+    return without_held(slots, holds)
+
+
+@api_router.get("/slots", response_model=List[Slot])
+async def get_slots(request: Request, response: Response, date: Optional[str] = None, available_only: bool = False, type: Optional[str] = None, duration: int = 20, tz: Optional[str] = None):
+    """
+    Slots for one day. With `tz` (IANA name) `date` is a day in that zone and
+    slots come back with date/time already in it; a client day that spans two
+    business days is answered from both in one response.
+    """
+    if not date:
+        return []
+    
+    logger.info(f"GET_SLOTS: date={date} type={type} duration={duration} avail_only={available_only} tz={tz}")
+
+    dates = business_dates_for(date, date, tz) if tz else [date]
+
+    # Google unreachable or sync overdue: serve the last good data and say so
+    stale = calendar_mirror.stale
+    if stale:
+        mark_stale(response)
+
+    # Slots reserved by an in-flight checkout are hidden at read time
+    holds_by_date = await slot_holds.active_for(dates)
+    holds = {d: tuple(sorted(holds_by_date.get(d, []))) for d in dates}
+
+    keys = {d: ("slots", d, (type or "").lower(), duration, available_only, stale, holds[d]) for d in dates}
+    day_versions = tuple(resource_versions.version(f"day:{d}") for d in dates)
+    not_modified = conditional(request, response, resource_versions.etag(date, tz, *keys.values(), day_versions, resource_versions.version("availability_rules")))
+    if not_modified:
+        return not_modified
+
+    # Visitors opening the same day at once share one computation
+    if not tz:
+        return await read_flight.do(keys[date], lambda: load_day_slots(date, type, duration, available_only, stale, holds[date]))
+    per_day = await asyncio.gather(*(
+        read_flight.do(keys[d], lambda d=d: load_day_slots(d, type, duration, available_only, stale, holds[d]))
+        for d in dates
+    ))
+    return [slot for slot in localize_slots([slot for day in per_day for slot in day], tz) if slot.date == date]
+
+
+async def load_slot_range(all_dates, duration, type, available_only, stale, holds_by_date):
+    """{date: [compact slot, ...]} for consecutive dates (shared by coalesced callers; do not mutate)."""
+    start, end = all_dates[0], all_dates[-1]
+
+    # 1. Public reads: take whatever the materialized inventory already holds
+    stored = {}
+    if available_only:
+        stored = await slot_inventory.get_many(all_dates, type, duration, allow_stale=stale)
+
+    # 2. One calendar fetch for the remaining window, bucketed by business day
+    events_by_date = {}
+    missing = [d for d in all_dates if d not in stored]
+    if missing:
+        events = await calendar_mirror.list_events(*business_time.range_bounds(missing[0], missing[-1]))
+        for e in events:
+            for day in calendar_mirror.event_dates(e):
+                events_by_date.setdefault(day, []).append(e)
+
+    # 3. One query for canceled bookings (admin history only)
+    canceled_by_date = {}
+    if not available_only:
+        canceled = await db.bookings.find(
+            {"preferred_date": {"$gte": start, "$lte": end}, "status": "canceled"}, {"_id": 0}
+        ).to_list(1000)
+        for cb in canceled:
+            canceled_by_date.setdefault(cb['preferred_date'], []).append(cb)
+
+    # 4. Compute every missing day in one pass, hiding slots held by open checkouts
+    days = {}
+    for date_str in all_dates:
+        if date_str in stored:
+            slots = [Slot(**slot) for slot in stored[date_str]]
+        else:
+            slots = build_day_slots(
+                date_str, events_by_date.get(date_str, []), canceled_by_date.get(date_str, []),
+                type, duration, available_only
+            )
+        days[date_str] = [compact_slot(slot) for slot in without_held(slots, holds_by_date.get(date_str))]
+
+    if available_only and missing and slot_inventory.key_for(type, duration):
+        slot_inventory.schedule(missing)
+    return days
+
+
+@api_router.get("/slots/range")
+async def get_slots_range(request: Request, response: Response, start: str, end: str, duration: int = 20, type: Optional[str] = None, available_only: bool = True, tz: Optional[str] = None):
+    """
+    Slots for every day in [start, end] computed from a single calendar fetch.
+    With `tz` the days and slot times are the caller's.
+    """
+    try:
+        start_day = datetime.strptime(start, "%Y-%m-%d").date()
+        end_day = datetime.strptime(end, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="End date must not be before start date.")
+    if (end_day - start_day).days >= MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_SLOT_RANGE_DAYS} days.")
+
+    logger.info(f"GET_SLOTS_RANGE: start={start} end={end} type={type} duration={duration} avail_only={available_only} tz={tz}")
+
+    if tz:
+        all_dates = business_dates_for(start, end, tz)
+    else:
+        all_dates = [(start_day + timedelta(days=i)).isoformat() for i in range((end_day - start_day).days + 1)]
+
+    stale = calendar_mirror.stale
+    if stale:
+        mark_stale(response)
+
+    holds_by_date = await slot_holds.active_for(all_dates)
+    holds_key = tuple((d, tuple(sorted(holds_by_date[d]))) for d in sorted(holds_by_date))
+    key = ("slots_range", all_dates[0], all_dates[-1], (type or "").lower(), duration, available_only, stale, holds_key)
+    day_versions = tuple(resource_versions.version(f"day:{d}") for d in all_dates)
+    not_modified = conditional(request, response, resource_versions.etag(*key, tz, day_versions, resource_versions.version("availability_rules")))
+    if not_modified:
+        return not_modified
+
+    days = await read_flight.do(key, lambda: load_slot_range(all_dates, duration, type, available_only, stale, holds_by_date))
+    if tz:
+        days = localize_days(days, tz, start, end)
+    return {"start": start, "end": end, "duration": duration, "type": type, "tz": tz, "stale": stale, "days": days}
+
+
+@api_router.get("/slots/next")
+async def get_next_slots(response: Response, duration: int = 20, type: Optional[str] = None, after: Optional[str] = None, limit: int = 1, tz: Optional[str] = None):
+    """
+    The first `limit` open slots starting after `after` (ISO date-time, bare
+    times in Business TZ; default now). Days are scanned in growing ranges
+    through the same inventory/range path as /slots/range, stopping as soon
+    as enough slots are found.
+    """
+    if not 1 <= limit <= MAX_NEXT_SLOTS:
+        raise HTTPException(status_code=400, detail=f"Limit must be between 1 and {MAX_NEXT_SLOTS}.")
+    if tz:
+        try:
+            get_zone(tz)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        after_dt = datetime.fromisoformat(after.replace('Z', '+00:00')) if after else datetime.now(timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'after'. Use an ISO date or date-time.")
+    if after_dt.tzinfo is None:
+        after_dt = after_dt.replace(tzinfo=BUSINESS_TZ)
+    after_utc = after_dt.astimezone(timezone.utc).strftime(UTC_FORMAT)
+    first_day = after_dt.astimezone(BUSINESS_TZ).date()
+
+    stale = calendar_mirror.stale
+    if stale:
+        mark_stale(response)
+
+    logger.info(f"GET_SLOTS_NEXT: after={after_utc} type={type} duration={duration} limit={limit} tz={tz}")
+
+    found = []
+    scanned = 0
+    chunk = NEXT_SLOTS_FIRST_CHUNK_DAYS
+    while scanned < SLOT_SEARCH_HORIZON_DAYS and len(found) < limit:
+        dates = [(first_day + timedelta(days=i)).isoformat() for i in range(scanned, min(scanned + chunk, SLOT_SEARCH_HORIZON_DAYS))]
+        holds_by_date = await slot_holds.active_for(dates)
+        holds_key = tuple((d, tuple(sorted(holds_by_date[d]))) for d in sorted(holds_by_date))
+        key = ("slots_range", dates[0], dates[-1], (type or "").lower(), duration, True, stale, holds_key)
+        days = await read_flight.do(key, lambda: load_slot_range(dates, duration, type, True, stale, holds_by_date))
+        for date_str in dates:
+            for slot in days.get(date_str, []):
+                if slot.get("start_time_utc", "") > after_utc:
+                    found.append({"date": date_str, "time": slot["time"], "start_time_utc": slot["start_time_utc"], "type": slot["type"], "duration": duration})
+            if len(found) >= limit:
+                break
+        scanned += len(dates)
+        chunk = min(chunk * 2, MAX_SLOT_RANGE_DAYS)
+
+    found = found[:limit]
+    if tz:
+        local = utc_to_local([slot["start_time_utc"] for slot in found], tz)
+        found = [
+            {**slot, "date": l_date, "time": l_time, "business_date": slot["date"], "business_time": slot["time"]}
+            for slot, (l_date, l_time) in zip(found, local)
+        ]
+    return {"after": after_utc, "duration": duration, "type": type, "tz": tz, "stale": stale, "searched_days": scanned, "slots": found}
+
+
+# Booking fields the admin schedule needs per block
+ADMIN_BOOKING_FIELDS = {
+    "_id": 0, "booking_id": 1, "gcal_event_id": 1, "full_name": 1, "email": 1, "phone": 1,
+    "service_type": 1, "preferred_date": 1, "preferred_time": 1, "status": 1,
+    "payment_status": 1, "is_emergency": 1, "amount": 1, "currency": 1
+}
+
+
+@api_router.get("/admin/schedule")
+async def get_admin_schedule(response: Response, start: str, end: Optional[str] = None, duration: int = 20, current_user: str = Depends(get_current_admin)):
+    """
+    Everything the admin week view renders for [start, end] (default: the
+    week from `start`): availability windows, open and busy slots, canceled
+    bookings and the booking behind every busy block. Built from one calendar
+    range read, one canceled-bookings query and one `$in` lookup on
+    gcal_event_id instead of a request per block.
+    """
+    try:
+        start_day = datetime.strptime(start, "%Y-%m-%d").date()
+        end_day = datetime.strptime(end, "%Y-%m-%d").date() if end else start_day + timedelta(days=6)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="End date must not be before start date.")
+    if (end_day - start_day).days >= MAX_SLOT_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_SLOT_RANGE_DAYS} days.")
+
+    all_dates = [(start_day + timedelta(days=i)).isoformat() for i in range((end_day - start_day).days + 1)]
+
+    stale = calendar_mirror.stale
+    if stale:
+        mark_stale(response)
+
+    events_by_date = {}
+    for e in await calendar_mirror.list_events(*business_time.range_bounds(all_dates[0], all_dates[-1])):
+        for day in calendar_mirror.event_dates(e):
+            events_by_date.setdefault(day, []).append(e)
+
+    canceled_by_date = {}
+    canceled = await db.bookings.find(
+        {"preferred_date": {"$gte": all_dates[0], "$lte": all_dates[-1]}, "status": "canceled"}, ADMIN_BOOKING_FIELDS
+    ).to_list(1000)
+    for cb in canceled:
+        canceled_by_date.setdefault(cb['preferred_date'], []).append(cb)
+
+    holds_by_date = await slot_holds.active_for(all_dates)
+
+    days = {}
+    busy_ids = set()
+    for date_str in all_dates:
+        day_events = events_by_date.get(date_str, [])
+        slots = without_held(
+            build_day_slots(date_str, day_events, canceled_by_date.get(date_str, []), None, duration, False),
+            holds_by_date.get(date_str)
+        )
+        busy_ids.update(slot.id for slot in slots if slot.type == 'busy')
+        days[date_str] = {
+            "availability": [a.model_dump() for a in availability_from_events(date_str, day_events)],
+            "slots": [compact_slot(slot) for slot in slots],
+            "canceled": canceled_by_date.get(date_str, [])
+        }
+
+    # One indexed lookup resolves every busy block to its booking
+    bookings = {}
+    if busy_ids:
+        docs = await db.bookings.find({"gcal_event_id": {"$in": sorted(busy_ids)}}, ADMIN_BOOKING_FIELDS).to_list(None)
+        bookings = {doc["gcal_event_id"]: doc for doc in docs}
+
+    return {"start": all_dates[0], "end": all_dates[-1], "duration": duration, "stale": stale, "days": days, "bookings": bookings}
+
+
 @api_router.post("/slots", response_model=Slot)
 async def create_slot(slot: SlotCreate):
     # Check if slot already exists
@@ -1406,18 +2107,18 @@ async def get_status_checks():
 @api_router.post("/bookings/verify-code")
 async def verify_promo_code(data: VerifyCodeRequest):
     """Verify a promo code before booking"""
-    promo = await db.promotions.find_one({"code": data.code.upper(), "is_active": True})
-    if not promo:
+    discounts = (await pricing_snapshot.get()).discounts
+    rule = discounts.code_rule(data.code)
+    if not rule:
+        if any(r.exhausted for r in discounts.code_rules(data.code)):
+            raise HTTPException(status_code=400, detail="Promo code usage limit reached")
         raise HTTPException(status_code=404, detail="Invalid or expired promo code")
     
-    if promo['used_count'] >= promo['usage_limit']:
-        raise HTTPException(status_code=400, detail="Promo code usage limit reached")
-    
     return {
         "valid": True,
-        "code": promo['code'],
-        "discount_type": promo['discount_type'],
-        "discount_value": promo['discount_value']
+        "code": rule.doc['code'],
+        "discount_type": rule.discount_type,
+        "discount_value": rule.value
     }
 
 @api_router.post("/bookings/create")
@@ -1428,72 +2129,23 @@ async def create_booking(booking_data: BookingCreate, background_tasks: Backgrou
         # Generate booking ID
         booking_id = f"TRT-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
         
-        # 1. Get Base Pricing
-        service_price = await db.services.find_one({"key": booking_data.service_type})
-        if service_price:
-            base_amount = float(service_price['amount'])
-            currency = service_price['currency']
-        else:
-            # Fallback
-            pricing = PRICING_MAP.get(booking_data.service_type)
-            if not pricing:
-                raise HTTPException(status_code=400, detail="Invalid service type")
-            base_amount = float(pricing['amount'])
-            currency = pricing['currency']
-
-        final_amount = base_amount
-        discount_total = 0.0
-        applied_promo_code = None
-        
-        # 2 & 3. Apply Discounts (Only if service is not tiktok-live)
-        if booking_data.service_type != 'tiktok-live':
-            # 2. Apply Promo Code (Takes priority)
-            if booking_data.promo_code:
-                promo = await db.promotions.find_one({"code": booking_data.promo_code, "is_active": True})
-                if promo and promo['used_count'] < promo['usage_limit']:
-                    if promo['discount_type'] == 'percentage':
-                        p_discount = (float(promo['discount_value']) / 100.0) * final_amount
-                    else:
-                        p_discount = float(promo['discount_value'])
-                    
-                    final_amount -= p_discount
-                    discount_total += p_discount
-                    applied_promo_code = promo['code']
-                    logger.info(f"Applied Promo Code: {applied_promo_code}. Discount: {p_discount}")
-                else:
-                    logger.warning(f"Invalid or limited promo code: {booking_data.promo_code}")
-
-            # 3. Apply Global Campaign (Only if no promo applied)
-            if not applied_promo_code:
-                campaign = await db.campaigns.find_one({"is_active": True})
-                if campaign:
-                    expiry = campaign.get('expiry_date')
-                    if isinstance(expiry, str): expiry = datetime.fromisoformat(expiry.replace("Z", "+00:00"))
-                    if isinstance(expiry, datetime) and expiry.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc):
-                        pct = campaign.get('discount_percentage', 0)
-                        discount = (float(pct) / 100.0) * final_amount
-                        final_amount -= discount
-                        discount_total += discount
-                        logger.info(f"Applied Global Campaign: {pct}% off. New amount: {final_amount}")
-        else:
+        # 1-4. Base price, promo code or campaign, tax and emergency surcharge from the pricing snapshot
+        pricing = await pricing_snapshot.get()
+        try:
+            quote = pricing.quote(
+                booking_data.service_type, booking_data.promo_code, booking_data.is_emergency, fallback=PRICING_MAP
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid service type")
+        if quote["promo_code"]:
+            logger.info(f"Applied Promo Code: {quote['promo_code']}. Discount: {quote['discount_amount']}")
+        elif booking_data.promo_code and booking_data.service_type != 'tiktok-live':
+            logger.warning(f"Invalid or limited promo code: {booking_data.promo_code}")
+        if quote["campaign_percentage"]:
+            logger.info(f"Applied Global Campaign: {quote['campaign_percentage']}% off. New amount: {quote['subtotal']}")
+        if booking_data.service_type == 'tiktok-live':
             logger.info("TikTok Live service selected. Discounts are not applicable.")
 
-        # Ensure non-negative
-        if final_amount < 0: final_amount = 0.0
-        final_amount = round(final_amount, 2)
-
-        # 4. Calculate Tax
-        tax_pct = 0.0
-        tax_name = ""
-        tax_amount = 0.0
-        
-        active_tax = await db.taxes.find_one({"is_active": True}, sort=[("created_at", -1)])
-        if active_tax:
-            tax_pct = active_tax.get('percentage', 0.0)
-            tax_name = active_tax.get('name', 'Tax')
-            tax_amount = round(final_amount * (tax_pct / 100), 2)
-            final_amount = round(final_amount + tax_amount, 2)
-
         # Create booking record
         booking = Booking(
             booking_id=booking_id,
@@ -1512,38 +2164,51 @@ async def create_booking(booking_data: BookingCreate, background_tasks: Backgrou
             reading_focus=booking_data.reading_focus,
             payment_method=booking_data.payment_method,
             is_emergency=booking_data.is_emergency,
-            amount=final_amount,
-            original_amount=base_amount,
-            discount_amount=round(discount_total, 2),
-            promo_code=applied_promo_code,
-            currency=currency,
+            amount=quote["total"],
+            original_amount=quote["base_amount"],
+            discount_amount=quote["discount_amount"],
+            promo_code=quote["promo_code"],
+            currency=quote["currency"],
             status="pending",
             aura_image=booking_data.aura_image,
             tiktok_username=booking_data.tiktok_username,
-            tax_amount=tax_amount,
-            tax_percentage=tax_pct,
-            tax_name=tax_name
+            tax_amount=quote["tax_amount"],
+            tax_percentage=quote["tax_percentage"],
+            tax_name=quote["tax_name"]
         )
 
-        # Apply Emergency Charge (+30%)
-        if booking_data.is_emergency:
-             booking.amount = round(booking.amount * 1.30, 2)
-        
         # GCal Event Logic MOVED to verify_payment to avoid blocking slots for unpaid bookings.
         # We only create the booking record as 'pending' here.
         
         # Booking save and notifications deferred until payment success
 
-        if booking_data.payment_method == 'paypal':
-            payment_result = payment_service.create_paypal_payment(
-                booking.amount,
-                booking.currency,
-                booking.model_dump()
-            )
-        else:
+        if booking_data.payment_method != 'paypal':
             raise HTTPException(status_code=400, detail=f"Payment method {booking_data.payment_method} is not supported. Use 'paypal'.")
 
+        # Reserve the slot for the checkout; expires via TTL if payment never completes
+        slot_held = False
+        if booking_data.service_type.startswith('live-') and booking_data.preferred_date and booking_data.preferred_time:
+            p_date = booking_data.preferred_date
+            duration_b = booking_duration(booking_data.service_type)
+            # Holds only cover checkouts; the calendar also has manual events and window changes
+            conflict = await calendar_slot_conflict(p_date, booking_data.preferred_time, duration_b)
+            if conflict:
+                logger.info(f"Booking slot rejected: {p_date} {booking_data.preferred_time} Reason={conflict}")
+                raise HTTPException(status_code=409, detail="This time slot is no longer available. Please choose another time.")
+            start_min = to_day_minutes(booking_start_iso(p_date, booking_data.preferred_time), p_date)
+            slot_held = await slot_holds.claim(p_date, start_min, duration_b, booking_id)
+            if not slot_held:
+                raise HTTPException(status_code=409, detail="This time slot is no longer available. Please choose another time.")
+
+        payment_result = await payment_service.create_paypal_payment(
+            booking.amount,
+            booking.currency,
+            booking.model_dump()
+        )
+
         if not payment_result or not payment_result.get('success'):
+            if slot_held:
+                await slot_holds.release(booking_id)
             # Payment Failed: Do NOT save booking, do NOT send emails.
             # Log the specific error but show generic to user (although create_paypal_payment already genericizes it, we ensure here too).
             error_msg = payment_result.get('error', "Technical Error: Unable to initiate payment.")
@@ -1554,6 +2219,7 @@ async def create_booking(booking_data: BookingCreate, background_tasks: Backgrou
             raise HTTPException(status_code=500, detail=error_msg)
 
         # Payment Success! Proceed to save.
+        booking.payment_id = payment_result.get('payment_id')
         
         # Convert to dict and serialize datetime fields for MongoDB
         doc = booking.model_dump()
@@ -1574,10 +2240,161 @@ async def create_booking(booking_data: BookingCreate, background_tasks: Backgrou
         raise he
     except Exception as e:
         logger.error(f"Booking creation error: {str(e)}")
+        await slot_holds.release(booking_id)
         # Generic technical error
         raise HTTPException(status_code=500, detail="Technical Error: Unable to process booking. Please try again.")
 
 
+# --- Post-payment steps (run by PostPayment; each is idempotent and returns True once done) ---
+
+async def post_payment_calendar(booking):
+    """Creates the calendar event of a live reading; its checkout hold becomes the booking's hold."""
+    if not str(booking.get('service_type', '')).startswith('live-') or booking.get('gcal_event_id'):
+        return True
+    booking_id = booking['booking_id']
+    duration_b = booking_duration(booking.get('service_type'))
+    p_date = booking.get('preferred_date')
+    p_time = booking.get('preferred_time')
+
+    start_dt_iso = booking_start_iso(p_date, p_time)
+    end_dt = datetime.fromisoformat(start_dt_iso) + timedelta(minutes=duration_b)
+
+    # Final Availability Check: the calendar must still offer the slot, then the
+    # checkout hold becomes the booking's hold (re-claimed if it lapsed during payment).
+    conflict = await calendar_slot_conflict(p_date, p_time, duration_b)
+    if conflict:
+        logger.error(f"Calendar conflict for {booking_id} at payment: {p_date} {p_time} Reason={conflict}")
+        slot_confirmed = False
+    else:
+        slot_confirmed = await slot_holds.confirm(booking_id, end_dt)
+    if not slot_confirmed and not conflict:
+        slot_confirmed = await slot_holds.claim(
+            p_date, to_day_minutes(start_dt_iso, p_date), duration_b,
+            booking_id, expires_at=end_dt, status="confirmed"
+        )
+    if not slot_confirmed:
+        logger.error(f"Double Booking Conflict: Slot {p_date} {p_time} became busy during payment for {booking_id}")
+        # The payment went through, so the event is still created, marked for
+        # Tejashvini to reach out and reschedule.
+        summary = f"[CONFLICT] BOOKED: {booking.get('full_name')} ({booking.get('service_type')})"
+    else:
+        summary = f"BOOKED: {booking.get('full_name')} ({booking.get('service_type')})"
+    if booking.get('is_emergency'):
+        summary = f"[EMERGENCY] {summary}"
+
+    gcal_event = await calendar_mirror.create_event(
+        summary,
+        start_dt_iso,
+        end_dt.isoformat(),
+        description=f"Questions: {booking.get('questions')}\nSituation: {booking.get('situation_description')}"
+    )
+    if not gcal_event:
+        logger.error(f"Post-Payment GCal Error for {booking_id}: event not created, will retry")
+        return False
+    calendar_service.event_cache.invalidate_day(p_date, BUSINESS_TZ_STR)
+    slot_inventory.schedule({p_date})
+    await db.bookings.update_one(
+        {'booking_id': booking_id},
+        {"$set": {"gcal_event_id": gcal_event.get('id')}}
+    )
+    return True
+
+
+async def post_payment_retention(booking):
+    """Retention Tracking: marks previous incomplete bookings for this email as retained."""
+    email = booking.get('email')
+    if not email:
+        return True
+    res = await db.bookings.update_many(
+        {
+            "email": email,
+            "payment_status": "pending",
+            "booking_id": {"$ne": booking['booking_id']},
+            "retained": {"$ne": True}
+        },
+        {
+            "$set": {
+                "retained": True,
+                "retained_by_booking_id": booking['booking_id'],
+                "retained_at": datetime.now(timezone.utc).isoformat()
+            }
+        }
+    )
+    if res.modified_count > 0:
+        logger.info(f"Retention: Marked {res.modified_count} previous bookings for {email} as retained by {booking['booking_id']}")
+    return True
+
+
+async def post_payment_promo(booking):
+    """Counts the promo code use, at most once per booking."""
+    if not booking.get('promo_code'):
+        return True
+    counted = await db.bookings.update_one(
+        {'booking_id': booking['booking_id'], 'promo_counted': {'$ne': True}},
+        {'$set': {'promo_counted': True}}
+    )
+    if counted.modified_count:
+        await db.promotions.update_one(
+            {"code": booking['promo_code']},
+            {"$inc": {"used_count": 1}}
+        )
+        pricing_snapshot.invalidate()
+    return True
+
+
+async def post_payment_zoom(booking):
+    """Schedules the Zoom meeting of a live reading."""
+    if not str(booking.get('service_type', '')).startswith('live-') or booking.get('meeting_link'):
+        return True
+    if not zoom_service.is_configured():
+        return True
+    raw_service = booking.get('service_type', '')
+    service_name = "Live Reading (20 Mins)" if '20' in raw_service else "Live Reading (40 Mins)"
+    topic = f"{service_name} with {booking.get('full_name')}"
+    start_time_iso = f"{booking.get('preferred_date')}T{booking.get('preferred_time')}:00"
+    duration = 20 if '20' in raw_service else 40
+
+    logger.info(f"Scheduling Zoom meeting: {topic} at {start_time_iso}")
+    meeting_link = await zoom_service.create_meeting(topic, start_time_iso, duration, agenda=booking.get('situation_description', ''))
+    if not meeting_link:
+        return False
+    await db.bookings.update_one(
+        {'booking_id': booking['booking_id']},
+        {"$set": {"meeting_link": meeting_link}}
+    )
+    logger.info(f"Zoom meeting created: {meeting_link}")
+    return True
+
+
+async def post_payment_client_email(booking):
+    """Confirmation to the client; waits for the Zoom step because it carries the meeting link."""
+    if 'zoom' in booking.get('post_payment_pending', []):
+        return False
+    # The senders are blocking and report failures instead of raising
+    return await asyncio.to_thread(
+        send_booking_confirmation_to_client, booking, booking.get('payment_info'), booking.get('meeting_link')
+    )
+
+
+async def post_payment_admin_email(booking):
+    return await asyncio.to_thread(send_booking_notification_to_tejashvini, booking, booking.get('payment_info'))
+
+
+POST_PAYMENT_STEPS = [
+    ('calendar', post_payment_calendar),
+    ('retention', post_payment_retention),
+    ('promo', post_payment_promo),
+    ('zoom', post_payment_zoom),
+    ('client_email', post_payment_client_email),
+    ('admin_email', post_payment_admin_email),
+]
+# Steps verify_payment finishes before answering (the success page reads the booking next)
+POST_PAYMENT_INLINE = ('calendar', 'retention', 'promo', 'zoom')
+
+# Paid bookings' remaining steps, retried from verify_payment, the webhook and the sweeper
+post_payment = PostPayment(db, payment_events, POST_PAYMENT_STEPS)
+
+
 @api_router.post("/bookings/verify-payment")
 async def verify_payment(verification: PaymentVerification, background_tasks: BackgroundTasks):
     """Verify payment and send confirmation emails"""
@@ -1593,9 +2410,10 @@ async def verify_payment(verification: PaymentVerification, background_tasks: Ba
         if isinstance(booking.get('updated_at'), str):
             booking['updated_at'] = datetime.fromisoformat(booking['updated_at'])
 
-        # If already confirmed, return success idempotently
+        # If already confirmed, return success idempotently (finishing any steps left over)
         if booking.get('status') == 'confirmed' and booking.get('payment_status') == 'paid':
             logger.info(f"VERIFY DEBUG: Booking {verification.booking_id} already confirmed. Returning success idempotently.")
+            background_tasks.add_task(post_payment.run_steps, verification.booking_id)
             return {
                 'success': True,
                 'message': 'Payment already verified',
@@ -1607,149 +2425,31 @@ async def verify_payment(verification: PaymentVerification, background_tasks: Ba
         logger.info(f"VERIFY DEBUG: Receiving verification request: {verification}")
         
         if verification.payment_method == 'paypal':
-            payment_verified = payment_service.verify_paypal_payment(verification.payment_id, verification.payer_id)
+            # A completion webhook already received for this booking's payment saves the PayPal round trip
+            completed = await payment_events.completed_payment(booking.get('payment_id'))
+            if completed:
+                payment_verified = PaymentEvents.payment_info(completed)
+            else:
+                payment_verified = await payment_service.verify_paypal_payment(verification.payment_id, verification.payer_id)
         else:
              raise HTTPException(status_code=400, detail=f"Verification for {verification.payment_method} is not supported.")
 
         if not payment_verified or not payment_verified.get('success'):
             raise HTTPException(status_code=400, detail="Payment verification failed")
         
-        # Update booking status
-        await db.bookings.update_one(
-            {'booking_id': verification.booking_id},
-            {'$set': {
-                'payment_status': 'paid',
-                'status': 'confirmed',
-                'transaction_id': payment_verified.get('transaction_id'),
-                'updated_at': datetime.now(timezone.utc).isoformat()
-            }}
-        )
-
-        # 3. Create GCal Event NOW (After payment success)
-        if str(booking.get('service_type', '')).startswith('live-') and not booking.get('gcal_event_id'):
-            try:
-                 # Calculate Duration
-                 duration_b = 20
-                 if '40' in booking.get('service_type'):
-                     duration_b = 40
-                 
-                 p_date = booking.get('preferred_date')
-                 p_time = booking.get('preferred_time')
-                 
-                 # Recalculate start_dt_iso
-                 if 'Z' in p_time or '+' in p_time:
-                     start_dt_iso = f"{p_date}T{p_time}"
-                 else:
-                     current_offset = get_business_offset()
-                     start_dt_iso = f"{p_date}T{p_time}:00{current_offset}"
-                 
-                 dt = datetime.fromisoformat(start_dt_iso)
-                 end_dt = dt + timedelta(minutes=duration_b)
-                 end_dt_iso = end_dt.isoformat()
-                 
-                 # Final Availability Re-Check (Avoid double booking in the payment interval)
-                 busy_at_that_time = calendar_service.is_busy(p_date, p_time, duration_b)
-                 if busy_at_that_time:
-                     logger.error(f"Double Booking Conflict: Slot {p_date} {p_time} became busy during payment for {verification.booking_id}")
-                     # In this extreme case, we still take the payment (it succeeded) 
-                     # but Tejashvini MUST reach out to reschedule. 
-                     # We still create the event but mark it as CONFLICT?
-                     summary = f"[CONFLICT] BOOKED: {booking.get('full_name')} ({booking.get('service_type')})"
-                 else:
-                     summary = f"BOOKED: {booking.get('full_name')} ({booking.get('service_type')})"
-                 
-                 if booking.get('is_emergency'):
-                     summary = f"[EMERGENCY] {summary}"
-                 
-                 gcal_event = calendar_service.create_event(
-                     summary,
-                     start_dt_iso, 
-                     end_dt_iso,
-                     description=f"Questions: {booking.get('questions')}\nSituation: {booking.get('situation_description')}"
-                 )
-                 
-                 await db.bookings.update_one(
-                     {'booking_id': verification.booking_id},
-                     {"$set": {"gcal_event_id": gcal_event.get('id')}}
-                 )
-                 # Refresh local booking object to include new gcal_event_id
-                 booking['gcal_event_id'] = gcal_event.get('id')
-                 
-            except Exception as e:
-                 logger.error(f"Post-Payment GCal Error for {verification.booking_id}: {e}")
-                 # We don't fail the verification (payment is already processed) but log heavily.
-
+        if not await post_payment.mark_paid(booking, payment_verified):
+            # The webhook confirmed it while this request was verifying
+            background_tasks.add_task(post_payment.run_steps, verification.booking_id)
+            return {
+                'success': True,
+                'message': 'Payment already verified',
+                'booking_id': verification.booking_id
+            }
 
-        # Retention Tracking: Mark previous incomplete bookings for this email as retained
-        try:
-            email = booking.get('email')
-            if email:
-                res = await db.bookings.update_many(
-                    {
-                        "email": email,
-                        "payment_status": "pending",
-                        "booking_id": {"$ne": verification.booking_id},
-                        "retained": {"$ne": True}
-                    },
-                    {
-                        "$set": {
-                            "retained": True,
-                            "retained_by_booking_id": verification.booking_id,
-                            "retained_at": datetime.now(timezone.utc).isoformat()
-                        }
-                    }
-                )
-                if res.modified_count > 0:
-                    logger.info(f"Retention: Marked {res.modified_count} previous bookings for {email} as retained by {verification.booking_id}")
-        except Exception as e:
-            logger.error(f"Retention Tracking Error: {e}")
-        
-        # Refresh booking data
-        booking = await db.bookings.find_one({'booking_id': verification.booking_id}, {"_id": 0})
-        
-        # Increment Promo Usage
-        if booking.get('promo_code'):
-             await db.promotions.update_one(
-                 {"code": booking['promo_code']},
-                 {"$inc": {"used_count": 1}}
-             )
-        
-        # 4. Schedule Zoom Meeting if Live Reading (Only on Payment Success)
-        meeting_link = booking.get('meeting_link')
-        if not meeting_link and str(booking.get('service_type', '')).startswith('live-'):
-            try:
-                raw_service = booking.get('service_type', '')
-                service_name = "Live Reading (20 Mins)" if '20' in raw_service else "Live Reading (40 Mins)"
-                topic = f"{service_name} with {booking.get('full_name')}"
-                start_time_iso = f"{booking.get('preferred_date')}T{booking.get('preferred_time')}:00"
-                duration = 20 if '20' in raw_service else 40
-                
-                logger.info(f"Scheduling Zoom meeting: {topic} at {start_time_iso}")
-                meeting_link = await zoom_service.create_meeting(topic, start_time_iso, duration, agenda=booking.get('situation_description', ''))
-                
-                if meeting_link:
-                    await db.bookings.update_one(
-                        {'booking_id': verification.booking_id},
-                        {"$set": {"meeting_link": meeting_link}}
-                    )
-                    logger.info(f"Zoom meeting created: {meeting_link}")
-            except Exception as e:
-                logger.error(f"Failed to create Zoom meeting in verification: {e}")
-
-        # Send confirmation emails in background
-        from services import email_service
-        
-        background_tasks.add_task(
-            email_service.send_booking_confirmation_to_client,
-            booking,
-            payment_verified,
-            meeting_link
-        )
-        background_tasks.add_task(
-            email_service.send_booking_notification_to_tejashvini,
-            booking,
-            payment_verified
-        )
+        # Calendar event and meeting link now, emails in background; anything that
+        # fails stays pending on the booking for the retry sweeper
+        await post_payment.run_steps(verification.booking_id, names=POST_PAYMENT_INLINE)
+        background_tasks.add_task(post_payment.run_steps, verification.booking_id)
         
         return {
             'success': True,
@@ -1761,6 +2461,28 @@ async def verify_payment(verification: PaymentVerification, background_tasks: Ba
         logger.error(f"Payment verification error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/payments/paypal/webhook")
+async def paypal_webhook(request: Request, background_tasks: BackgroundTasks):
+    """
+    PayPal webhook receiver. Stores the event and acknowledges straight away;
+    confirmation runs in the background. Redeliveries of a processed event
+    are acknowledged without doing anything.
+    """
+    try:
+        event = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    if not isinstance(event, dict) or not event.get('id'):
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+
+    if not await payment_service.verify_webhook(request.headers, event):
+        raise HTTPException(status_code=400, detail="Webhook signature verification failed")
+
+    stored = await payment_events.record(event)
+    # Also on redelivery: claim() skips events that are already processed or in progress
+    background_tasks.add_task(post_payment.process_event, event['id'])
+    return {'status': 'received' if stored else 'duplicate'}
+
 @api_router.post("/bookings/{booking_id}/resend-email")
 async def resend_email(
     booking_id: str, 
@@ -2009,14 +2731,39 @@ async def init_services(current_user: str = Depends(get_current_admin)):
                 upsert=True
             )
             if res.upserted_id: count += 1
+        pricing_snapshot.invalidate()
         return {"message": f"Initialized {count} new services. Defaults ensured."}
     except Exception as e:
         logger.error(f"Init services error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/services", response_model=List[ServicePrice])
-async def get_services():
-    return await db.services.find({}, {"_id": 0}).to_list(100)
+async def get_services(request: Request, response: Response):
+    pricing = await pricing_snapshot.get()
+    not_modified = conditional(request, response, pricing.services_etag, CATALOG_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    return pricing.service_list
+
+@api_router.get("/quotes")
+async def get_quotes(request: Request, response: Response, promo_code: Optional[str] = None):
+    """
+    Final prices for every service (base, discount, tax, emergency surcharge)
+    computed exactly as create_booking charges them, optionally with a promo
+    code. One call replaces /services + /campaign + /taxes/active math in the
+    browser.
+    """
+    pricing = await pricing_snapshot.get()
+    code_rule = pricing.discounts.code_rule(promo_code) if promo_code else None
+    result = {
+        "promo_code": promo_code,
+        "promo_valid": code_rule is not None if promo_code else None,
+        "quotes": pricing.quote_all(promo_code, fallback=PRICING_MAP),
+    }
+    not_modified = conditional(request, response, content_etag(result), CATALOG_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    return result
 
 @api_router.put("/services/{service_id}", response_model=ServicePrice)
 async def update_service(service_id: str, data: ServicePriceUpdate):
@@ -2029,6 +2776,7 @@ async def update_service(service_id: str, data: ServicePriceUpdate):
     )
     if not result:
         raise HTTPException(status_code=404, detail="Service not found")
+    pricing_snapshot.invalidate()
     return result
 
 # --- Promotions Routes ---
@@ -2047,6 +2795,7 @@ async def create_promotion(promo: PromotionCreate):
     new_promo = Promotion(**promo.model_dump())
     new_promo.code = new_promo.code.upper()
     await db.promotions.insert_one(new_promo.model_dump())
+    pricing_snapshot.invalidate()
     return new_promo
 
 @api_router.delete("/promotions/{promo_id}")
@@ -2054,24 +2803,23 @@ async def delete_promotion(promo_id: str):
     result = await db.promotions.update_one({"id": promo_id}, {"$set": {"is_active": False}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Promotion not found")
+    pricing_snapshot.invalidate()
     return {"success": True}
 
 # --- Campaign Routes ---
 
 @api_router.get("/campaign", response_model=Optional[GlobalCampaign])
-async def get_active_campaign():
+async def get_active_campaign(request: Request, response: Response):
     # Get the latest active campaign
-    campaign = await db.campaigns.find_one({"is_active": True}, sort=[("created_at", -1)], projection={"_id": 0})
-    if campaign:
-        # Check expiry
-        expiry = campaign.get('expiry_date')
-        if isinstance(expiry, str):
-            expiry = datetime.fromisoformat(expiry.replace("Z", "+00:00"))
-        
-        if expiry.replace(tzinfo=timezone.utc) < datetime.now(timezone.utc):
-            await db.campaigns.update_one({"id": campaign['id']}, {"$set": {"is_active": False}})
-            return None
-            
+    pricing = await pricing_snapshot.get()
+    await deactivate_expired_campaigns(pricing)
+    rule = pricing.discounts.automatic_rule()
+    campaign = rule.doc if rule else None
+
+    # Expiry changes the answer without a write, so tag the content itself
+    not_modified = conditional(request, response, content_etag(campaign))
+    if not_modified:
+        return not_modified
     return campaign
 
 @api_router.post("/campaign", response_model=GlobalCampaign)
@@ -2086,6 +2834,7 @@ async def set_campaign(campaign: GlobalCampaignCreate):
         is_active=True
     )
     await db.campaigns.insert_one(new_campaign.model_dump())
+    pricing_snapshot.invalidate()
     return new_campaign
 
 @api_router.delete("/campaign/{campaign_id}")
@@ -2094,6 +2843,7 @@ async def deactivate_campaign(campaign_id: str):
     if result.matched_count == 0:
         # Try to find any active one if ID mismatch? No, stick to ID.
         raise HTTPException(status_code=404, detail="Campaign not found")
+    pricing_snapshot.invalidate()
     return {"success": True}
 
 # --- Tax Configuration Endpoints ---
@@ -2105,10 +2855,13 @@ async def get_taxes(current_admin: str = Depends(get_current_admin)):
     return taxes
 
 @api_router.get("/taxes/active", response_model=Optional[Tax])
-async def get_active_tax():
+async def get_active_tax(request: Request, response: Response):
     """Fetch the currently active tax (Public)"""
-    tax = await db.taxes.find_one({"is_active": True}, sort=[("created_at", -1)], projection={"_id": 0})
-    return tax
+    pricing = await pricing_snapshot.get()
+    not_modified = conditional(request, response, pricing.tax_etag, CATALOG_CACHE_CONTROL)
+    if not_modified:
+        return not_modified
+    return pricing.tax
 
 @api_router.post("/taxes", response_model=Tax)
 async def create_tax(tax: TaxCreate, current_admin: str = Depends(get_current_admin)):
@@ -2122,12 +2875,14 @@ async def create_tax(tax: TaxCreate, current_admin: str = Depends(get_current_ad
         is_active=tax.is_active
     )
     await db.taxes.insert_one(new_tax.model_dump())
+    pricing_snapshot.invalidate()
     return new_tax
 
 @api_router.delete("/taxes/{tax_id}")
 async def delete_tax(tax_id: str, current_admin: str = Depends(get_current_admin)):
     """Delete a tax configuration (Admin only)"""
     result = await db.taxes.delete_one({"id": tax_id})
+    pricing_snapshot.invalidate()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Tax configuration not found")
     return {"message": "Tax configuration deleted successfully"}
@@ -0,0 +1,260 @@
+"""
+Parsers turning bulk availability input into window dicts
+({date, start_time, end_time, type}, times as HH:MM in the business
+timezone) for the /availability bulk endpoints.
+
+Each parser returns (windows, errors); errors are dicts with a `source`
+(row, event or template entry) and a `reason`, in the same shape the bulk
+endpoint reports rejected windows.
+"""
+import csv
+import io
+from datetime import date as date_type, datetime, timedelta
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+from services.availability_rules import occurrences, parse_rrule
+
+WINDOW_TYPES = ("regular", "emergency")
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# Windows one recurring ICS event may expand to (a bulk request takes at most 500)
+MAX_ICS_OCCURRENCES = 500
+
+
+def _normalize_time(value):
+    """'9:00' / '09:00' / '09:00:00' -> '09:00'; raises ValueError otherwise."""
+    parts = value.strip().split(':')
+    if len(parts) not in (2, 3) or not all(p.isdigit() for p in parts):
+        raise ValueError(f"Invalid time '{value}'")
+    hours, minutes = int(parts[0]), int(parts[1])
+    if not (0 <= hours <= 23 and 0 <= minutes <= 59):
+        raise ValueError(f"Invalid time '{value}'")
+    return f"{hours:02d}:{minutes:02d}"
+
+
+def _normalize_type(value):
+    window_type = (value or "regular").strip().lower()
+    if window_type not in WINDOW_TYPES:
+        raise ValueError(f"Unknown window type '{value}'")
+    return window_type
+
+
+def make_window(date_str, start_time, end_time, window_type="regular"):
+    """Validated window dict; raises ValueError with a user-facing reason."""
+    try:
+        day = datetime.strptime(date_str.strip(), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"Invalid date '{date_str}' (use YYYY-MM-DD)")
+    start = _normalize_time(start_time)
+    end = _normalize_time(end_time)
+    if end <= start:
+        raise ValueError("End time must be after start time")
+    return {"date": day.isoformat(), "start_time": start, "end_time": end, "type": _normalize_type(window_type)}
+
+
+def parse_csv(text):
+    """
+    CSV with a header row: date,start_time,end_time[,type]
+    (YYYY-MM-DD, HH:MM, HH:MM, regular|emergency).
+    """
+    windows, errors = [], []
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    fields = {f.strip().lower() for f in (reader.fieldnames or [])}
+    missing = {"date", "start_time", "end_time"} - fields
+    if missing:
+        return [], [{"source": "header", "reason": f"Missing columns: {', '.join(sorted(missing))}"}]
+
+    for row_number, row in enumerate(reader, start=2):
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        if not any(row.values()):
+            continue
+        try:
+            windows.append(make_window(row["date"], row["start_time"], row["end_time"], row.get("type")))
+        except (ValueError, KeyError) as e:
+            errors.append({"source": f"row {row_number}", "reason": str(e) or "Invalid row"})
+    return windows, errors
+
+
+def _unfold_ics(text):
+    lines = []
+    for raw in text.replace('\r\n', '\n').split('\n'):
+        if raw[:1] in (' ', '\t') and lines:
+            lines[-1] += raw[1:]
+        elif raw:
+            lines.append(raw)
+    return lines
+
+
+def _parse_ics_line(line):
+    """'NAME;PARAM=X:VALUE' -> (NAME, {PARAM: X}, VALUE)."""
+    head, _, value = line.partition(':')
+    name, *raw_params = head.split(';')
+    params = {}
+    for param in raw_params:
+        key, _, val = param.partition('=')
+        params[key.upper()] = val.strip('"')
+    return name.upper(), params, value
+
+
+def _source_datetime(value, params, tz):
+    """ICS DATE-TIME as an aware datetime in its own zone (UTC for Z, TZID, else `tz`)."""
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        raise ValueError("All-day events are not availability windows")
+    try:
+        if value.endswith('Z'):
+            return datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=ZoneInfo('UTC'))
+        source_tz = ZoneInfo(params['TZID']) if params.get('TZID') else tz
+        return datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=source_tz)
+    except (KeyError, LookupError):
+        raise ValueError(f"Unknown TZID '{params.get('TZID')}'")
+
+
+def parse_ics_datetime(value, params, tz):
+    """ICS DATE-TIME in UTC (Z), a TZID, or floating time, as an aware datetime in `tz`."""
+    return _source_datetime(value, params, tz).astimezone(tz)
+
+
+def _window(start, end, tz, window_type):
+    start, end = start.astimezone(tz), end.astimezone(tz)
+    if end.date() != start.date() and end != (start.replace(hour=0, minute=0) + timedelta(days=1)):
+        raise ValueError("Window must start and end on the same day")
+    end_time = "23:59" if end.date() != start.date() else end.strftime("%H:%M")
+    return make_window(start.date().isoformat(), start.strftime("%H:%M"), end_time, window_type)
+
+
+def _exdates(event, source_tz, tz):
+    """Skipped occurrence dates (YYYY-MM-DD in the event's zone) from all EXDATE lines."""
+    skipped = set()
+    for params, value in event.get('EXDATE', ()):
+        for item in value.split(','):
+            item = item.strip()
+            if params.get('VALUE') == 'DATE' or len(item) == 8:
+                skipped.add(datetime.strptime(item, "%Y%m%d").date().isoformat())
+            else:
+                skipped.add(_source_datetime(item, params, tz).astimezone(source_tz).date().isoformat())
+    return skipped
+
+
+def _windows_from_event(event, tz):
+    """
+    Windows for one parsed VEVENT ({NAME: (params, value)}, EXDATE as a list):
+    one window, or one per occurrence of a bounded RRULE.
+    """
+    if 'DTSTART' not in event:
+        raise ValueError("Missing DTSTART")
+    start = _source_datetime(event['DTSTART'][1], event['DTSTART'][0], tz)
+    if 'DTEND' in event:
+        end = _source_datetime(event['DTEND'][1], event['DTEND'][0], tz)
+    elif 'DURATION' in event:
+        end = start + parse_ics_duration(event['DURATION'][1])
+    else:
+        raise ValueError("Missing DTEND")
+    summary = event.get('SUMMARY', ({}, ''))[1]
+    window_type = "emergency" if "emergency" in summary.lower() else "regular"
+    if 'RRULE' not in event:
+        if 'RDATE' in event or 'RECURRENCE-ID' in event:
+            raise ValueError("RDATE and RECURRENCE-ID are not supported")
+        return [_window(start, end, tz, window_type)]
+
+    if 'RDATE' in event:
+        raise ValueError("RDATE is not supported")
+    # Occurrences keep the wall-clock times of DTSTART/DTEND in the event's own zone
+    rule = parse_rrule(event['RRULE'][1])
+    duration = end - start
+    windows = []
+    for day in occurrences(rule, start.date(), _exdates(event, start.tzinfo, tz), limit=MAX_ICS_OCCURRENCES):
+        occurrence = datetime.combine(day, start.time(), tzinfo=start.tzinfo)
+        windows.append(_window(occurrence, occurrence + duration, tz, window_type))
+    return windows
+
+
+def parse_ics_duration(value):
+    """ICS DURATION such as PT1H30M or P1DT2H."""
+    sign = -1 if value.startswith('-') else 1
+    value = value.lstrip('+-')
+    if not value.startswith('P'):
+        raise ValueError(f"Invalid DURATION '{value}'")
+    total = timedelta()
+    number = ''
+    in_time = False
+    units = {'W': 'weeks', 'D': 'days', 'H': 'hours', 'M': 'minutes', 'S': 'seconds'}
+    for ch in value[1:]:
+        if ch == 'T':
+            in_time = True
+        elif ch.isdigit():
+            number += ch
+        elif ch in units and number:
+            if ch == 'M' and not in_time:
+                raise ValueError(f"Invalid DURATION '{value}'")
+            total += timedelta(**{units[ch]: int(number)})
+            number = ''
+        else:
+            raise ValueError(f"Invalid DURATION '{value}'")
+    return sign * total
+
+
+def parse_ics(text, tz_name):
+    """
+    VEVENTs from an iCalendar file, one window each (one per occurrence for
+    a daily or weekly RRULE with UNTIL or COUNT, minus its EXDATEs; other
+    recurrences are rejected). An event is an emergency window when its
+    SUMMARY mentions "emergency".
+    """
+    tz = ZoneInfo(tz_name)
+    windows, errors = [], []
+    event = None
+    index = 0
+    for line in _unfold_ics(text):
+        name, params, value = _parse_ics_line(line)
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event = {}
+            index += 1
+        elif name == 'END' and value.upper() == 'VEVENT' and event is not None:
+            label = event.get('SUMMARY', ({}, ''))[1] or event.get('UID', ({}, ''))[1]
+            try:
+                windows.extend(_windows_from_event(event, tz))
+            except (ValueError, KeyError) as e:
+                errors.append({"source": f"event {index}" + (f" ({label})" if label else ""), "reason": str(e)})
+            event = None
+        elif name == 'EXDATE' and event is not None:
+            event.setdefault(name, []).append((params, value))
+        elif event is not None:
+            event[name] = (params, value)
+    if index == 0:
+        errors.append({"source": "file", "reason": "No VEVENT entries found"})
+    return windows, errors
+
+
+def expand_weekly_template(start_date, end_date, entries):
+    """
+    Windows for every date in [start_date, end_date] from weekly entries
+    ({weekday, start_time, end_time, type}; weekday is mon..sun or 0-6 with
+    Monday = 0).
+    """
+    windows, errors = [], []
+    by_weekday = {}
+    for position, entry in enumerate(entries, start=1):
+        try:
+            weekday = entry['weekday']
+            if isinstance(weekday, str) and not weekday.isdigit():
+                if weekday.strip().lower()[:3] not in WEEKDAYS:
+                    raise ValueError(f"Invalid weekday '{weekday}'")
+                weekday = WEEKDAYS.index(weekday.strip().lower()[:3])
+            weekday = int(weekday)
+            if not 0 <= weekday <= 6:
+                raise ValueError(f"Invalid weekday '{entry['weekday']}'")
+            # Validate once against a fixed date; real dates are filled in below
+            make_window("2000-01-03", entry['start_time'], entry['end_time'], entry.get('type'))
+            by_weekday.setdefault(weekday, []).append(entry)
+        except (ValueError, KeyError) as e:
+            errors.append({"source": f"template entry {position}", "reason": str(e) or "Invalid entry"})
+
+    day = start_date if isinstance(start_date, date_type) else datetime.strptime(start_date, "%Y-%m-%d").date()
+    last = end_date if isinstance(end_date, date_type) else datetime.strptime(end_date, "%Y-%m-%d").date()
+    while day <= last:
+        for entry in by_weekday.get(day.weekday(), []):
+            windows.append(make_window(day.isoformat(), entry['start_time'], entry['end_time'], entry.get('type')))
+        day += timedelta(days=1)
+    return windows, errors
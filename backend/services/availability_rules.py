@@ -0,0 +1,241 @@
+import logging
+import time
+import uuid
+from datetime import date as date_type, datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+RRULE_DAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+SUPPORTED_FREQS = ("DAILY", "WEEKLY")
+
+
+def _to_date(value):
+    if isinstance(value, date_type):
+        return value
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_rrule(rrule):
+    """
+    Parses the RRULE subset used for availability:
+    FREQ=DAILY|WEEKLY, INTERVAL, BYDAY (weekly only) and either UNTIL (date
+    or date-time) or COUNT. Returns a dict; raises ValueError for anything
+    else.
+    """
+    text = rrule.strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts = {}
+    for item in text.split(';'):
+        if not item:
+            continue
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid RRULE part '{item}'")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in SUPPORTED_FREQS:
+        raise ValueError("RRULE FREQ must be DAILY or WEEKLY")
+    rule = {"freq": freq, "interval": 1, "byday": None, "until": None, "count": None}
+    if "INTERVAL" in parts:
+        interval = parts.pop("INTERVAL")
+        if not interval.isdigit() or int(interval) < 1:
+            raise ValueError(f"Invalid RRULE INTERVAL '{interval}'")
+        rule["interval"] = int(interval)
+    if "BYDAY" in parts:
+        days = parts.pop("BYDAY").split(',')
+        if freq != "WEEKLY" or any(d not in RRULE_DAYS for d in days):
+            raise ValueError("RRULE BYDAY must list MO..SU on a WEEKLY rule")
+        rule["byday"] = sorted(RRULE_DAYS.index(d) for d in days)
+    if "UNTIL" in parts:
+        until = parts.pop("UNTIL")
+        try:
+            rule["until"] = datetime.strptime(until[:8], "%Y%m%d").date()
+        except ValueError:
+            raise ValueError(f"Invalid RRULE UNTIL '{until}'")
+    if "COUNT" in parts:
+        count = parts.pop("COUNT")
+        if not count.isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid RRULE COUNT '{count}'")
+        if rule["until"]:
+            raise ValueError("RRULE cannot have both UNTIL and COUNT")
+        rule["count"] = int(count)
+    if parts:
+        raise ValueError(f"Unsupported RRULE parts: {', '.join(sorted(parts))}")
+    return rule
+
+
+def build_rrule(weekdays, until=None, interval=1):
+    """Weekly RRULE for weekday numbers (Monday = 0)."""
+    rrule = f"FREQ=WEEKLY;BYDAY={','.join(RRULE_DAYS[d] for d in sorted(set(weekdays)))}"
+    if interval != 1:
+        rrule += f";INTERVAL={interval}"
+    if until:
+        rrule += f";UNTIL={_to_date(until).strftime('%Y%m%d')}"
+    return rrule
+
+
+def _occurrence_index(rule, dtstart, day):
+    """0-based position of `day` in the series, for a day the pattern matches."""
+    if rule["freq"] == "DAILY":
+        return (day - dtstart).days // rule["interval"]
+    byday = rule["byday"] if rule["byday"] is not None else [dtstart.weekday()]
+    week = ((day - dtstart).days + dtstart.weekday()) // 7
+    if week == 0:
+        return sum(1 for d in byday if dtstart.weekday() <= d < day.weekday())
+    first_week = sum(1 for d in byday if d >= dtstart.weekday())
+    return first_week + (week // rule["interval"] - 1) * len(byday) + sum(1 for d in byday if d < day.weekday())
+
+
+def _matches(rule, dtstart, day):
+    if rule["freq"] == "DAILY":
+        return (day - dtstart).days % rule["interval"] == 0
+    byday = rule["byday"] if rule["byday"] is not None else [dtstart.weekday()]
+    if day.weekday() not in byday:
+        return False
+    # Weeks counted from the Monday of dtstart's week (RFC 5545 default WKST)
+    week = ((day - dtstart).days + dtstart.weekday()) // 7
+    return week % rule["interval"] == 0
+
+
+def occurs_on(rule, dtstart, day, exdates=()):
+    """True if a parsed rule starting on `dtstart` has an occurrence on `day`."""
+    if day < dtstart or (rule["until"] and day > rule["until"]):
+        return False
+    if day.isoformat() in exdates or not _matches(rule, dtstart, day):
+        return False
+    # Skipped dates still count towards COUNT, as in RFC 5545
+    return rule["count"] is None or _occurrence_index(rule, dtstart, day) < rule["count"]
+
+
+def occurrences(rule, dtstart, exdates=(), limit=None):
+    """
+    Every occurrence date of a bounded (UNTIL or COUNT) rule. Raises
+    ValueError for an open-ended rule or one with more than `limit` dates.
+    """
+    if rule["until"] is None and rule["count"] is None:
+        raise ValueError("Recurring series needs UNTIL or COUNT")
+    days = []
+    day = dtstart
+    seen = 0
+    while (rule["until"] is None or day <= rule["until"]) and (rule["count"] is None or seen < rule["count"]):
+        if _matches(rule, dtstart, day):
+            seen += 1
+            if day.isoformat() not in exdates:
+                days.append(day)
+                if limit is not None and len(days) > limit:
+                    raise ValueError(f"Recurring series has more than {limit} occurrences")
+        day += timedelta(days=1)
+    return days
+
+
+class AvailabilityRules:
+    """
+    Recurring availability windows in `availability_rules`.
+
+    Each rule is one RRULE series (start/end time, type, start date and
+    exception dates) kept in MongoDB and cached in process; slot computation
+    expands it per day locally, so recurring windows need no Google Calendar
+    events or calls.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._rules = None  # id -> rule doc with "_parsed"/"_dtstart"
+        self.listeners = []
+
+    def add_listener(self, callback):
+        """Registers callback() called after any rule changes."""
+        self.listeners.append(callback)
+
+    def _notify(self):
+        for callback in self.listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Action=availability_rules_notify Status=failed Error={str(e)}", exc_info=True)
+
+    async def ensure_indexes(self):
+        await self.db.availability_rules.create_index("id", unique=True)
+        await self.load()
+
+    async def load(self):
+        start_time = time.time()
+        docs = await self.db.availability_rules.find({}, {"_id": 0}).to_list(None)
+        rules = {}
+        for doc in docs:
+            try:
+                rules[doc["id"]] = self._prepare(doc)
+            except ValueError as e:
+                logger.error(f"Action=availability_rules_load Status=invalid_rule RuleID={doc.get('id')} Error={str(e)}")
+        self._rules = rules
+        duration = (time.time() - start_time) * 1000
+        logger.info(f"Action=availability_rules_load Status=finished Count={len(rules)} Duration={duration:.2f}ms")
+
+    @staticmethod
+    def _prepare(doc):
+        return {**doc, "_parsed": parse_rrule(doc["rrule"]), "_dtstart": _to_date(doc["start_date"]),
+                "_exdates": frozenset(doc.get("exdates", []))}
+
+    @staticmethod
+    def public(rule):
+        return {k: v for k, v in rule.items() if not k.startswith("_")}
+
+    def list(self):
+        return [self.public(rule) for rule in (self._rules or {}).values()]
+
+    def get(self, rule_id):
+        rule = (self._rules or {}).get(rule_id)
+        return self.public(rule) if rule else None
+
+    def windows_for(self, day):
+        """[(start_time, end_time, type, rule_id)] of rule occurrences on a date."""
+        day = _to_date(day)
+        windows = []
+        for rule in (self._rules or {}).values():
+            if occurs_on(rule["_parsed"], rule["_dtstart"], day, rule["_exdates"]):
+                windows.append((rule["start_time"], rule["end_time"], rule["type"], rule["id"]))
+        return sorted(windows)
+
+    async def create(self, rrule, start_date, start_time, end_time, type="regular", exdates=None):
+        doc = {
+            "id": str(uuid.uuid4()),
+            "rrule": rrule,
+            "start_date": _to_date(start_date).isoformat(),
+            "start_time": start_time,
+            "end_time": end_time,
+            "type": type,
+            "exdates": sorted(set(exdates or [])),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        prepared = self._prepare(doc)  # validates the rule before storing it
+        await self.db.availability_rules.insert_one(dict(doc))
+        if self._rules is None:
+            await self.load()
+        self._rules[doc["id"]] = prepared
+        logger.info(f"Action=availability_rule_create RuleID={doc['id']} RRULE={rrule}")
+        self._notify()
+        return doc
+
+    async def delete(self, rule_id):
+        result = await self.db.availability_rules.delete_one({"id": rule_id})
+        if self._rules is not None:
+            self._rules.pop(rule_id, None)
+        if result.deleted_count:
+            self._notify()
+        return result.deleted_count > 0
+
+    async def add_exception(self, rule_id, day):
+        """Skips one occurrence. Returns the updated rule, or None if it does not exist."""
+        day = _to_date(day).isoformat()
+        doc = await self.db.availability_rules.find_one_and_update(
+            {"id": rule_id}, {"$addToSet": {"exdates": day}}, return_document=True, projection={"_id": 0}
+        )
+        if not doc:
+            return None
+        doc["exdates"] = sorted(doc.get("exdates", []))
+        if self._rules is not None:
+            self._rules[rule_id] = self._prepare(doc)
+        self._notify()
+        return doc
@@ -0,0 +1,128 @@
+"""
+Per-date UTC offsets and day boundaries for the business timezone.
+
+Offsets are worked out once per business date (memoized), so a day's slots
+are converted to UTC with plain arithmetic. A full ZoneInfo lookup per time
+is only needed on the few dates with a DST transition. Lookups use the
+offset of the date asked for, not today's, so queries across a DST switch
+get the right day boundaries.
+"""
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:
+    from backports.zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Business dates kept in the memo (about three years)
+DAY_CACHE_SIZE = 1024
+# Client zones and (zone, quarter-hour) offsets kept for slot rendering
+ZONE_CACHE_SIZE = 256
+OFFSET_CACHE_SIZE = 16384
+
+UTC_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+EPOCH = datetime(1970, 1, 1)
+
+BusinessDay = namedtuple("BusinessDay", "midnight start_offset end_offset start_iso end_iso has_transition")
+
+
+def format_offset(offset):
+    """timedelta -> '+05:30' / '-04:00'."""
+    sign = "-" if offset < timedelta(0) else "+"
+    minutes = abs(int(offset.total_seconds())) // 60
+    return f"{sign}{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+@lru_cache(maxsize=ZONE_CACHE_SIZE)
+def get_zone(tz_name):
+    """ZoneInfo for an IANA name; raises ValueError for unknown zones."""
+    try:
+        return ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        raise ValueError(f"Unknown timezone '{tz_name}'")
+
+
+@lru_cache(maxsize=OFFSET_CACHE_SIZE)
+def _quarter_offset(tz_name, quarter):
+    # Zone transitions fall on quarter-hour UTC boundaries, so one lookup serves the quarter
+    return datetime.fromtimestamp(quarter * 900, get_zone(tz_name)).utcoffset()
+
+
+def utc_to_local(utc_isos, tz_name):
+    """[(YYYY-MM-DD, HH:MM)] in `tz_name` for '...Z' UTC strings, using cached offsets."""
+    converted = []
+    for iso in utc_isos:
+        dt = datetime.strptime(iso, UTC_FORMAT)
+        quarter = int((dt - EPOCH).total_seconds()) // 900
+        local = dt + _quarter_offset(tz_name, quarter)
+        converted.append((local.strftime('%Y-%m-%d'), local.strftime('%H:%M')))
+    return converted
+
+
+class BusinessTime:
+    def __init__(self, tz_name):
+        self.tz_name = tz_name
+        self.tz = ZoneInfo(tz_name)
+        self.day = lru_cache(maxsize=DAY_CACHE_SIZE)(self._day)
+
+    def _day(self, date):
+        """BusinessDay for a YYYY-MM-DD date."""
+        midnight = datetime.fromisoformat(date)
+        start_offset = midnight.replace(tzinfo=self.tz).utcoffset()
+        last_second = midnight + timedelta(hours=23, minutes=59, seconds=59)
+        end_offset = last_second.replace(tzinfo=self.tz).utcoffset()
+        next_offset = (midnight + timedelta(days=1)).replace(tzinfo=self.tz).utcoffset()
+        return BusinessDay(
+            midnight=midnight,
+            start_offset=start_offset,
+            end_offset=end_offset,
+            start_iso=f"{date}T00:00:00{format_offset(start_offset)}",
+            end_iso=f"{date}T23:59:59{format_offset(end_offset)}",
+            has_transition=start_offset != next_offset,
+        )
+
+    def today(self):
+        return datetime.now(self.tz).date().isoformat()
+
+    def day_bounds(self, date):
+        """(start, end) ISO strings for one business day."""
+        day = self.day(date)
+        return day.start_iso, day.end_iso
+
+    def range_bounds(self, start_date, end_date):
+        """(start, end) ISO strings covering every business day in [start_date, end_date]."""
+        return self.day(start_date).start_iso, self.day(end_date).end_iso
+
+    def dates_for_zone(self, start_date, end_date, tz_name):
+        """Business dates overlapping the days [start_date, end_date] as seen in `tz_name`."""
+        zone = get_zone(tz_name)
+        first = datetime.fromisoformat(start_date).replace(tzinfo=zone).astimezone(self.tz).date()
+        end = (datetime.fromisoformat(end_date) + timedelta(days=1)).replace(tzinfo=zone)
+        last = (end.astimezone(timezone.utc) - timedelta(seconds=1)).astimezone(self.tz).date()
+        return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+    def offset(self, date, time_str="00:00"):
+        """UTC offset ('+01:00') in effect at a local wall-clock time on `date`."""
+        day = self.day(date)
+        if not day.has_transition:
+            return format_offset(day.start_offset)
+        hours, minutes = time_str.split(':')[:2]
+        local = day.midnight.replace(hour=int(hours), minute=int(minutes), tzinfo=self.tz)
+        return format_offset(local.utcoffset())
+
+    def local_iso(self, date, time_str):
+        """'YYYY-MM-DDTHH:MM:00+HH:MM' for a local HH:MM on `date`."""
+        return f"{date}T{time_str[:5]}:00{self.offset(date, time_str)}"
+
+    def to_utc(self, date, minutes_list):
+        """UTC ISO strings ('...Z') for minutes since business midnight of `date`, in one pass."""
+        day = self.day(date)
+        if not day.has_transition:
+            midnight_utc = day.midnight - day.start_offset
+            return [(midnight_utc + timedelta(minutes=m)).strftime(UTC_FORMAT) for m in minutes_list]
+        converted = []
+        for m in minutes_list:
+            local = (day.midnight + timedelta(minutes=m)).replace(tzinfo=self.tz)
+            converted.append(local.astimezone(timezone.utc).strftime(UTC_FORMAT))
+        return converted
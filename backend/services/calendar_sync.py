@@ -0,0 +1,334 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    from backports.zoneinfo import ZoneInfo
+
+import httpx
+from pymongo import DeleteOne, ReplaceOne
+from services.calendar_service import SyncTokenExpired, WINDOW_MARKERS, parse_event_time
+from services.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Seconds between incremental sync passes
+CALENDAR_SYNC_INTERVAL = float(os.environ.get('CALENDAR_SYNC_INTERVAL', '30'))
+
+# Seconds without a successful sync after which reads are flagged as stale
+CALENDAR_STALE_AFTER = float(os.environ.get('CALENDAR_STALE_AFTER', str(CALENDAR_SYNC_INTERVAL * 3)))
+
+# Days of past events a full sync mirrors; older reads go to the live client
+CALENDAR_SYNC_LOOKBACK_DAYS = float(os.environ.get('CALENDAR_SYNC_LOOKBACK_DAYS', '1'))
+
+
+def is_window_event(event):
+    summary = event.get('summary', '') or ''
+    return any(marker in summary for marker in WINDOW_MARKERS)
+
+
+def is_opaque_window(event):
+    """A window written before windows were made transparent; freebusy reports it as busy."""
+    return is_window_event(event) and event.get('transparency', 'opaque') != 'transparent'
+
+
+def as_aware(value):
+    # Mongo returns naive UTC datetimes
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class CalendarMirror:
+    """
+    MongoDB mirror of the primary Google Calendar.
+
+    A background worker keeps `calendar_events` current through the Calendar
+    API incremental feed (syncToken stored in `calendar_sync_state`). Reads
+    are served from the indexed mirror; until the first full sync has
+    completed, and for ranges starting before the mirrored window (a full
+    sync only lists events from CALENDAR_SYNC_LOOKBACK_DAYS ago onwards),
+    they fall through to the live client. Writes still go to Google and are
+    applied to the mirror immediately.
+
+    If Google stops answering, reads keep being served from the mirror (the
+    last good snapshot) and `stale` turns True; writes fail fast through the
+    client's circuit breaker.
+    """
+
+    STATE_ID = "primary"
+
+    def __init__(self, db, client, tz_name='UTC', interval=CALENDAR_SYNC_INTERVAL,
+                 lookback_days=CALENDAR_SYNC_LOOKBACK_DAYS):
+        self.db = db
+        self.client = client
+        self.tz = ZoneInfo(tz_name)
+        self.interval = interval
+        self.lookback = timedelta(days=lookback_days)
+        self.ready = False
+        self.last_synced_at = None
+        self.window_start = None  # None: the mirror holds the whole history
+        self.generation = 0  # stamped on every mirrored event; a full sync sweeps older ones
+        self.listeners = []
+        self.windows_checked = False  # make_windows_transparent has run in this process
+        self._lock = asyncio.Lock()
+
+    @property
+    def stale(self):
+        """True while reads may lag Google: circuit open or sync overdue."""
+        if self.client.breaker.is_open:
+            return True
+        if self.last_synced_at is None:
+            return False
+        return (datetime.now(timezone.utc) - self.last_synced_at).total_seconds() > CALENDAR_STALE_AFTER
+
+    def ensure_writable(self):
+        """Raises CircuitOpenError while calendar writes would be rejected."""
+        self.client.ensure_writable()
+
+    def add_listener(self, callback):
+        """Registers callback(dates) called with the business dates whose events changed."""
+        self.listeners.append(callback)
+
+    def _notify(self, dates):
+        if not dates:
+            return
+        for callback in self.listeners:
+            try:
+                callback(set(dates))
+            except Exception as e:
+                logger.error(f"Action=calendar_mirror_notify Status=failed Error={str(e)}", exc_info=True)
+
+    async def ensure_indexes(self):
+        await self.db.calendar_events.create_index("id", unique=True)
+        await self.db.calendar_events.create_index([("start_utc", 1), ("end_utc", 1)])
+        state = await self.db.calendar_sync_state.find_one({"_id": self.STATE_ID})
+        state = state or {}
+        self.ready = bool(state.get("sync_token"))
+        self.last_synced_at = as_aware(state.get("synced_at"))
+        self.window_start = as_aware(state.get("window_start"))
+        self.generation = state.get("generation", 0)
+
+    def _event_bounds(self, event):
+        """UTC start/end of an event; all-day dates are read in the business timezone."""
+        bounds = []
+        for key in ('start', 'end'):
+            raw = event.get(key) or {}
+            if raw.get('dateTime'):
+                bounds.append(parse_event_time(raw['dateTime']).astimezone(timezone.utc))
+            elif raw.get('date'):
+                local = datetime.fromisoformat(raw['date']).replace(tzinfo=self.tz)
+                bounds.append(local.astimezone(timezone.utc))
+            else:
+                return None, None
+        return bounds[0], bounds[1]
+
+    def _local_dates(self, start_utc, end_utc):
+        """Business dates (YYYY-MM-DD) touched by a UTC interval."""
+        if start_utc.tzinfo is None:
+            start_utc = start_utc.replace(tzinfo=timezone.utc)
+            end_utc = end_utc.replace(tzinfo=timezone.utc)
+        day = start_utc.astimezone(self.tz).date()
+        last = (end_utc - timedelta(microseconds=1)).astimezone(self.tz).date()
+        dates = set()
+        while day <= last:
+            dates.add(day.isoformat())
+            day += timedelta(days=1)
+        return dates
+
+    def event_dates(self, event):
+        """Business dates (YYYY-MM-DD) an event in Calendar API shape touches."""
+        start_utc, end_utc = self._event_bounds(event)
+        if start_utc is None:
+            return set()
+        return self._local_dates(start_utc, end_utc)
+
+    def _to_doc(self, event):
+        start_utc, end_utc = self._event_bounds(event)
+        if start_utc is None:
+            return None
+        return {
+            "id": event['id'],
+            "summary": event.get('summary', ''),
+            "description": event.get('description', ''),
+            "transparency": event.get('transparency', 'opaque'),
+            "status": event.get('status', 'confirmed'),
+            "start": event['start'],
+            "end": event['end'],
+            "start_utc": start_utc,
+            "end_utc": end_utc,
+            "updated": event.get('updated'),
+            "generation": self.generation,
+        }
+
+    async def _apply(self, items):
+        """Upserts/removes changed events in one bulk write; returns the business dates affected."""
+        # The feed's last entry for an event wins
+        latest = {event['id']: event for event in items}
+        if not latest:
+            return set()
+        changed = set()
+        previous = await self.db.calendar_events.find(
+            {"id": {"$in": list(latest)}}, {"_id": 0, "start_utc": 1, "end_utc": 1}
+        ).to_list(None)
+        for doc in previous:
+            changed |= self._local_dates(doc['start_utc'], doc['end_utc'])
+
+        operations = []
+        for event_id, event in latest.items():
+            doc = None if event.get('status') == 'cancelled' else self._to_doc(event)
+            if doc is None:
+                operations.append(DeleteOne({"id": event_id}))
+                continue
+            operations.append(ReplaceOne({"id": event_id}, doc, upsert=True))
+            changed |= self._local_dates(doc['start_utc'], doc['end_utc'])
+        await self.db.calendar_events.bulk_write(operations, ordered=False)
+        return changed
+
+    async def sync_once(self):
+        """Runs one sync pass (full if no valid token). Returns changed business dates."""
+        async with self._lock:
+            start_time = time.time()
+            state = await self.db.calendar_sync_state.find_one({"_id": self.STATE_ID})
+            token = state.get("sync_token") if state else None
+            full = token is None
+            items = next_token = None
+            if not full:
+                try:
+                    items, next_token = await self.client.sync_events(sync_token=token)
+                except SyncTokenExpired:
+                    full = True
+
+            window_start = self.window_start
+            if full:
+                # Events written while the listing runs carry the new generation and survive the sweep
+                self.generation += 1
+                window_start = datetime.now(timezone.utc) - self.lookback
+                items, next_token = await self.client.sync_events(time_min=window_start.isoformat())
+
+            changed = await self._apply(items)
+            if full:
+                # Everything the fresh listing did not stamp is gone (or before the window)
+                sweep = {"generation": {"$ne": self.generation}}
+                stale = await self.db.calendar_events.find(
+                    sweep, {"_id": 0, "start_utc": 1, "end_utc": 1}
+                ).to_list(None)
+                await self.db.calendar_events.delete_many(sweep)
+                for doc in stale:
+                    changed |= self._local_dates(doc['start_utc'], doc['end_utc'])
+
+            if next_token:
+                await self.db.calendar_sync_state.update_one(
+                    {"_id": self.STATE_ID},
+                    {"$set": {
+                        "sync_token": next_token,
+                        "synced_at": datetime.now(timezone.utc),
+                        "window_start": window_start,
+                        "generation": self.generation,
+                    }},
+                    upsert=True
+                )
+                self.window_start = window_start
+                self.ready = True
+            self.last_synced_at = datetime.now(timezone.utc)
+            duration = (time.time() - start_time) * 1000
+            logger.info(f"Action=calendar_sync Status=finished Full={full} Changes={len(items)} Dates={len(changed)} Duration={duration:.2f}ms")
+        self._notify(changed)
+        return changed
+
+    async def run(self):
+        """Background worker loop."""
+        while True:
+            try:
+                await self.sync_once()
+                if self.ready and not self.windows_checked:
+                    await self.make_windows_transparent()
+                    self.windows_checked = True
+            except asyncio.CancelledError:
+                raise
+            except (httpx.HTTPError, SyncTokenExpired, CircuitOpenError) as e:
+                logger.error(f"Action=calendar_sync Status=failed Error={str(e)}")
+            except Exception as e:
+                logger.error(f"Action=calendar_sync Status=failed Error={str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def make_windows_transparent(self):
+        """
+        One-time pass over availability windows created while windows were
+        still written opaque: each is re-saved, and the event body now marks it
+        transparent. Returns the number converted.
+        """
+        marker_filter = [{"summary": {"$regex": re.escape(marker)}} for marker in WINDOW_MARKERS]
+        docs = await self.db.calendar_events.find(
+            {"transparency": {"$ne": "transparent"}, "start.dateTime": {"$exists": True}, "$or": marker_filter},
+            {"_id": 0, "id": 1, "summary": 1, "description": 1, "start": 1, "end": 1}
+        ).to_list(None)
+        converted = 0
+        for doc in docs:
+            event = await self.update_event(
+                doc['id'], doc['summary'], doc['start']['dateTime'], doc['end']['dateTime'],
+                description=doc.get('description', '')
+            )
+            if event:
+                converted += 1
+        if docs:
+            logger.info(f"Action=calendar_windows_transparent Status=finished Converted={converted} Failed={len(docs) - converted}")
+        return converted
+
+    # --- Reads ---
+
+    async def list_events(self, start_iso, end_iso):
+        """Events overlapping [start_iso, end_iso), in Calendar API shape, ordered by start."""
+        start_dt = parse_event_time(start_iso)
+        if not self.ready or (self.window_start and start_dt < self.window_start):
+            return await self.client.list_events(start_iso, end_iso)
+        end_dt = parse_event_time(end_iso)
+        return await self.db.calendar_events.find(
+            {"start_utc": {"$lt": end_dt}, "end_utc": {"$gt": start_dt}},
+            {"_id": 0, "start_utc": 0, "end_utc": 0, "generation": 0}
+        ).sort("start_utc", 1).to_list(None)
+
+    async def get_event(self, event_id):
+        if self.ready:
+            event = await self.db.calendar_events.find_one({"id": event_id}, {"_id": 0, "start_utc": 0, "end_utc": 0, "generation": 0})
+            if event:
+                return event
+        return await self.client.get_event(event_id)
+
+    # --- Writes (Google first, then mirror) ---
+
+    async def create_event(self, summary, start_iso, end_iso, attendees_emails=None, description=""):
+        event = await self.client.create_event(summary, start_iso, end_iso, attendees_emails=attendees_emails, description=description)
+        if event:
+            self._notify(await self._apply([event]))
+        return event
+
+    async def update_event(self, event_id, summary, start_iso, end_iso, description=""):
+        event = await self.client.update_event(event_id, summary, start_iso, end_iso, description=description)
+        if event:
+            self._notify(await self._apply([event]))
+        return event
+
+    async def create_events(self, specs):
+        events = await self.client.create_events(specs)
+        created = [event for event in events if event]
+        if created:
+            self._notify(await self._apply(created))
+        return events
+
+    async def delete_events(self, event_ids):
+        results = await self.client.delete_events(event_ids)
+        deleted = [event_id for event_id, ok in results.items() if ok]
+        if deleted:
+            self._notify(await self._apply([{"id": event_id, "status": "cancelled"} for event_id in deleted]))
+        return results
+
+    async def delete_event(self, event_id):
+        deleted = await self.client.delete_event(event_id)
+        if deleted:
+            self._notify(await self._apply([{"id": event_id, "status": "cancelled"}]))
+        return deleted
@@ -0,0 +1,89 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that open the circuit, and seconds before a probe is let through
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_TIMEOUT = float(os.environ.get('CIRCUIT_RESET_TIMEOUT', '30'))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for an external dependency.
+
+    closed: calls go through. After `failure_threshold` failures in a row the
+    circuit opens and calls are rejected without waiting on the dependency.
+    After `reset_timeout` seconds one probe call is allowed (half-open); its
+    outcome closes the circuit again or restarts the timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    @property
+    def is_open(self):
+        """True while calls are being rejected (open, or half-open with a probe in flight)."""
+        state = self.state
+        return state == self.OPEN or (state == self.HALF_OPEN and self._probing)
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def before_call(self):
+        """Raises CircuitOpenError if the call must not go out."""
+        state = self.state
+        if state == self.CLOSED:
+            return
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            logger.info(f"Action=circuit_probe Circuit={self.name}")
+            return
+        raise CircuitOpenError(self.name, self.retry_after() or self.reset_timeout)
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"Action=circuit_close Circuit={self.name}")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release_probe(self):
+        """Lets another probe through when one ended without a verdict (e.g. cancelled)."""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or (self.opened_at is None and self.failures >= self.failure_threshold):
+            logger.warning(f"Action=circuit_open Circuit={self.name} Failures={self.failures}")
+            self.opened_at = time.monotonic()
+        self._probing = False
@@ -0,0 +1,151 @@
+"""
+One discount model for the three discount sources: promotions
+(db.promotions, code + usage limit), offers (db.offers, code + date window)
+and campaigns (db.campaigns, automatic until expiry).
+
+Every source compiles to DiscountRule; a DiscountEngine indexes the rules
+once per pricing snapshot and answers "best applicable discount" with a
+dict lookup and a short precedence-ordered scan. Precedence is the same
+everywhere:
+
+1. a code the customer entered (promotion before offer for the same code)
+2. otherwise the automatic campaign
+3. among campaigns the larger discount, then the newer one
+"""
+from datetime import datetime, timezone
+
+# Services that never receive discounts
+NO_DISCOUNT_SERVICES = ("tiktok-live",)
+
+SOURCE_PRIORITY = {"promotion": 0, "offer": 1, "campaign": 2}
+
+
+def as_utc(value):
+    """Stored date (ISO string or datetime, naive meaning UTC) as an aware UTC datetime, or None."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+class DiscountRule:
+    __slots__ = ("source", "id", "code", "discount_type", "value", "starts_at", "ends_at",
+                 "exhausted", "text", "offer_type", "created_at", "doc")
+
+    def __init__(self, source, doc, code=None, discount_type="percentage", value=0.0,
+                 starts_at=None, ends_at=None, exhausted=False, text="", offer_type="promo"):
+        self.source = source
+        self.id = doc.get("id")
+        self.code = code
+        self.discount_type = discount_type
+        self.value = float(value or 0)
+        self.starts_at = starts_at
+        self.ends_at = ends_at
+        self.exhausted = exhausted
+        self.text = text
+        self.offer_type = offer_type
+        self.created_at = str(doc.get("created_at", ""))
+        self.doc = doc
+
+    @classmethod
+    def from_promotion(cls, doc):
+        return cls(
+            "promotion", doc, code=doc["code"].upper(), discount_type=doc.get("discount_type", "percentage"),
+            value=doc.get("discount_value"), exhausted=doc.get("used_count", 0) >= doc.get("usage_limit", 0),
+            text=doc["code"], offer_type="promo"
+        )
+
+    @classmethod
+    def from_offer(cls, doc):
+        return cls(
+            "offer", doc, code=doc["code"].upper(), value=doc.get("discount_percent"),
+            starts_at=as_utc(doc.get("start_date")), ends_at=as_utc(doc.get("end_date")),
+            text=doc.get("text", ""), offer_type=doc.get("type", "promo")
+        )
+
+    @classmethod
+    def from_campaign(cls, doc):
+        # A campaign without a readable expiry is treated as expired, as before
+        return cls(
+            "campaign", doc, value=doc.get("discount_percentage"), ends_at=as_utc(doc.get("expiry_date")) or datetime.min.replace(tzinfo=timezone.utc),
+            text=doc.get("message", "Special Campaign"), offer_type="website"
+        )
+
+    def is_valid(self, now):
+        if self.exhausted:
+            return False
+        if self.starts_at and now < self.starts_at:
+            return False
+        if self.ends_at and now > self.ends_at:
+            return False
+        return True
+
+    def discount_on(self, amount):
+        if self.discount_type == "percentage":
+            return (self.value / 100.0) * amount
+        return self.value
+
+
+class DiscountEngine:
+    """Indexed, precedence-ordered discount rules for one pricing snapshot."""
+
+    def __init__(self, rules):
+        self.by_code = {}
+        automatic = []
+        for rule in rules:
+            if rule.code:
+                self.by_code.setdefault(rule.code, []).append(rule)
+            else:
+                automatic.append(rule)
+        # Stable sorts: newest first, then the precedence that actually decides
+        for code_rules in self.by_code.values():
+            # Same code in several sources: promotion first, then offer
+            code_rules.sort(key=lambda r: r.created_at, reverse=True)
+            code_rules.sort(key=lambda r: SOURCE_PRIORITY[r.source])
+        automatic.sort(key=lambda r: r.created_at, reverse=True)
+        # Larger discount first (percentages compared on a notional 100)
+        self.automatic = sorted(automatic, key=lambda r: -r.discount_on(100.0))
+
+    @classmethod
+    def compile(cls, promotions, offers, campaigns):
+        rules = [DiscountRule.from_promotion(p) for p in promotions if p.get("code")]
+        rules += [DiscountRule.from_offer(o) for o in offers if o.get("code")]
+        rules += [DiscountRule.from_campaign(c) for c in campaigns]
+        return cls(rules)
+
+    def code_rule(self, code, now=None):
+        """Valid rule for an entered code, or None."""
+        if not code:
+            return None
+        now = now or datetime.now(timezone.utc)
+        for rule in self.by_code.get(code.strip().upper(), ()):
+            if rule.is_valid(now):
+                return rule
+        return None
+
+    def code_rules(self, code):
+        """Every rule for a code regardless of validity (for precise error messages)."""
+        return list(self.by_code.get((code or "").strip().upper(), ()))
+
+    def automatic_rule(self, now=None):
+        """Best automatic (campaign) rule in effect."""
+        now = now or datetime.now(timezone.utc)
+        for rule in self.automatic:
+            if rule.is_valid(now):
+                return rule
+        return None
+
+    def expired_automatic(self, now=None):
+        now = now or datetime.now(timezone.utc)
+        return [rule for rule in self.automatic if rule.ends_at and now > rule.ends_at]
+
+    def best(self, service_type, code=None, now=None):
+        """The discount that applies to a booking of `service_type`, or None."""
+        if service_type in NO_DISCOUNT_SERVICES:
+            return None
+        now = now or datetime.now(timezone.utc)
+        return self.code_rule(code, now) or self.automatic_rule(now)
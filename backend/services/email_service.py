@@ -71,7 +71,7 @@ def send_email(to_email: str, subject: str, body_html: str, attachments: list =
         return None
 
 def send_booking_confirmation_to_client(booking: dict, payment_info: dict = None, meeting_link: str = None):
-    """Sends confirmation email to the user with multiple attachments."""
+    """Sends confirmation email to the user with multiple attachments. Returns True if it went out."""
     booking_id = booking.get('booking_id', 'unknown')
     masked_email = mask_pii(booking.get('email'))
     logger.info(f"Action=send_booking_confirmation_to_client Status=started BookingID={booking_id} User={masked_email}")
@@ -187,22 +187,24 @@ def send_booking_confirmation_to_client(booking: dict, payment_info: dict = None
                 logger.error(f"Action=process_aura_image Status=failed BookingID={booking_id} Error={str(e)}", exc_info=True)
 
         if recipient_email:
-            send_email(recipient_email, subject, body, attachments=attachments)
+            sent = send_email(recipient_email, subject, body, attachments=attachments)
             logger.info(f"Action=send_booking_confirmation_to_client Status=finished BookingID={booking_id}")
+            return sent is not None
         else:
             logger.error(f"Action=send_booking_confirmation_to_client Status=failed BookingID={booking_id} Reason=missing_email")
             
     except Exception as e:
         logger.error(f"Action=send_booking_confirmation_to_client Status=failed BookingID={booking_id} Error={str(e)}", exc_info=True)
+    return False
 
 def send_booking_notification_to_tejashvini(booking: dict, payment_info: dict = None):
-    """Sends alert to admin with same attachments."""
+    """Sends alert to admin with same attachments. Returns True if it went out."""
     booking_id = booking.get('booking_id', 'unknown')
     logger.info(f"Action=send_booking_notification_to_tejashvini Status=started BookingID={booking_id}")
     
     if not ADMIN_EMAIL:
         logger.warning(f"Action=send_booking_notification_to_tejashvini Status=failed BookingID={booking_id} Reason=missing_admin_email")
-        return
+        return False
 
     try:
         subject = f"NEW BOOKING: {booking.get('full_name')} - {booking.get('service_type')}"
@@ -250,10 +252,12 @@ def send_booking_notification_to_tejashvini(booking: dict, payment_info: dict =
                     attachments.append({'name': filename, 'data': image_bytes})
              except: pass
 
-        send_email(ADMIN_EMAIL, subject, body, attachments=attachments)
+        sent = send_email(ADMIN_EMAIL, subject, body, attachments=attachments)
         logger.info(f"Action=send_booking_notification_to_tejashvini Status=finished BookingID={booking_id}")
+        return sent is not None
     except Exception as e:
         logger.error(f"Action=send_booking_notification_to_tejashvini Status=failed BookingID={booking_id} Error={str(e)}", exc_info=True)
+    return False
 
 def send_password_reset_otp(email: str, otp: str):
     """Sends password reset OTP."""
@@ -0,0 +1,70 @@
+import hashlib
+import json
+import uuid
+
+from fastapi import Request, Response
+
+# Revalidate on every use; 304s keep repeat loads cheap
+NO_CACHE = "no-cache"
+# Catalog data changes rarely; its tags come from the data itself
+CATALOG_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+
+class ResourceVersions:
+    """
+    In-process change counters for cacheable resources.
+
+    Writers call `bump(key)`; readers build an ETag from the counters their
+    response depends on. A per-process boot id is mixed in so tags issued
+    before a restart never match.
+    """
+
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._versions = {}
+
+    def bump(self, *keys):
+        for key in keys:
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def bump_days(self, dates):
+        """Listener form for CalendarMirror/SlotInventory-style date sets."""
+        self.bump(*(f"day:{d}" for d in dates if d))
+
+    def version(self, key):
+        return self._versions.get(key, 0)
+
+    def etag(self, *parts):
+        digest = hashlib.sha1(repr((self.boot_id,) + parts).encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+
+def content_etag(data):
+    """ETag from the data itself, for resources that change without a write (e.g. expiry)."""
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2)
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def conditional(request: Request, response: Response, etag, cache_control=NO_CACHE):
+    """
+    Sets ETag/Cache-Control on `response`. Returns a 304 Response to send
+    instead of the body when the client's If-None-Match already has it.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if _matches(request.headers.get("if-none-match"), etag):
+        stale = response.headers.get("X-Data-Stale")
+        if stale:
+            headers["X-Data-Stale"] = stale
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
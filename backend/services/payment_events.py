@@ -0,0 +1,117 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Webhook events that mean the money has been captured (v1 Payments API)
+COMPLETED_EVENTS = ("PAYMENT.SALE.COMPLETED",)
+
+# Minutes after which an event still marked processing (its worker died) can be claimed again
+PAYMENT_EVENT_LEASE = float(os.environ.get('PAYMENT_EVENT_LEASE', '10'))
+
+
+def event_payment_id(event):
+    """PayPal payment id an event belongs to (a sale points at its parent payment)."""
+    resource = event.get("resource") or {}
+    return resource.get("parent_payment") or resource.get("id")
+
+
+class PaymentEvents:
+    """
+    PayPal webhook events in `payment_events`, one document per event id.
+
+    The unique event_id index makes storing a delivery a single insert, so
+    PayPal's redeliveries are recognised without any lookup. Processing is
+    claimed atomically (received/failed -> processing), so an event runs at
+    most once at a time. A claim is a lease: an event left in processing for
+    longer than PAYMENT_EVENT_LEASE minutes can be claimed again.
+
+    The webhook is acknowledged before processing, so PayPal never redelivers
+    an event that failed here; `retryable` lists them for the local retry
+    sweeper (PostPayment.run).
+    """
+
+    def __init__(self, db, lease=PAYMENT_EVENT_LEASE):
+        self.db = db
+        self.lease = lease
+
+    async def ensure_indexes(self):
+        await self.db.payment_events.create_index("event_id", unique=True)
+        await self.db.payment_events.create_index([("payment_id", 1), ("event_type", 1)])
+        await self.db.payment_events.create_index("status")
+
+    async def record(self, event):
+        """Stores a webhook event. Returns False if it was already stored."""
+        try:
+            await self.db.payment_events.insert_one({
+                "event_id": event["id"],
+                "event_type": event.get("event_type"),
+                "payment_id": event_payment_id(event),
+                "resource": event.get("resource") or {},
+                "status": "received",
+                "attempts": 0,
+                "received_at": datetime.now(timezone.utc),
+            })
+        except DuplicateKeyError:
+            logger.info(f"Action=payment_event_record Status=duplicate EventID={event['id']}")
+            return False
+        logger.info(f"Action=payment_event_record Status=finished EventID={event['id']} EventType={event.get('event_type')}")
+        return True
+
+    def _claimable(self, now):
+        return {"$or": [
+            {"status": {"$in": ["received", "failed"]}},
+            {"status": "processing", "processing_since": {"$lt": now - timedelta(minutes=self.lease)}},
+        ]}
+
+    async def claim(self, event_id):
+        """
+        Marks an unprocessed, failed or stale event as processing. Returns the
+        event as it was before the claim, or None if it is not claimable.
+        """
+        now = datetime.now(timezone.utc)
+        return await self.db.payment_events.find_one_and_update(
+            {"event_id": event_id, **self._claimable(now)},
+            {"$set": {"status": "processing", "processing_since": now}, "$inc": {"attempts": 1}},
+            projection={"_id": 0}
+        )
+
+    async def retryable(self, max_attempts):
+        """Ids of events claim() would take (failed, never run, lease expired) with attempts left."""
+        now = datetime.now(timezone.utc)
+        docs = await self.db.payment_events.find(
+            {**self._claimable(now), "attempts": {"$lt": max_attempts}}, {"_id": 0, "event_id": 1}
+        ).sort("received_at", 1).to_list(None)
+        return [doc["event_id"] for doc in docs]
+
+    async def finish(self, event_id, status, error=None):
+        update = {"status": status, "processed_at": datetime.now(timezone.utc)}
+        if error:
+            update["error"] = error
+        await self.db.payment_events.update_one({"event_id": event_id}, {"$set": update})
+        logger.info(f"Action=payment_event_process Status={status} EventID={event_id}")
+
+    async def completed_payment(self, payment_id):
+        """The stored completion event for a payment, or None."""
+        if not payment_id:
+            return None
+        return await self.db.payment_events.find_one(
+            {"payment_id": payment_id, "event_type": {"$in": list(COMPLETED_EVENTS)}},
+            {"_id": 0}
+        )
+
+    @staticmethod
+    def payment_info(event):
+        """A completion event in the shape verify_paypal_payment returns."""
+        resource = event.get("resource") or {}
+        amount = resource.get("amount") or {}
+        return {
+            'success': resource.get("state") == "completed",
+            'payment_status': 'approved',
+            'transaction_id': event.get("payment_id") or event_payment_id(event),
+            'amount': float(amount.get("total", 0)),
+            'currency': amount.get("currency")
+        }
@@ -1,9 +1,10 @@
 # import stripe
 # import razorpay
-import paypalrestsdk
+import asyncio
 import os
 import logging
 import time
+import httpx
 from typing import Dict, Any
 from dotenv import load_dotenv
 from pathlib import Path
@@ -25,26 +26,172 @@ else:
     logger.error(f"Action=paypal_config Status=failed Error='Invalid APP_ENV: {app_env}'")
     raise ValueError(f"CRITICAL: Invalid APP_ENV '{app_env}'. Must be 'development' or 'production'.")
 
-paypalrestsdk.configure({
-    "mode": paypal_mode,
-    "client_id": os.getenv('PAYPAL_CLIENT_ID', ''),
-    "client_secret": os.getenv('PAYPAL_CLIENT_SECRET', '')
-})
+# Set PAYPAL_API_URL to a local PayPal stand-in server to run without PayPal
+PAYPAL_API_URLS = {
+    'live': 'https://api-m.paypal.com',
+    'sandbox': 'https://api-m.sandbox.paypal.com'
+}
+
+# Async client settings (REST endpoint, per-call timeout in seconds, pool size)
+PAYPAL_API_URL = os.getenv('PAYPAL_API_URL', PAYPAL_API_URLS[paypal_mode])
+PAYPAL_TIMEOUT = float(os.getenv('PAYPAL_TIMEOUT', '15'))
+PAYPAL_MAX_CONNECTIONS = int(os.getenv('PAYPAL_MAX_CONNECTIONS', '10'))
+
+# Extra attempts for idempotent calls on network errors, 429 and 5xx
+PAYPAL_MAX_RETRIES = int(os.getenv('PAYPAL_MAX_RETRIES', '2'))
+PAYPAL_RETRY_BACKOFF = 0.5
+
+# Seconds before expiry at which a cached access token is refreshed
+PAYPAL_TOKEN_REFRESH_MARGIN = 300
+
+# Webhook id from the PayPal app settings; webhook deliveries are rejected without it
+PAYPAL_WEBHOOK_ID = os.getenv('PAYPAL_WEBHOOK_ID', '')
 
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
 
-class PaymentService:
-    
+class PayPalError(Exception):
+    """PayPal answered with an error status; `details` is the decoded error body."""
+
+    def __init__(self, status_code, details):
+        super().__init__(f"PayPal returned {status_code}: {details}")
+        self.status_code = status_code
+        self.details = details
+
+
+class AsyncPayPalClient:
+    """
+    Async PayPal REST client on one shared httpx connection pool.
+
+    The OAuth access token is cached and refreshed once (under a lock) shortly
+    before it expires, or straight away if PayPal rejects it. GETs and calls
+    sent with a PayPal-Request-Id (which PayPal deduplicates) are retried with
+    backoff on network errors, 429 and 5xx; other calls are sent once.
+    """
+
+    def __init__(self, base_url=PAYPAL_API_URL, client_id=None, client_secret=None,
+                 timeout=PAYPAL_TIMEOUT, max_retries=PAYPAL_MAX_RETRIES):
+        self.base_url = base_url.rstrip('/')
+        self.client_id = client_id if client_id is not None else os.getenv('PAYPAL_CLIENT_ID', '')
+        self.client_secret = client_secret if client_secret is not None else os.getenv('PAYPAL_CLIENT_SECRET', '')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+
+    @property
+    def is_configured(self):
+        return bool(self.client_id)
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=PAYPAL_MAX_CONNECTIONS,
+                    max_keepalive_connections=PAYPAL_MAX_CONNECTIONS
+                )
+            )
+        return self._client
+
+    def _token_valid(self):
+        return self._token is not None and time.time() < self._token_expires_at
+
+    async def _access_token(self):
+        if self._token_valid():
+            return self._token
+        async with self._token_lock:
+            if not self._token_valid():
+                start_time = time.time()
+                response = await self._get_client().post(
+                    '/v1/oauth2/token',
+                    data={'grant_type': 'client_credentials'},
+                    auth=(self.client_id, self.client_secret),
+                    headers={'Accept': 'application/json'}
+                )
+                if response.status_code >= 400:
+                    raise PayPalError(response.status_code, self._error_body(response))
+                token = response.json()
+                expires_in = float(token.get('expires_in', 0))
+                self._token = token['access_token']
+                self._token_expires_at = start_time + max(expires_in - PAYPAL_TOKEN_REFRESH_MARGIN, expires_in / 2)
+                duration = (time.time() - start_time) * 1000
+                logger.info(f"Action=paypal_token_refresh Status=finished ExpiresIn={expires_in:.0f}s Duration={duration:.2f}ms")
+        return self._token
+
+    def invalidate_token(self):
+        self._token = None
+        self._token_expires_at = 0.0
+
     @staticmethod
-    def create_paypal_payment(amount: float, currency: str, booking_data: Dict[str, Any]):
+    def _error_body(response):
+        try:
+            return response.json()
+        except ValueError:
+            return response.text
+
+    async def request(self, method, path, json=None, request_id=None, timeout=None):
+        """
+        Sends one REST call and returns the decoded body. Raises PayPalError for
+        error statuses and httpx.HTTPError when PayPal cannot be reached.
+        """
+        retries = self.max_retries if method == 'GET' or request_id else 0
+        attempt = 0
+        token_refreshed = False
+        while True:
+            try:
+                headers = {'Authorization': f'Bearer {await self._access_token()}'}
+                if request_id:
+                    headers['PayPal-Request-Id'] = request_id
+                response = await self._get_client().request(
+                    method, path, json=json, headers=headers, timeout=timeout or self.timeout
+                )
+            except httpx.TransportError as err:
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                logger.warning(f"Action=paypal_request Status=retry Method={method} Path={path} Attempt={attempt} Error={str(err)}")
+                await asyncio.sleep(PAYPAL_RETRY_BACKOFF * 2 ** (attempt - 1))
+                continue
+
+            status = response.status_code
+            if status == 401 and not token_refreshed:
+                # Token revoked or expired early; the call was rejected, so resending is safe
+                self.invalidate_token()
+                token_refreshed = True
+                continue
+            if (status == 429 or status >= 500) and attempt < retries:
+                attempt += 1
+                logger.warning(f"Action=paypal_request Status=retry Method={method} Path={path} Attempt={attempt} HTTPStatus={status}")
+                await asyncio.sleep(PAYPAL_RETRY_BACKOFF * 2 ** (attempt - 1))
+                continue
+            if status >= 400:
+                raise PayPalError(status, self._error_body(response))
+            if not response.content:
+                return {}
+            return response.json()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class PaymentService:
+
+    def __init__(self, client=None):
+        self.client = client or AsyncPayPalClient()
+
+    async def create_paypal_payment(self, amount: float, currency: str, booking_data: Dict[str, Any]):
         """Create PayPal payment."""
         booking_id = booking_data.get('booking_id', 'unknown')
         logger.info(f"Action=create_paypal_payment Status=started BookingID={booking_id} Amount={amount} Currency={currency}")
         
         start_time = time.time()
         try:
-            pp_client = os.getenv('PAYPAL_CLIENT_ID', '')
-            if not pp_client:
+            if not self.client.is_configured:
                 logger.error(f"Action=create_paypal_payment Status=failed BookingID={booking_id} Reason=missing_client_id")
                 return {'success': False, 'error': "PayPal configuration missing"}
             
@@ -52,8 +199,8 @@ class PaymentService:
             tax_amount = booking_data.get('tax_amount', 0.0)
             subtotal = amount - tax_amount
 
-            # PayPal implementation
-            payment = paypalrestsdk.Payment({
+            # One payment per booking: PayPal deduplicates retries on the request id
+            payment = await self.client.request('POST', '/v1/payments/payment', request_id=f"create-{booking_id}", json={
                 "intent": "sale",
                 "payer": {"payment_method": "paypal"},
                 "redirect_urls": {
@@ -82,67 +229,95 @@ class PaymentService:
                 }]
             })
             
-            if payment.create():
-                approval_url = next(link.href for link in payment.links if link.rel == 'approval_url')
-                duration = (time.time() - start_time) * 1000
-                logger.info(f"Action=create_paypal_payment Status=finished BookingID={booking_id} PaymentID={payment.id} Duration={duration:.2f}ms")
-                return {
-                    'success': True,
-                    'payment_id': payment.id,
-                    'approval_url': approval_url,
-                    'payment_method': 'paypal'
-                }
-            else:
-                duration = (time.time() - start_time) * 1000
-                logger.error(f"Action=create_paypal_payment Status=failed BookingID={booking_id} Error={str(payment.error)} Duration={duration:.2f}ms")
-                return {'success': False, 'error': payment.error}
+            approval_url = next(link['href'] for link in payment.get('links', []) if link.get('rel') == 'approval_url')
+            duration = (time.time() - start_time) * 1000
+            logger.info(f"Action=create_paypal_payment Status=finished BookingID={booking_id} PaymentID={payment['id']} Duration={duration:.2f}ms")
+            return {
+                'success': True,
+                'payment_id': payment['id'],
+                'approval_url': approval_url,
+                'payment_method': 'paypal'
+            }
+        except PayPalError as e:
+            duration = (time.time() - start_time) * 1000
+            logger.error(f"Action=create_paypal_payment Status=failed BookingID={booking_id} Error={str(e.details)} Duration={duration:.2f}ms")
+            return {'success': False, 'error': e.details}
         except Exception as e:
             duration = (time.time() - start_time) * 1000
             logger.error(f"Action=create_paypal_payment Status=failed BookingID={booking_id} Error={str(e)} Duration={duration:.2f}ms", exc_info=True)
             return {'success': False, 'error': "Technical Error: Unable to initiate payment."}
     
-    @staticmethod
-    def verify_paypal_payment(payment_id: str, payer_id: str = None):
+    async def verify_paypal_payment(self, payment_id: str, payer_id: str = None):
         """Verify PayPal payment."""
         logger.info(f"Action=verify_paypal_payment Status=started PaymentID={payment_id} PayerID={payer_id}")
         
         start_time = time.time()
         try:
+            payment = await self.client.request('GET', f'/v1/payments/payment/{payment_id}')
 
-            payment = paypalrestsdk.Payment.find(payment_id)
-            
-            exec_payer_id = payer_id
-            if not exec_payer_id:
-                try:
-                    exec_payer_id = payment.payer.payer_info.payer_id
-                except AttributeError:
-                    pass
-            
-            if not exec_payer_id:
-                logger.error(f"Action=verify_paypal_payment Status=failed PaymentID={payment_id} Reason=missing_payer_id")
-                return {'success': False, 'error': "Missing payer_id"}
+            # Already executed (repeat verification): nothing left to do at PayPal
+            if payment.get('state') != 'approved':
+                exec_payer_id = payer_id or payment.get('payer', {}).get('payer_info', {}).get('payer_id')
+                if not exec_payer_id:
+                    logger.error(f"Action=verify_paypal_payment Status=failed PaymentID={payment_id} Reason=missing_payer_id")
+                    return {'success': False, 'error': "Missing payer_id"}
 
-            if payment.execute({"payer_id": exec_payer_id}):
-                duration = (time.time() - start_time) * 1000
-                if payment.state != 'approved':
-                    logger.error(f"Action=verify_paypal_payment Status=failed PaymentID={payment_id} State={payment.state} Duration={duration:.2f}ms")
-                    return {'success': False, 'error': f"Payment state is {payment.state}"}
-                    
-                logger.info(f"Action=verify_paypal_payment Status=finished PaymentID={payment_id} Duration={duration:.2f}ms")
-                return {
-                    'success': True,
-                    'payment_status': payment.state,
-                    'transaction_id': payment.id,
-                    'amount': float(payment.transactions[0].amount.total),
-                    'currency': payment.transactions[0].amount.currency
-                }
-            else:
-                duration = (time.time() - start_time) * 1000
-                logger.error(f"Action=verify_paypal_payment Status=failed PaymentID={payment_id} Error={str(payment.error)} Duration={duration:.2f}ms")
-                return {'success': False, 'error': payment.error}
+                payment = await self.client.request(
+                    'POST', f'/v1/payments/payment/{payment_id}/execute',
+                    json={"payer_id": exec_payer_id}, request_id=f"execute-{payment_id}"
+                )
+
+            duration = (time.time() - start_time) * 1000
+            if payment.get('state') != 'approved':
+                logger.error(f"Action=verify_paypal_payment Status=failed PaymentID={payment_id} State={payment.get('state')} Duration={duration:.2f}ms")
+                return {'success': False, 'error': f"Payment state is {payment.get('state')}"}
+                
+            logger.info(f"Action=verify_paypal_payment Status=finished PaymentID={payment_id} Duration={duration:.2f}ms")
+            amount = payment['transactions'][0]['amount']
+            return {
+                'success': True,
+                'payment_status': payment['state'],
+                'transaction_id': payment['id'],
+                'amount': float(amount['total']),
+                'currency': amount['currency']
+            }
+        except PayPalError as e:
+            duration = (time.time() - start_time) * 1000
+            logger.error(f"Action=verify_paypal_payment Status=failed PaymentID={payment_id} Error={str(e.details)} Duration={duration:.2f}ms")
+            return {'success': False, 'error': e.details}
         except Exception as e:
             duration = (time.time() - start_time) * 1000
             logger.error(f"Action=verify_paypal_payment Status=failed PaymentID={payment_id} Error={str(e)} Duration={duration:.2f}ms", exc_info=True)
             return {'success': False, 'error': str(e)}
 
-payment_service = PaymentService()
\ No newline at end of file
+    async def verify_webhook(self, headers, event):
+        """True if PayPal confirms it signed this webhook delivery."""
+        event_id = event.get('id')
+        if not PAYPAL_WEBHOOK_ID or not self.client.is_configured:
+            logger.error(f"Action=verify_paypal_webhook Status=failed EventID={event_id} Reason=missing_webhook_id")
+            return False
+
+        start_time = time.time()
+        try:
+            result = await self.client.request('POST', '/v1/notifications/verify-webhook-signature', json={
+                "auth_algo": headers.get('paypal-auth-algo'),
+                "cert_url": headers.get('paypal-cert-url'),
+                "transmission_id": headers.get('paypal-transmission-id'),
+                "transmission_sig": headers.get('paypal-transmission-sig'),
+                "transmission_time": headers.get('paypal-transmission-time'),
+                "webhook_id": PAYPAL_WEBHOOK_ID,
+                "webhook_event": event
+            })
+            verified = result.get('verification_status') == 'SUCCESS'
+            duration = (time.time() - start_time) * 1000
+            logger.info(f"Action=verify_paypal_webhook Status={'finished' if verified else 'rejected'} EventID={event_id} Duration={duration:.2f}ms")
+            return verified
+        except Exception as e:
+            duration = (time.time() - start_time) * 1000
+            logger.error(f"Action=verify_paypal_webhook Status=failed EventID={event_id} Error={str(e)} Duration={duration:.2f}ms")
+            return False
+
+    async def aclose(self):
+        await self.client.aclose()
+
+payment_service = PaymentService()
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from services.payment_events import COMPLETED_EVENTS, PAYMENT_EVENT_LEASE, PaymentEvents
+
+logger = logging.getLogger(__name__)
+
+# Seconds between retry sweeps over failed webhook events and unfinished paid bookings
+PAYMENT_RETRY_INTERVAL = float(os.environ.get('PAYMENT_RETRY_INTERVAL', '60'))
+
+# Attempts after which an event or a booking's remaining steps are left for an admin
+PAYMENT_RETRY_MAX_ATTEMPTS = int(os.environ.get('PAYMENT_RETRY_MAX_ATTEMPTS', '10'))
+
+
+class PostPayment:
+    """
+    Confirms paid bookings and drives their post-payment steps to completion.
+
+    `steps` is an ordered list of (name, step) pairs. `await step(booking)`
+    returns True once the step is done (or has nothing to do) and may run
+    again after a failure, so every step must be idempotent. Marking a
+    booking paid records all step names in `post_payment_pending` in the same
+    update, and each finished step is pulled from it, so a failed step or a
+    crash after the payment flip loses nothing: the next verify_payment
+    call, webhook event or retry sweep runs only what is left. Running the
+    steps takes a lease on the booking (`post_payment_since`, as long as the
+    webhook event lease), so two callers never run them at once.
+
+    run() is the retry sweeper: every PAYMENT_RETRY_INTERVAL seconds it
+    re-processes failed or stranded webhook events and resumes bookings
+    with unfinished steps, up to PAYMENT_RETRY_MAX_ATTEMPTS attempts each.
+    """
+
+    def __init__(self, db, payment_events, steps, lease=PAYMENT_EVENT_LEASE,
+                 interval=PAYMENT_RETRY_INTERVAL, max_attempts=PAYMENT_RETRY_MAX_ATTEMPTS):
+        self.db = db
+        self.payment_events = payment_events
+        self.steps = list(steps)
+        self.lease = lease
+        self.interval = interval
+        self.max_attempts = max_attempts
+
+    async def ensure_indexes(self):
+        await self.db.bookings.create_index("post_payment_pending")
+
+    def _unleased(self, now):
+        return {"$or": [
+            {"post_payment_since": None},
+            {"post_payment_since": {"$lt": now - timedelta(minutes=self.lease)}},
+        ]}
+
+    async def mark_paid(self, booking, payment_info):
+        """Flips a booking to paid and queues every step. Returns False if it already was paid."""
+        result = await self.db.bookings.update_one(
+            {"booking_id": booking["booking_id"], "payment_status": {"$ne": "paid"}},
+            {"$set": {
+                "payment_status": "paid",
+                "status": "confirmed",
+                "transaction_id": payment_info.get("transaction_id"),
+                "payment_info": payment_info,
+                "post_payment_pending": [name for name, _ in self.steps],
+                "post_payment_attempts": 0,
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        return result.modified_count > 0
+
+    async def run_steps(self, booking_id, names=None):
+        """
+        Runs the booking's pending steps (only `names`, if given) in order,
+        pulling each one as it finishes. Returns True when none of them is left
+        pending; False while some are (a step failed, or another caller holds
+        the lease).
+        """
+        now = datetime.now(timezone.utc)
+        booking = await self.db.bookings.find_one_and_update(
+            {"booking_id": booking_id, "post_payment_pending.0": {"$exists": True}, **self._unleased(now)},
+            {"$set": {"post_payment_since": now}, "$inc": {"post_payment_attempts": 1}},
+            projection={"_id": 0, "post_payment_pending": 1}
+        )
+        if not booking:
+            pending = await self.db.bookings.find_one(
+                {"booking_id": booking_id, "post_payment_pending.0": {"$exists": True}}, {"_id": 0, "post_payment_pending": 1}
+            )
+            return not pending or not any(names is None or name in names for name in pending["post_payment_pending"])
+
+        remaining = []
+        try:
+            for name, step in self.steps:
+                if name not in booking["post_payment_pending"] or (names is not None and name not in names):
+                    continue
+                # Re-read so each step sees what earlier steps stored (event id, meeting link, pending list)
+                current = await self.db.bookings.find_one({"booking_id": booking_id}, {"_id": 0})
+                try:
+                    finished = await step(current)
+                except Exception as e:
+                    logger.error(f"Action=post_payment_step Status=failed BookingID={booking_id} Step={name} Error={str(e)}", exc_info=True)
+                    finished = False
+                if finished:
+                    await self.db.bookings.update_one({"booking_id": booking_id}, {"$pull": {"post_payment_pending": name}})
+                else:
+                    remaining.append(name)
+        finally:
+            await self.db.bookings.update_one({"booking_id": booking_id}, {"$unset": {"post_payment_since": ""}})
+
+        if remaining:
+            logger.error(f"Action=post_payment Status=pending BookingID={booking_id} Pending={','.join(remaining)}")
+            return False
+        logger.info(f"Action=post_payment Status=finished BookingID={booking_id}")
+        return True
+
+    async def process_event(self, event_id):
+        """Runs the confirmation for a stored webhook event; failures stay claimable for the sweeper."""
+        event = await self.payment_events.claim(event_id)
+        if not event:
+            return
+        try:
+            if event["event_type"] not in COMPLETED_EVENTS:
+                await self.payment_events.finish(event_id, "ignored")
+                return
+            payment_info = PaymentEvents.payment_info(event)
+            booking = await self.db.bookings.find_one({"payment_id": event["payment_id"]}, {"_id": 0, "booking_id": 1})
+            if not booking or not payment_info["success"]:
+                await self.payment_events.finish(event_id, "ignored")
+                return
+
+            # Already paid (verify_payment or an earlier attempt): only the steps still pending run
+            await self.mark_paid(booking, payment_info)
+            if not await self.run_steps(booking["booking_id"]):
+                await self.payment_events.finish(event_id, "failed", error="post-payment steps pending")
+                return
+            await self.payment_events.finish(event_id, "processed")
+        except Exception as e:
+            logger.error(f"Action=payment_event_process Status=error EventID={event_id} Error={str(e)}", exc_info=True)
+            await self.payment_events.finish(event_id, "failed", error=str(e))
+
+    async def sweep_once(self):
+        """Retries claimable webhook events, then resumes bookings with unfinished steps. Returns how many ran."""
+        event_ids = await self.payment_events.retryable(self.max_attempts)
+        for event_id in event_ids:
+            await self.process_event(event_id)
+
+        now = datetime.now(timezone.utc)
+        bookings = await self.db.bookings.find(
+            {"post_payment_pending.0": {"$exists": True}, "post_payment_attempts": {"$lt": self.max_attempts}, **self._unleased(now)},
+            {"_id": 0, "booking_id": 1}
+        ).to_list(None)
+        for booking in bookings:
+            await self.run_steps(booking["booking_id"])
+        if event_ids or bookings:
+            logger.info(f"Action=payment_retry_sweep Status=finished Events={len(event_ids)} Bookings={len(bookings)}")
+        return len(event_ids) + len(bookings)
+
+    async def run(self):
+        """Background retry worker."""
+        while True:
+            try:
+                await self.sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Action=payment_retry_sweep Status=failed Error={str(e)}", exc_info=True)
+            await asyncio.sleep(self.interval)
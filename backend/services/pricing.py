@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import os
+import time
+
+from services.discounts import DiscountEngine
+from services.http_cache import content_etag
+
+logger = logging.getLogger(__name__)
+
+# Safety net for edits made outside the admin API (e.g. directly in Mongo)
+PRICING_SNAPSHOT_MAX_AGE = float(os.environ.get('PRICING_SNAPSHOT_MAX_AGE', '300'))
+# Opt-in: Mongo change streams need a replica set
+PRICING_WATCH_CHANGES = os.environ.get('PRICING_WATCH_CHANGES', 'false').lower() == 'true'
+
+PRICING_COLLECTIONS = ("services", "promotions", "campaigns", "offers", "taxes")
+
+# Emergency bookings pay this much extra on the taxed total
+EMERGENCY_SURCHARGE = 0.30
+# Distinct catalog quotes (per code / active rules) kept per snapshot
+QUOTE_CACHE_SIZE = 256
+
+
+class Pricing:
+    """One immutable load of every pricing input."""
+
+    def __init__(self, version, services, promotions, campaigns, offers, tax):
+        self.version = version
+        self.loaded_at = time.time()
+        self.service_list = services
+        self.services = {s["key"]: s for s in services if s.get("key")}
+        self.tax = tax
+        # Tagged from the loaded data, so reloads after watcher events, MAX_AGE
+        # or direct DB edits change the tag even without an API write
+        self.services_etag = content_etag(services)
+        self.tax_etag = content_etag(tax)
+        # Promotions, offers and campaigns compiled into one rule set
+        self.discounts = DiscountEngine.compile(promotions, offers, campaigns)
+        self._quote_cache = {}
+
+    def service_price(self, service_type, fallback=None):
+        """(amount, currency, name) for a service key, or None if unknown."""
+        service = self.services.get(service_type) or (fallback or {}).get(service_type)
+        if not service:
+            return None
+        return float(service["amount"]), service["currency"], service.get("name", service_type)
+
+    def quote(self, service_type, promo_code=None, is_emergency=False, fallback=None, now=None):
+        """
+        Price for one service the way create_booking charges it: the best
+        discount rule (entered code first, otherwise the campaign), then tax
+        on the discounted amount, then the emergency surcharge. Raises
+        ValueError for an unknown service.
+        """
+        price = self.service_price(service_type, fallback)
+        if price is None:
+            raise ValueError("Invalid service type")
+        base_amount, currency, name = price
+
+        rule = self.discounts.best(service_type, promo_code, now)
+        discount_total = rule.discount_on(base_amount) if rule else 0.0
+        final_amount = base_amount - discount_total
+
+        final_amount = round(max(final_amount, 0.0), 2)
+        subtotal = final_amount
+
+        tax_pct, tax_name, tax_amount = 0.0, "", 0.0
+        if self.tax:
+            tax_pct = self.tax.get("percentage", 0.0)
+            tax_name = self.tax.get("name", "Tax")
+            tax_amount = round(final_amount * (tax_pct / 100), 2)
+            final_amount = round(final_amount + tax_amount, 2)
+
+        surcharge = 0.0
+        if is_emergency:
+            surcharged = round(final_amount * (1 + EMERGENCY_SURCHARGE), 2)
+            surcharge = round(surcharged - final_amount, 2)
+            final_amount = surcharged
+
+        return {
+            "service_type": service_type,
+            "name": name,
+            "currency": currency,
+            "base_amount": base_amount,
+            "discount_amount": round(discount_total, 2),
+            "promo_code": rule.doc["code"] if rule and rule.code else None,
+            "discount_source": rule.source if rule else None,
+            "campaign_percentage": rule.value if rule and rule.source == "campaign" else 0,
+            "subtotal": subtotal,
+            "tax_name": tax_name,
+            "tax_percentage": tax_pct,
+            "tax_amount": tax_amount,
+            "emergency_surcharge": surcharge,
+            "total": final_amount,
+        }
+
+
+    def quote_all(self, promo_code=None, fallback=None, now=None):
+        """
+        {service key: quote} for the whole catalog, with the emergency
+        surcharge and total alongside. Cached for the life of this snapshot,
+        keyed by the rules that apply now (so a campaign expiring mid-way
+        still changes the answer).
+        """
+        code_rule = self.discounts.code_rule(promo_code, now)
+        automatic_rule = self.discounts.automatic_rule(now)
+        key = (code_rule.id if code_rule else None, automatic_rule.id if automatic_rule else None)
+        cached = self._quote_cache.get(key)
+        if cached is not None:
+            return cached
+
+        quotes = {}
+        for service_type in sorted(set(self.services) | set(fallback or {})):
+            quote = self.quote(service_type, promo_code, fallback=fallback, now=now)
+            emergency = self.quote(service_type, promo_code, is_emergency=True, fallback=fallback, now=now)
+            quote["emergency_surcharge"] = emergency["emergency_surcharge"]
+            quote["emergency_total"] = emergency["total"]
+            quotes[service_type] = quote
+        if len(self._quote_cache) >= QUOTE_CACHE_SIZE:
+            self._quote_cache.clear()
+        self._quote_cache[key] = quotes
+        return quotes
+
+
+class PricingSnapshot:
+    """
+    Versioned in-process copy of services, promotions, campaigns, offers and
+    the active tax.
+
+    Loaded lazily in one round of queries and reused until a pricing write
+    calls `invalidate()` (or the change-stream watcher sees one, or
+    PRICING_SNAPSHOT_MAX_AGE passes). Readers get an immutable Pricing, so a
+    reload never changes a quote halfway through.
+    """
+
+    def __init__(self, db, max_age=PRICING_SNAPSHOT_MAX_AGE):
+        self.db = db
+        self.max_age = max_age
+        self.version = 0
+        self._current = None
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.version += 1
+        logger.info(f"Action=pricing_snapshot_invalidate Version={self.version}")
+
+    def _fresh(self):
+        current = self._current
+        return (
+            current is not None
+            and current.version == self.version
+            and time.time() - current.loaded_at < self.max_age
+        )
+
+    async def get(self):
+        if self._fresh():
+            return self._current
+        async with self._lock:
+            if not self._fresh():
+                self._current = await self._load()
+        return self._current
+
+    async def _load(self):
+        start_time = time.time()
+        version = self.version
+        services, promotions, campaigns, offers, tax = await asyncio.gather(
+            self.db.services.find({}, {"_id": 0}).to_list(None),
+            self.db.promotions.find({"is_active": True}, {"_id": 0}).to_list(None),
+            self.db.campaigns.find({"is_active": True}, {"_id": 0}).to_list(None),
+            self.db.offers.find({"is_active": True}, {"_id": 0}).to_list(None),
+            self.db.taxes.find_one({"is_active": True}, sort=[("created_at", -1)], projection={"_id": 0}),
+        )
+        pricing = Pricing(version, services, promotions, campaigns, offers, tax)
+        duration = (time.time() - start_time) * 1000
+        logger.info(f"Action=pricing_snapshot_load Version={version} Services={len(services)} Duration={duration:.2f}ms")
+        return pricing
+
+    async def watch(self):
+        """Invalidates on any change to a pricing collection (needs a replica set)."""
+        pipeline = [{"$match": {"ns.coll": {"$in": list(PRICING_COLLECTIONS)}}}]
+        try:
+            async with self.db.watch(pipeline) as stream:
+                logger.info("Action=pricing_snapshot_watch Status=started")
+                async for _ in stream:
+                    self.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Action=pricing_snapshot_watch Status=unavailable Error={str(e)}")
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight computation.
+
+    The first caller for a key starts `fn()` as a task; callers arriving
+    before it finishes await the same task and receive the same result (or
+    exception). Nothing is cached: once the task completes the next call
+    starts a fresh one. The task is shielded, so a caller that disconnects
+    does not cancel the work for everyone else.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._inflight = {}
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark retrieved so a failure nobody awaited does not log a warning
+            task.exception()
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            logger.debug(f"Action=single_flight Status=coalesced Flight={self.name} Key={key}")
+        return await asyncio.shield(task)
@@ -0,0 +1,100 @@
+"""
+Interval arithmetic for availability and slot generation.
+
+Intervals are half-open (start, end) pairs of comparable numbers (minutes
+from business midnight for slots, epoch seconds for window overlap checks).
+Everything here is a linear sweep over sorted input, so cost grows with
+windows + busy blocks + emitted slots rather than their product.
+
+Run `python -m tests.benchmark_slot_engine` from the repository root for
+micro-benchmarks.
+"""
+from bisect import bisect_right
+
+
+def merge_intervals(intervals):
+    """Sorts and coalesces overlapping or touching intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(s, e) for s, e in merged]
+
+
+def overlapping(span, intervals):
+    """Intervals (in input order) that overlap `span`."""
+    start, end = span
+    return [iv for iv in intervals if iv[0] < end and iv[1] > start]
+
+
+def subtract_intervals(span, intervals):
+    """Parts of `span` not covered by any of `intervals`, in order."""
+    start, end = span
+    segments = []
+    current = start
+    for iv_start, iv_end in merge_intervals(intervals):
+        if iv_end <= current:
+            continue
+        if iv_start >= end:
+            break
+        if iv_start > current:
+            segments.append((current, iv_start))
+        current = max(current, iv_end)
+        if current >= end:
+            break
+    if current < end:
+        segments.append((current, end))
+    return segments
+
+
+def free_slots(windows, busy, durations):
+    """
+    Back-to-back slots inside each availability window that avoid busy time.
+
+    windows: iterable of (start, end, type); slots are laid on a grid of
+        `duration` starting at each window's start.
+    busy: iterable of (start, end); merged internally.
+    durations: an int or iterable of ints.
+
+    Returns {duration: [(start, type), ...]} sorted by start. A start
+    produced by several overlapping windows is emitted once (first window
+    by start wins).
+    """
+    if isinstance(durations, int):
+        durations = (durations,)
+    busy = merge_intervals(busy)
+    busy_ends = [e for _, e in busy]
+    windows = sorted(windows, key=lambda w: (w[0], w[1]))
+
+    result = {}
+    for duration in durations:
+        slots = []
+        seen = set()
+        if duration <= 0:
+            result[duration] = slots
+            continue
+        for w_start, w_end, w_type in windows:
+            # First busy block that ends after the window opens
+            j = bisect_right(busy_ends, w_start)
+            current = w_start
+            while current + duration <= w_end:
+                while j < len(busy) and busy[j][1] <= current:
+                    j += 1
+                if j < len(busy) and busy[j][0] < current + duration:
+                    # Jump past the blocking interval, staying on the grid
+                    steps = -(-(busy[j][1] - current) // duration)
+                    current += steps * duration
+                    continue
+                if current not in seen:
+                    seen.add(current)
+                    slots.append((current, w_type))
+                current += duration
+        slots.sort(key=lambda s: s[0])
+        result[duration] = slots
+    return result
+
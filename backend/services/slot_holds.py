@@ -0,0 +1,137 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Seconds an unpaid checkout keeps its slot reserved
+SLOT_HOLD_TTL = float(os.environ.get('SLOT_HOLD_TTL', '1800'))
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def as_aware(value):
+    # Mongo returns naive UTC datetimes
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class SlotHolds:
+    """
+    Slot reservations in `slot_hold_days`, one document per business date
+    holding that day's reservations as an interval list.
+
+    Claiming is a single conditional `$push` that only matches when no live
+    hold on the date overlaps the new interval, so MongoDB serializes claims
+    for a date across every worker; a date seen for the first time is
+    created by the same upsert.
+    Every hold carries `expires_at`: checkout holds expire after
+    SLOT_HOLD_TTL, confirmed holds once the session has ended. Expired holds
+    are ignored on read, pulled on the next claim, and a TTL index drops the
+    day document once its last hold has expired.
+    """
+
+    def __init__(self, db, ttl=SLOT_HOLD_TTL):
+        self.db = db
+        self.ttl = ttl
+
+    async def ensure_indexes(self):
+        await self.db.slot_hold_days.create_index("holds.booking_id")
+        await self.db.slot_hold_days.create_index("expires_at", expireAfterSeconds=0)
+        await self._migrate_legacy_holds()
+
+    async def _migrate_legacy_holds(self):
+        # Holds used to be one document each in `slot_holds`
+        now = datetime.now(timezone.utc)
+        legacy = await self.db.slot_holds.find({"expires_at": {"$gt": now}}, {"_id": 0}).to_list(None)
+        for hold in legacy:
+            await self._push(hold["date"], {
+                "booking_id": hold["booking_id"],
+                "start_min": hold["start_min"],
+                "end_min": hold["end_min"],
+                "status": hold.get("status", "held"),
+                "created_at": hold.get("created_at", now),
+                "expires_at": hold["expires_at"],
+            }, now)
+        await self.db.slot_holds.drop()
+        if legacy:
+            logger.info(f"Action=slot_hold_migrate Status=finished Count={len(legacy)}")
+
+    @staticmethod
+    def _live(now):
+        # The TTL monitor only removes whole days, so filter expired holds explicitly
+        return {"expires_at": {"$gt": now}}
+
+    async def _push(self, date, hold, now):
+        """Appends `hold` unless a live hold on `date` overlaps it. Returns False on overlap."""
+        overlap = {"start_min": {"$lt": hold["end_min"]}, "end_min": {"$gt": hold["start_min"]}, **self._live(now)}
+        for _ in range(2):
+            try:
+                result = await self.db.slot_hold_days.update_one(
+                    {"_id": date, "holds": {"$not": {"$elemMatch": overlap}}},
+                    {"$push": {"holds": hold}, "$max": {"expires_at": hold["expires_at"]}},
+                    upsert=True
+                )
+                return result.modified_count > 0 or result.upserted_id is not None
+            except DuplicateKeyError:
+                # The day exists and the filter did not match: either an overlapping live
+                # hold, or another first claim created the day meanwhile (retry once)
+                continue
+        return False
+
+    async def claim(self, date, start_min, duration, booking_id, expires_at=None, status="held"):
+        """Reserves [start_min, start_min + duration) on `date`. Returns False if taken."""
+        now = datetime.now(timezone.utc)
+        time_str = format_minutes(start_min)
+        await self.db.slot_hold_days.update_one(
+            {"_id": date}, {"$pull": {"holds": {"expires_at": {"$lte": now}}}}
+        )
+        claimed = await self._push(date, {
+            "booking_id": booking_id,
+            "start_min": start_min,
+            "end_min": start_min + duration,
+            "status": status,
+            "created_at": now,
+            "expires_at": expires_at or now + timedelta(seconds=self.ttl),
+        }, now)
+        if not claimed:
+            logger.info(f"Action=slot_hold_claim Status=conflict Date={date} Time={time_str} BookingId={booking_id}")
+            return False
+        logger.info(f"Action=slot_hold_claim Status=finished Date={date} Time={time_str} BookingId={booking_id}")
+        return True
+
+    async def confirm(self, booking_id, ends_at):
+        """Turns a checkout hold into a booking hold kept until `ends_at`. False if none is left."""
+        now = datetime.now(timezone.utc)
+        result = await self.db.slot_hold_days.update_one(
+            {"holds": {"$elemMatch": {"booking_id": booking_id, **self._live(now)}}},
+            {
+                "$set": {"holds.$.status": "confirmed", "holds.$.expires_at": ends_at, "holds.$.confirmed_at": now},
+                "$max": {"expires_at": ends_at},
+            }
+        )
+        return result.matched_count > 0
+
+    async def release(self, booking_id):
+        result = await self.db.slot_hold_days.update_many(
+            {"holds.booking_id": booking_id}, {"$pull": {"holds": {"booking_id": booking_id}}}
+        )
+        return result.modified_count > 0
+
+    async def active_for(self, dates):
+        """{date: [(start_min, end_min), ...]} of live holds on the given dates."""
+        now = datetime.now(timezone.utc)
+        days = await self.db.slot_hold_days.find(
+            {"_id": {"$in": list(dates)}}, {"holds.start_min": 1, "holds.end_min": 1, "holds.expires_at": 1}
+        ).to_list(None)
+        by_date = {}
+        for day in days:
+            live = [(h["start_min"], h["end_min"]) for h in day.get("holds", []) if as_aware(h["expires_at"]) > now]
+            if live:
+                by_date[day["_id"]] = live
+        return by_date
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Combinations kept precomputed; anything else is computed on request
+INVENTORY_DURATIONS = (20, 40)
+INVENTORY_TYPES = ("regular", "emergency", "all")
+
+# Entries older than this are recomputed on read even without a change signal
+SLOT_INVENTORY_MAX_AGE = float(os.environ.get('SLOT_INVENTORY_MAX_AGE', '900'))
+
+# Window in seconds for coalescing refresh requests for the same dates
+REFRESH_DEBOUNCE = 0.05
+
+
+class SlotInventory:
+    """
+    Materialized free slots per (date, type, duration) in `slot_inventory`.
+
+    `builder(date)` must return {(type, duration): [slot dict, ...]} for every
+    combination in INVENTORY_TYPES x INVENTORY_DURATIONS. Refreshes are
+    scheduled whenever a window or booking changes; public reads are then a
+    single indexed lookup.
+
+    Refreshes of one date run one at a time (per-date lock), so a refresh
+    scheduled while another is computing starts from the newer state and its
+    write lands last.
+    """
+
+    def __init__(self, db, builder, max_age=SLOT_INVENTORY_MAX_AGE):
+        self.db = db
+        self.builder = builder
+        self.max_age = max_age
+        self._pending = set()
+        self._tasks = set()
+        self._locks = {}  # date -> [asyncio.Lock, users]
+
+    async def ensure_indexes(self):
+        await self.db.slot_inventory.create_index(
+            [("date", 1), ("type", 1), ("duration", 1)], unique=True
+        )
+
+    @staticmethod
+    def key_for(type, duration):
+        """Inventory (type, duration) for a request, or None if not materialized."""
+        slot_type = type.lower() if type else "all"
+        if slot_type not in INVENTORY_TYPES or duration not in INVENTORY_DURATIONS:
+            return None
+        return slot_type, duration
+
+    def _fresh_after(self):
+        return datetime.fromtimestamp(time.time() - self.max_age, timezone.utc)
+
+    def _query(self, key, allow_stale):
+        query = {"type": key[0], "duration": key[1]}
+        if not allow_stale:
+            query["updated_at"] = {"$gte": self._fresh_after()}
+        return query
+
+    async def get(self, date, type, duration, allow_stale=False):
+        """Stored slot dicts for one day, or None on a miss. `allow_stale` ignores max_age."""
+        key = self.key_for(type, duration)
+        if key is None:
+            return None
+        doc = await self.db.slot_inventory.find_one(
+            {"date": date, **self._query(key, allow_stale)},
+            {"_id": 0, "slots": 1}
+        )
+        return doc["slots"] if doc else None
+
+    async def get_many(self, dates, type, duration, allow_stale=False):
+        """{date: slot dicts} for the stored subset of `dates`."""
+        key = self.key_for(type, duration)
+        if key is None:
+            return {}
+        docs = await self.db.slot_inventory.find(
+            {"date": {"$in": list(dates)}, **self._query(key, allow_stale)},
+            {"_id": 0, "date": 1, "slots": 1}
+        ).to_list(None)
+        return {doc["date"]: doc["slots"] for doc in docs}
+
+    async def refresh(self, dates):
+        """Recomputes and stores every inventory combination for the given dates."""
+        for date in sorted(dates):
+            entry = self._locks.setdefault(date, [asyncio.Lock(), 0])
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    await self._refresh_date(date)
+            finally:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[date]
+
+    async def _refresh_date(self, date):
+        start_time = time.time()
+        try:
+            entries = await self.builder(date)
+            now = datetime.now(timezone.utc)
+            for (slot_type, duration), slots in entries.items():
+                await self.db.slot_inventory.update_one(
+                    {"date": date, "type": slot_type, "duration": duration},
+                    {"$set": {"slots": slots, "updated_at": now}},
+                    upsert=True
+                )
+            duration_ms = (time.time() - start_time) * 1000
+            logger.info(f"Action=slot_inventory_refresh Status=finished Date={date} Duration={duration_ms:.2f}ms")
+        except Exception as e:
+            logger.error(f"Action=slot_inventory_refresh Status=failed Date={date} Error={str(e)}", exc_info=True)
+
+    async def invalidate_from(self, date):
+        """Drops stored entries on or after `date`; they are recomputed on the next read."""
+        result = await self.db.slot_inventory.delete_many({"date": {"$gte": date}})
+        logger.info(f"Action=slot_inventory_invalidate From={date} Deleted={result.deleted_count}")
+
+    def schedule(self, dates):
+        """Queues a background refresh; dates already queued are coalesced."""
+        new_dates = {d for d in dates if d} - self._pending
+        if not new_dates:
+            return
+        self._pending |= new_dates
+        task = asyncio.create_task(self._run_pending())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_pending(self):
+        await asyncio.sleep(REFRESH_DEBOUNCE)
+        dates, self._pending = self._pending, set()
+        if dates:
+            await self.refresh(dates)
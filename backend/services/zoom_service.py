@@ -14,6 +14,10 @@ ZOOM_ACCOUNT_ID = os.getenv("ZOOM_ACCOUNT_ID")
 ZOOM_CLIENT_ID = os.getenv("ZOOM_CLIENT_ID")
 ZOOM_CLIENT_SECRET = os.getenv("ZOOM_CLIENT_SECRET")
 
+def is_configured():
+    """True when Server-to-Server OAuth credentials are set."""
+    return bool(ZOOM_ACCOUNT_ID and ZOOM_CLIENT_ID and ZOOM_CLIENT_SECRET)
+
 async def get_zoom_token():
     """Fetches an OAuth access token from Zoom."""
     logger.info("Action=get_zoom_token Status=started")
@@ -0,0 +1,65 @@
+"""
+Micro-benchmarks for services.slot_engine against the nested scan it
+replaced. Run from the repository root:
+
+    python -m tests.benchmark_slot_engine
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from services.slot_engine import free_slots  # noqa: E402
+
+
+def naive_free_slots(windows, busy, duration):
+    # Reference: the nested scan get_slots used before the slot engine
+    slots, seen = [], set()
+    for w_start, w_end, w_type in sorted(windows, key=lambda w: (w[0], w[1])):
+        current = w_start
+        while current + duration <= w_end:
+            if not any(current < b_end and current + duration > b_start for b_start, b_end in busy):
+                if current not in seen:
+                    seen.add(current)
+                    slots.append((current, w_type))
+            current += duration
+    return sorted(slots, key=lambda s: s[0])
+
+
+def scenario(n_windows, n_busy, seed=7):
+    rng = random.Random(seed)
+    windows = []
+    for _ in range(n_windows):
+        start = rng.randrange(0, 1380, 10)
+        windows.append((start, min(1440, start + rng.randrange(60, 480, 10)), rng.choice(['regular', 'emergency'])))
+    busy = []
+    for _ in range(n_busy):
+        start = rng.randrange(0, 1420)
+        busy.append((start, start + rng.choice([10, 20, 40, 60])))
+    return windows, busy
+
+
+CASES = [
+    ("realistic", 2, 8, (20, 40)),
+    ("10-min grid", 4, 40, (10,)),
+    ("stress", 200, 2000, (10, 20, 40)),
+]
+
+
+def main():
+    for label, n_windows, n_busy, durations in CASES:
+        windows, busy = scenario(n_windows, n_busy)
+        fast = free_slots(windows, busy, durations)
+        for d in durations:
+            assert fast[d] == naive_free_slots(windows, busy, d), f"mismatch for {label} duration={d}"
+        runs = 200 if n_busy < 1000 else 5
+        t_fast = timeit.timeit(lambda: free_slots(windows, busy, durations), number=runs) / runs
+        t_naive = timeit.timeit(lambda: [naive_free_slots(windows, busy, d) for d in durations], number=runs) / runs
+        print(f"{label:12s} windows={n_windows:4d} busy={n_busy:5d} durations={durations}: "
+              f"sweep {t_fast * 1e6:10.1f}us  nested {t_naive * 1e6:10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modules import each other as `services.*`
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
@@ -0,0 +1,159 @@
+"""
+Local stand-in for the Google Calendar v3 events API, for running the
+calendar client and mirror offline (point GOOGLE_CALENDAR_API_URL / the
+client's base_url at `server.url`).
+
+Supports events list (paging, timeMin, syncToken with 410 on expired
+tokens), get, insert, update and delete on the primary calendar, and
+freeBusy (opaque events only, like Google).
+"""
+import json
+import threading
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+EVENTS_PATH = '/calendars/primary/events'
+FREEBUSY_PATH = '/freeBusy'
+
+
+def _parse(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+class FakeCalendar:
+    def __init__(self):
+        self.events = {}
+        self.changes = []  # event ids in change order; a sync token is an index into it
+        self.expired_tokens = set()
+        self.requests = []
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None):
+                payload = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                fake.requests.append(('GET', url.path, params))
+                if url.path == EVENTS_PATH:
+                    return self._send(*fake.list_events(params))
+                if url.path.startswith(EVENTS_PATH + '/'):
+                    event = fake.events.get(url.path.rsplit('/', 1)[1])
+                    return self._send(200, event) if event else self._send(404, {'error': 'notFound'})
+                self._send(404, {'error': 'notFound'})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                fake.requests.append(('POST', url.path, body))
+                if url.path == EVENTS_PATH:
+                    return self._send(200, fake.insert(body))
+                if url.path == FREEBUSY_PATH:
+                    return self._send(200, fake.free_busy(body))
+                self._send(404, {'error': 'notFound'})
+
+            def do_PUT(self):
+                url = urlparse(self.path)
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                fake.requests.append(('PUT', url.path, body))
+                event_id = url.path.rsplit('/', 1)[1]
+                if event_id not in fake.events:
+                    return self._send(404, {'error': 'notFound'})
+                self._send(200, fake.insert(body, event_id=event_id))
+
+            def do_DELETE(self):
+                url = urlparse(self.path)
+                fake.requests.append(('DELETE', url.path, None))
+                if fake.cancel(url.path.rsplit('/', 1)[1]):
+                    return self._send(204)
+                self._send(404, {'error': 'notFound'})
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- Calendar state ---
+
+    def insert(self, body, event_id=None):
+        with self.lock:
+            event = {**body, 'id': event_id or uuid.uuid4().hex, 'status': 'confirmed',
+                     'updated': datetime.utcnow().isoformat() + 'Z'}
+            self.events[event['id']] = event
+            self.changes.append(event['id'])
+            return event
+
+    def add(self, summary, start_iso, end_iso, **fields):
+        return self.insert({'summary': summary, 'start': {'dateTime': start_iso}, 'end': {'dateTime': end_iso}, **fields})
+
+    def cancel(self, event_id):
+        with self.lock:
+            event = self.events.get(event_id)
+            if not event or event['status'] == 'cancelled':
+                return False
+            event['status'] = 'cancelled'
+            self.changes.append(event_id)
+            return True
+
+    def free_busy(self, body):
+        time_min, time_max = _parse(body['timeMin']), _parse(body['timeMax'])
+        with self.lock:
+            busy = sorted(
+                (max(_parse(e['start']['dateTime']), time_min), min(_parse(e['end']['dateTime']), time_max))
+                for e in self.events.values()
+                if e['status'] != 'cancelled' and e.get('transparency', 'opaque') != 'transparent'
+                and _parse(e['start']['dateTime']) < time_max and _parse(e['end']['dateTime']) > time_min
+            )
+        periods = [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in busy]
+        return {'calendars': {'primary': {'busy': periods}}}
+
+    def expire_tokens(self):
+        self.expired_tokens.update(str(i) for i in range(len(self.changes) + 1))
+
+    def list_events(self, params):
+        with self.lock:
+            token = params.get('syncToken')
+            if token is not None:
+                if token in self.expired_tokens or not token.isdigit():
+                    return 410, {'error': {'code': 410, 'message': 'Sync token is no longer valid'}}
+                ids = list(dict.fromkeys(self.changes[int(token):]))
+                items = [self.events[i] for i in ids]
+            else:
+                items = [e for e in self.events.values() if e['status'] != 'cancelled']
+                if params.get('timeMin'):
+                    time_min = _parse(params['timeMin'])
+                    items = [e for e in items if _parse(e['end']['dateTime']) > time_min]
+            offset = int(params.get('pageToken', 0))
+            size = int(params.get('maxResults', 250))
+            page = items[offset:offset + size]
+            body = {'items': page}
+            if offset + size < len(items):
+                body['nextPageToken'] = str(offset + size)
+            else:
+                body['nextSyncToken'] = str(len(self.changes))
+            return 200, body
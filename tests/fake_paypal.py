@@ -0,0 +1,167 @@
+"""
+Local stand-in for the PayPal REST API, for running the async PayPal client
+offline (point PAYPAL_API_URL / the client's base_url at `server.url`).
+
+Supports the client-credentials token endpoint, payment create/get/execute
+and webhook signature verification. Like PayPal, calls repeated with the
+same PayPal-Request-Id get the first response back instead of running again.
+`fail(path, status)` makes the next call to a path answer with an error
+status (or drop the connection with status None), and `revoke_tokens()`
+makes every issued token answer 401.
+"""
+import base64
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TOKEN_PATH = '/v1/oauth2/token'
+PAYMENTS_PATH = '/v1/payments/payment'
+VERIFY_WEBHOOK_PATH = '/v1/notifications/verify-webhook-signature'
+
+
+class FakePayPal:
+    def __init__(self, client_id='client', client_secret='secret', expires_in=32400):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.expires_in = expires_in
+        self.tokens = set()
+        self.payments = {}
+        self.failures = {}  # path -> list of statuses to answer with before succeeding
+        self.idempotent = {}  # PayPal-Request-Id -> (status, body)
+        self.valid_signatures = set()  # transmission ids verify-webhook-signature accepts
+        self.requests = []
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=None):
+                payload = json.dumps(body).encode() if body is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _handle(self, method):
+                path = urlparse(self.path).path
+                raw = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                fake.requests.append((method, path, dict(self.headers)))
+
+                failing, status = fake.next_failure(path)
+                if failing and status is None:
+                    self.close_connection = True
+                    return
+                if failing:
+                    return self._send(status, {'name': 'INTERNAL_SERVICE_ERROR'})
+
+                if path == TOKEN_PATH:
+                    return self._send(*fake.token(self.headers.get('Authorization', ''), parse_qs(raw.decode())))
+                if not fake.authorized(self.headers.get('Authorization', '')):
+                    return self._send(401, {'error': 'invalid_token'})
+
+                request_id = self.headers.get('PayPal-Request-Id')
+                with fake.lock:
+                    if request_id in fake.idempotent:
+                        return self._send(*fake.idempotent[request_id])
+                body = json.loads(raw or b'{}')
+                result = fake.route(method, path, body)
+                if request_id:
+                    with fake.lock:
+                        fake.idempotent[request_id] = result
+                self._send(*result)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- Fault injection ---
+
+    def fail(self, path, *statuses):
+        """Answers the next calls to `path` with `statuses` in turn; None drops the connection."""
+        with self.lock:
+            self.failures.setdefault(path, []).extend(statuses)
+
+    def next_failure(self, path):
+        with self.lock:
+            queued = self.failures.get(path)
+            if not queued:
+                return False, None
+            return True, queued.pop(0)
+
+    def revoke_tokens(self):
+        with self.lock:
+            self.tokens.clear()
+
+    def calls(self, method, path):
+        return [headers for m, p, headers in self.requests if m == method and p == path]
+
+    # --- PayPal state ---
+
+    def token(self, authorization, form):
+        expected = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        if authorization != f"Basic {expected}" or form.get('grant_type') != ['client_credentials']:
+            return 401, {'error': 'invalid_client'}
+        with self.lock:
+            token = uuid.uuid4().hex
+            self.tokens.add(token)
+        return 200, {'access_token': token, 'token_type': 'Bearer', 'expires_in': self.expires_in}
+
+    def authorized(self, authorization):
+        with self.lock:
+            return authorization.startswith('Bearer ') and authorization[len('Bearer '):] in self.tokens
+
+    def approve(self, payment_id, payer_id='PAYER-1'):
+        """What the buyer does on PayPal's approval page."""
+        with self.lock:
+            self.payments[payment_id]['payer'] = {'payment_method': 'paypal', 'payer_info': {'payer_id': payer_id}}
+
+    def route(self, method, path, body):
+        with self.lock:
+            if method == 'POST' and path == PAYMENTS_PATH:
+                payment_id = f"PAYID-{len(self.payments) + 1}"
+                payment = {**body, 'id': payment_id, 'state': 'created', 'links': [
+                    {'rel': 'approval_url', 'href': f"https://paypal.test/approve?token={payment_id}"}
+                ]}
+                self.payments[payment_id] = payment
+                return 201, payment
+            if path.startswith(PAYMENTS_PATH + '/'):
+                parts = path[len(PAYMENTS_PATH) + 1:].split('/')
+                payment = self.payments.get(parts[0])
+                if not payment:
+                    return 404, {'name': 'INVALID_RESOURCE_ID'}
+                if method == 'GET' and len(parts) == 1:
+                    return 200, payment
+                if method == 'POST' and parts[1:] == ['execute']:
+                    if payment['state'] == 'approved':
+                        return 400, {'name': 'PAYMENT_ALREADY_DONE'}
+                    payment['state'] = 'approved'
+                    return 200, payment
+            if method == 'POST' and path == VERIFY_WEBHOOK_PATH:
+                verified = body.get('transmission_id') in self.valid_signatures
+                return 200, {'verification_status': 'SUCCESS' if verified else 'FAILURE'}
+        return 404, {'name': 'NOT_FOUND'}
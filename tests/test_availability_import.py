@@ -0,0 +1,144 @@
+from datetime import date
+
+import pytest
+
+from services.availability_import import expand_weekly_template, parse_csv, parse_ics
+
+TZ = "Europe/Amsterdam"
+
+
+def ics(*events):
+    body = "\r\n".join(f"BEGIN:VEVENT\r\n{event.strip()}\r\nEND:VEVENT" for event in events)
+    return f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\n{body}\r\nEND:VCALENDAR\r\n"
+
+
+def window(day, start, end, window_type="regular"):
+    return {"date": day, "start_time": start, "end_time": end, "type": window_type}
+
+
+def test_csv_rows_are_normalized():
+    windows, errors = parse_csv("﻿Date, Start_Time ,end_time,type\n2030-03-04,9:00,12:00:00,\n\n2030-03-05,18:00,20:00,Emergency\n")
+    assert errors == []
+    assert windows == [window("2030-03-04", "09:00", "12:00"), window("2030-03-05", "18:00", "20:00", "emergency")]
+
+
+def test_csv_malformed_rows_are_reported_by_row_number():
+    text = "\n".join([
+        "date,start_time,end_time,type",
+        "2030-03-04,09:00,12:00,regular",
+        "04/03/2030,09:00,12:00,regular",
+        "2030-03-04,9am,12:00,regular",
+        "2030-03-04,24:00,25:00,regular",
+        "2030-03-04,12:00,09:00,regular",
+        "2030-03-04,09:00,12:00,vip",
+        "2030-03-04,09:00",
+    ])
+    windows, errors = parse_csv(text)
+    assert windows == [window("2030-03-04", "09:00", "12:00")]
+    assert [error["source"] for error in errors] == [f"row {n}" for n in range(3, 9)]
+    reasons = [error["reason"] for error in errors]
+    assert "Invalid date" in reasons[0] and "Invalid time '9am'" in reasons[1] and "Invalid time '24:00'" in reasons[2]
+    assert reasons[3] == "End time must be after start time" and "Unknown window type" in reasons[4]
+    assert "Invalid time" in reasons[5]
+
+
+def test_csv_without_required_columns_is_rejected():
+    assert parse_csv("day,from,to\n2030-03-04,09:00,12:00\n") == (
+        [], [{"source": "header", "reason": "Missing columns: date, end_time, start_time"}]
+    )
+
+
+def test_ics_times_are_converted_to_the_business_zone():
+    windows, errors = parse_ics(ics(
+        "SUMMARY:Morning\r\nDTSTART:20300304T080000Z\r\nDTEND:20300304T110000Z",
+        "SUMMARY:New York evening\r\nDTSTART;TZID=America/New_York:20300304T120000\r\nDTEND;TZID=\"America/New_York\":20300304T140000",
+        "SUMMARY:Floating\r\nDTSTART:20300305T090000\r\nDURATION:PT2H30M",
+        "SUMMARY:Emergency cover\r\nDTSTART;TZID=Europe/Amsterdam:20300305T200000\r\nDTEND;TZID=Europe/Amsterdam:20300306T000000",
+    ), TZ)
+    assert errors == []
+    assert windows == [
+        window("2030-03-04", "09:00", "12:00"),
+        window("2030-03-04", "18:00", "20:00"),
+        window("2030-03-05", "09:00", "11:30"),
+        window("2030-03-05", "20:00", "23:59", "emergency"),
+    ]
+
+
+def test_ics_folded_lines_are_unfolded():
+    windows, _ = parse_ics(ics("SUMMARY:Emer\r\n gency\r\nDTSTART:20300304T080000Z\r\nDTEND:20300304T1\r\n 10000Z"), TZ)
+    assert windows == [window("2030-03-04", "09:00", "12:00", "emergency")]
+
+
+def test_ics_all_day_multi_day_and_malformed_events_are_rejected():
+    windows, errors = parse_ics(ics(
+        "SUMMARY:Holiday\r\nDTSTART;VALUE=DATE:20300304\r\nDTEND;VALUE=DATE:20300305",
+        "SUMMARY:Retreat\r\nDTSTART:20300304T090000\r\nDTEND:20300306T120000",
+        "SUMMARY:Late shift\r\nDTSTART:20300304T220000Z\r\nDTEND:20300305T010000Z",
+        "UID:no-start\r\nDTEND:20300304T120000Z",
+        "SUMMARY:No end\r\nDTSTART:20300304T090000Z",
+        "SUMMARY:Bad zone\r\nDTSTART;TZID=Mars/Olympus:20300304T090000\r\nDTEND;TZID=Mars/Olympus:20300304T100000",
+        "SUMMARY:Bad duration\r\nDTSTART:20300304T090000Z\r\nDURATION:1H",
+        "SUMMARY:Kept\r\nDTSTART:20300307T080000Z\r\nDTEND:20300307T090000Z",
+    ), TZ)
+    assert windows == [window("2030-03-07", "09:00", "10:00")]
+    assert [error["source"] for error in errors] == [
+        "event 1 (Holiday)", "event 2 (Retreat)", "event 3 (Late shift)", "event 4 (no-start)",
+        "event 5 (No end)", "event 6 (Bad zone)", "event 7 (Bad duration)",
+    ]
+    assert errors[0]["reason"] == "All-day events are not availability windows"
+    assert errors[1]["reason"] == errors[2]["reason"] == "Window must start and end on the same day"
+    assert (errors[3]["reason"], errors[4]["reason"]) == ("Missing DTSTART", "Missing DTEND")
+    assert errors[5]["reason"] == "Unknown TZID 'Mars/Olympus'"
+
+
+def test_ics_without_events_is_an_error():
+    assert parse_ics("BEGIN:VCALENDAR\r\nEND:VCALENDAR\r\n", TZ) == ([], [{"source": "file", "reason": "No VEVENT entries found"}])
+
+
+def test_ics_weekly_rrule_expands_with_exdates():
+    windows, errors = parse_ics(ics(
+        "SUMMARY:Clinic\r\nDTSTART;TZID=Europe/Amsterdam:20300304T090000\r\nDTEND;TZID=Europe/Amsterdam:20300304T120000\r\n"
+        "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20300320T235959Z\r\n"
+        "EXDATE;TZID=Europe/Amsterdam:20300311T090000\r\nEXDATE;VALUE=DATE:20300313,20300318"
+    ), TZ)
+    assert errors == []
+    assert windows == [window(day, "09:00", "12:00") for day in ("2030-03-04", "2030-03-06", "2030-03-20")]
+
+
+def test_ics_rrule_keeps_wall_clock_time_across_dst():
+    # Amsterdam switches to summer time on 31 March 2030; New York already did on 10 March
+    windows, errors = parse_ics(ics(
+        "SUMMARY:Calls\r\nDTSTART;TZID=Europe/Amsterdam:20300329T090000\r\nDURATION:PT1H\r\nRRULE:FREQ=DAILY;COUNT=3",
+        "SUMMARY:NY calls\r\nDTSTART;TZID=America/New_York:20300329T090000\r\nDURATION:PT1H\r\nRRULE:FREQ=DAILY;INTERVAL=2;COUNT=2",
+    ), TZ)
+    assert errors == []
+    assert windows == [
+        window("2030-03-29", "09:00", "10:00"), window("2030-03-30", "09:00", "10:00"), window("2030-03-31", "09:00", "10:00"),
+        window("2030-03-29", "14:00", "15:00"), window("2030-03-31", "15:00", "16:00"),
+    ]
+
+
+@pytest.mark.parametrize("recurrence, reason", [
+    ("RRULE:FREQ=WEEKLY;BYDAY=MO", "Recurring series needs UNTIL or COUNT"),
+    ("RRULE:FREQ=MONTHLY;COUNT=3", "RRULE FREQ must be DAILY or WEEKLY"),
+    ("RRULE:FREQ=WEEKLY;BYSETPOS=1;COUNT=3", "Unsupported RRULE parts: BYSETPOS"),
+    ("RRULE:FREQ=DAILY;COUNT=600", "Recurring series has more than 500 occurrences"),
+    ("RRULE:FREQ=DAILY;COUNT=2\r\nRDATE:20300310T090000Z", "RDATE is not supported"),
+    ("RECURRENCE-ID:20300311T090000Z", "RDATE and RECURRENCE-ID are not supported"),
+])
+def test_ics_unsupported_recurrences_are_rejected(recurrence, reason):
+    windows, errors = parse_ics(ics(f"SUMMARY:Series\r\nDTSTART:20300304T080000Z\r\nDTEND:20300304T090000Z\r\n{recurrence}"), TZ)
+    assert windows == []
+    assert errors == [{"source": "event 1 (Series)", "reason": reason}]
+
+
+def test_weekly_template_expands_over_the_range():
+    windows, errors = expand_weekly_template(date(2030, 3, 4), "2030-03-10", [
+        {"weekday": "Monday", "start_time": "09:00", "end_time": "12:00"},
+        {"weekday": "4", "start_time": "18:00", "end_time": "20:00", "type": "emergency"},
+        {"weekday": "funday", "start_time": "09:00", "end_time": "12:00"},
+        {"weekday": 7, "start_time": "09:00", "end_time": "12:00"},
+        {"weekday": "tue", "start_time": "12:00", "end_time": "09:00"},
+    ])
+    assert windows == [window("2030-03-04", "09:00", "12:00"), window("2030-03-08", "18:00", "20:00", "emergency")]
+    assert [error["source"] for error in errors] == ["template entry 3", "template entry 4", "template entry 5"]
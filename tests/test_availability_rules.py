@@ -0,0 +1,119 @@
+import asyncio
+from datetime import date, timedelta
+
+import mongomock_motor
+import pytest
+
+from services.availability_rules import AvailabilityRules, build_rrule, occurs_on, parse_rrule
+
+# A Wednesday
+START = date(2030, 3, 6)
+
+
+def days(rrule, start=START, span=28, exdates=()):
+    rule = parse_rrule(rrule)
+    return [start + timedelta(days=n) for n in range(span) if occurs_on(rule, start, start + timedelta(days=n), exdates)]
+
+
+def test_daily():
+    assert days("FREQ=DAILY", span=3) == [START, START + timedelta(days=1), START + timedelta(days=2)]
+
+
+def test_daily_interval():
+    assert days("FREQ=DAILY;INTERVAL=3", span=10) == [START + timedelta(days=n) for n in (0, 3, 6, 9)]
+
+
+def test_weekly_defaults_to_the_start_weekday():
+    assert days("RRULE:FREQ=WEEKLY", span=22) == [START + timedelta(days=n) for n in (0, 7, 14, 21)]
+
+
+def test_weekly_byday_starts_on_the_start_date():
+    # Monday 4th is before the series starts; Friday 8th is the first Friday
+    assert days("FREQ=WEEKLY;BYDAY=MO,FR", span=12) == [date(2030, 3, 8), date(2030, 3, 11), date(2030, 3, 15)]
+
+
+def test_weekly_interval_counts_weeks_from_the_start_week():
+    assert days("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE", span=29) == [
+        date(2030, 3, 6), date(2030, 3, 18), date(2030, 3, 20), date(2030, 4, 1), date(2030, 4, 3)
+    ]
+
+
+def test_until_is_inclusive_for_dates_and_date_times():
+    assert days("FREQ=DAILY;UNTIL=20300308")[-1] == date(2030, 3, 8)
+    assert days("FREQ=DAILY;UNTIL=20300308T235959Z")[-1] == date(2030, 3, 8)
+
+
+def test_count_daily():
+    assert days("FREQ=DAILY;INTERVAL=2;COUNT=3") == [date(2030, 3, 6), date(2030, 3, 8), date(2030, 3, 10)]
+
+
+def test_count_weekly_includes_the_partial_first_week():
+    assert days("FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=4") == [
+        date(2030, 3, 6), date(2030, 3, 8), date(2030, 3, 11), date(2030, 3, 13)
+    ]
+    assert days("FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH;COUNT=3", span=60) == [
+        date(2030, 3, 7), date(2030, 3, 19), date(2030, 3, 21)
+    ]
+
+
+def test_skipped_occurrences():
+    skipped = {"2030-03-11", "2030-03-13"}
+    assert days("FREQ=WEEKLY;BYDAY=MO,WE", exdates=skipped, span=14) == [date(2030, 3, 6), date(2030, 3, 18)]
+    # A skipped date still uses up one of the COUNT occurrences
+    assert days("FREQ=DAILY;COUNT=3", exdates={"2030-03-07"}) == [date(2030, 3, 6), date(2030, 3, 8)]
+
+
+def test_no_occurrences_before_the_start():
+    rule = parse_rrule("FREQ=DAILY")
+    assert not occurs_on(rule, START, START - timedelta(days=1))
+
+
+@pytest.mark.parametrize("rrule, reason", [
+    ("FREQ=MONTHLY", "FREQ"),
+    ("INTERVAL=2", "FREQ"),
+    ("FREQ=DAILY;INTERVAL=0", "INTERVAL"),
+    ("FREQ=DAILY;INTERVAL=x", "INTERVAL"),
+    ("FREQ=DAILY;BYDAY=MO", "BYDAY"),
+    ("FREQ=WEEKLY;BYDAY=1MO", "BYDAY"),
+    ("FREQ=WEEKLY;UNTIL=2030", "UNTIL"),
+    ("FREQ=DAILY;COUNT=0", "COUNT"),
+    ("FREQ=DAILY;COUNT=3;UNTIL=20300310", "both"),
+    ("FREQ=WEEKLY;BYMONTH=3", "BYMONTH"),
+    ("FREQ=WEEKLY;WKST=SU;BYSETPOS=1", "BYSETPOS, WKST"),
+    ("FREQ=WEEKLY;BYDAY", "Invalid RRULE part"),
+])
+def test_unsupported_or_invalid_parts_are_rejected(rrule, reason):
+    with pytest.raises(ValueError, match=reason):
+        parse_rrule(rrule)
+
+
+def test_build_rrule_round_trips():
+    rrule = build_rrule([4, 0, 0], until="2030-06-30", interval=2)
+    assert rrule == "FREQ=WEEKLY;BYDAY=MO,FR;INTERVAL=2;UNTIL=20300630"
+    assert parse_rrule(rrule) == {"freq": "WEEKLY", "interval": 2, "byday": [0, 4], "until": date(2030, 6, 30), "count": None}
+
+
+def test_rules_are_cached_and_expanded_locally():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()['availability_rules_test']
+        rules = AvailabilityRules(db)
+        await rules.ensure_indexes()
+        changes = []
+        rules.add_listener(lambda: changes.append(1))
+        weekly = await rules.create("FREQ=WEEKLY;BYDAY=MO,WE", "2030-03-04", "09:00", "12:00")
+        await rules.create("FREQ=DAILY;COUNT=2", "2030-03-05", "18:00", "20:00", type="emergency")
+        await rules.add_exception(weekly["id"], "2030-03-11")
+        with pytest.raises(ValueError):
+            await rules.create("FREQ=YEARLY", "2030-03-04", "09:00", "12:00")
+
+        reloaded = AvailabilityRules(db)
+        await reloaded.load()
+        by_day = {day: reloaded.windows_for(day) for day in ("2030-03-04", "2030-03-05", "2030-03-06", "2030-03-07", "2030-03-11")}
+        return by_day, len(changes), await db.availability_rules.count_documents({})
+
+    by_day, changes, stored = asyncio.run(scenario())
+    assert [w[:3] for w in by_day["2030-03-04"]] == [("09:00", "12:00", "regular")]
+    assert [w[:3] for w in by_day["2030-03-05"]] == [("18:00", "20:00", "emergency")]
+    assert [w[:3] for w in by_day["2030-03-06"]] == [("09:00", "12:00", "regular"), ("18:00", "20:00", "emergency")]
+    assert by_day["2030-03-07"] == [] and by_day["2030-03-11"] == []
+    assert (changes, stored) == (3, 2)
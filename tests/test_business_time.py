@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from services.business_time import BusinessTime, _quarter_offset, utc_to_local
+
+# Europe/Rome in 2030: clocks go 02:00 -> 03:00 on 31 March and 03:00 -> 02:00 on 27 October
+SPRING_FORWARD = "2030-03-31"
+FALL_BACK = "2030-10-27"
+
+
+@pytest.fixture
+def rome():
+    return BusinessTime("Europe/Rome")
+
+
+def test_offset_on_ordinary_days_is_the_dates_own(rome):
+    assert rome.offset("2030-01-15") == rome.offset("2030-01-15", "23:30") == "+01:00"
+    assert rome.offset("2030-07-15", "09:00") == "+02:00"
+    assert not rome.day("2030-07-15").has_transition
+
+
+def test_offset_on_the_spring_forward_day(rome):
+    assert rome.day(SPRING_FORWARD).has_transition
+    assert rome.offset(SPRING_FORWARD, "01:59") == "+01:00"
+    assert rome.offset(SPRING_FORWARD, "03:00") == "+02:00"
+    # 02:30 does not exist that day; it is read with the offset from before the jump
+    assert rome.offset(SPRING_FORWARD, "02:30") == "+01:00"
+    assert rome.local_iso(SPRING_FORWARD, "09:00") == "2030-03-31T09:00:00+02:00"
+
+
+def test_offset_on_the_fall_back_day(rome):
+    assert rome.day(FALL_BACK).has_transition
+    assert rome.offset(FALL_BACK, "01:30") == "+02:00"
+    # 02:30 happens twice; the first (summer time) one is meant
+    assert rome.offset(FALL_BACK, "02:30") == "+02:00"
+    assert rome.offset(FALL_BACK, "03:00") == "+01:00"
+
+
+def test_day_bounds_across_transitions(rome):
+    assert rome.day_bounds(SPRING_FORWARD) == ("2030-03-31T00:00:00+01:00", "2030-03-31T23:59:59+02:00")
+    assert rome.day_bounds(FALL_BACK) == ("2030-10-27T00:00:00+02:00", "2030-10-27T23:59:59+01:00")
+    assert rome.range_bounds("2030-03-30", "2030-04-01") == ("2030-03-30T00:00:00+01:00", "2030-04-01T23:59:59+02:00")
+    # The business day is 23 and 25 hours long
+    for date, hours in ((SPRING_FORWARD, 23), (FALL_BACK, 25)):
+        start, end = (datetime.fromisoformat(iso) for iso in rome.day_bounds(date))
+        assert end - start == timedelta(hours=hours) - timedelta(seconds=1)
+
+
+def test_day_bounds_do_not_depend_on_todays_offset(rome):
+    # The old code used today's offset for every date; both halves of the year must be right regardless
+    assert rome.day_bounds("2030-01-15")[0].endswith("+01:00")
+    assert rome.day_bounds("2030-07-15")[0].endswith("+02:00")
+
+
+def test_to_utc_matches_zoneinfo_on_transition_days(rome):
+    zone = ZoneInfo("Europe/Rome")
+    for date in (SPRING_FORWARD, FALL_BACK, "2030-07-15"):
+        minutes = list(range(0, 24 * 60, 15))
+        midnight = datetime.fromisoformat(date)
+        expected = [
+            (midnight + timedelta(minutes=m)).replace(tzinfo=zone).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+            for m in minutes
+        ]
+        assert rome.to_utc(date, minutes) == expected
+
+
+def test_dates_for_zone_covers_the_client_day(rome):
+    assert rome.dates_for_zone("2030-03-31", "2030-03-31", "America/New_York") == ["2030-03-31", "2030-04-01"]
+    assert rome.dates_for_zone("2030-03-31", "2030-03-31", "Asia/Tokyo") == ["2030-03-30", "2030-03-31"]
+    with pytest.raises(ValueError):
+        rome.dates_for_zone("2030-03-31", "2030-03-31", "Mars/Olympus")
+
+
+@pytest.mark.parametrize("tz_name", ["Europe/Rome", "America/New_York", "Asia/Kathmandu", "Australia/Lord_Howe", "Pacific/Chatham"])
+def test_utc_to_local_matches_zoneinfo_around_transitions(tz_name):
+    zone = ZoneInfo(tz_name)
+    # Every 5 minutes for a day either side of each 2030 transition (Lord Howe shifts by 30 minutes, Chatham at :45)
+    hours = [datetime(2030, 1, 1, tzinfo=timezone.utc) + timedelta(hours=h) for h in range(365 * 24)]
+    transitions = [b for a, b in zip(hours, hours[1:]) if a.astimezone(zone).utcoffset() != b.astimezone(zone).utcoffset()]
+    assert transitions or tz_name == "Asia/Kathmandu"
+    instants = [hour + timedelta(minutes=5 * i) for hour in transitions + hours[:1] for i in range(-24 * 12, 24 * 12)]
+    utc_isos = [dt.strftime("%Y-%m-%dT%H:%M:%SZ") for dt in instants]
+    expected = [(local.strftime("%Y-%m-%d"), local.strftime("%H:%M")) for local in (dt.astimezone(zone) for dt in instants)]
+    assert utc_to_local(utc_isos, tz_name) == expected
+
+
+def test_utc_to_local_looks_up_each_quarter_hour_once():
+    _quarter_offset.cache_clear()
+    utc_isos = [f"2030-07-15T09:{minute:02d}:00Z" for minute in range(0, 60, 5)] * 3
+    converted = utc_to_local(utc_isos, "Asia/Kathmandu")
+    assert converted[0] == ("2030-07-15", "14:45") and converted[-1] == ("2030-07-15", "15:40")
+    info = _quarter_offset.cache_info()
+    assert (info.misses, info.hits) == (4, len(utc_isos) - 4)
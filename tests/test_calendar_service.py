@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from services.calendar_service import CALENDAR_API_DEFAULT_URL, AsyncCalendarService, CalendarService
+from tests.fake_calendar import EVENTS_PATH, FREEBUSY_PATH, FakeCalendar
+
+
+class LoadedCredentials:
+    """Stands in for google-auth credentials that are already valid."""
+    valid = True
+    token = "test-token"
+
+
+class UnusablePool:
+    size = 1
+
+    def client(self):
+        raise AssertionError("batch request sent to Google instead of the stand-in")
+
+
+@pytest.fixture
+def fake():
+    server = FakeCalendar().start()
+    yield server
+    server.stop()
+
+
+def service_with_credentials():
+    sync_service = CalendarService()
+    sync_service._creds = LoadedCredentials()
+    sync_service._pool = UnusablePool()
+    sync_service._initialized = True
+    return sync_service
+
+
+def test_batched_writes_go_to_the_stand_in_even_with_credentials(fake):
+    existing = fake.add("Lunch", "2030-03-04T12:00:00Z", "2030-03-04T13:00:00Z")
+    specs = [
+        {"summary": f"REGULAR_TIMING {i}", "start_iso": f"2030-03-0{i}T09:00:00+00:00", "end_iso": f"2030-03-0{i}T12:00:00+00:00"}
+        for i in (5, 6)
+    ]
+
+    async def scenario():
+        client = AsyncCalendarService(service_with_credentials(), base_url=fake.url)
+        try:
+            created = await client.create_events(specs)
+            deleted = await client.delete_events([existing['id']])
+            return created, deleted
+        finally:
+            await client.aclose()
+
+    created, deleted = asyncio.run(scenario())
+    assert [event['summary'] for event in created] == ["REGULAR_TIMING 5", "REGULAR_TIMING 6"]
+    assert all(event['id'] in fake.events for event in created)
+    assert deleted == {existing['id']: True}
+    assert fake.events[existing['id']]['status'] == 'cancelled'
+    assert [method for method, path, _ in fake.requests if path.startswith(EVENTS_PATH)] == ['POST', 'POST', 'DELETE']
+
+
+def test_credentials_load_off_the_event_loop(monkeypatch):
+    loads = []
+
+    def slow_initialize(self):
+        # File and Google credential I/O
+        time.sleep(0.3)
+        loads.append(True)
+
+    monkeypatch.setattr(CalendarService, "initialize_credentials", slow_initialize)
+    client = AsyncCalendarService(CalendarService(), base_url=CALENDAR_API_DEFAULT_URL)
+
+    async def scenario():
+        assert client.is_configured is False
+        assert not loads  # the property never loads credentials itself
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        # A request arriving before warm_up finishes
+        configured = await asyncio.gather(client.ready(), client.list_events("2030-03-04T00:00:00Z", "2030-03-05T00:00:00Z"))
+        ticking.cancel()
+        return configured, ticks
+
+    (configured, events), ticks = asyncio.run(scenario())
+    assert configured is False and events == []
+    assert loads == [True]
+    assert ticks >= 10
+
+
+def freebusy_calls(fake):
+    return sum(1 for method, path, _ in fake.requests if path == FREEBUSY_PATH)
+
+
+def test_freebusy_checks_for_one_day_share_one_call(fake):
+    fake.add("REGULAR_TIMING", "2030-03-04T09:00:00Z", "2030-03-04T17:00:00Z", transparency='transparent')
+    fake.add("BOOKED: A", "2030-03-04T10:00:00Z", "2030-03-04T10:20:00Z")
+    fake.add("Late", "2030-03-05T00:00:00Z", "2030-03-05T00:30:00Z")
+
+    async def scenario():
+        client = AsyncCalendarService(CalendarService(), base_url=fake.url)
+        try:
+            burst = await asyncio.gather(*[
+                client.is_busy("2030-03-04", start, 20, tz_name="UTC") for start in ("09:40", "10:00", "10:10", "10:20")
+            ])
+            after_burst = freebusy_calls(fake)
+            # Reused from the cache, with offsets mixed in
+            many = await client.check_busy_many([("2030-03-04", "09:30Z", 40), ("2030-03-04", "12:00+01:00", 20)], tz_name="UTC")
+            cached = freebusy_calls(fake)
+            # Crosses midnight: queried on its own
+            overnight = await client.is_busy("2030-03-04", "23:50", 20, tz_name="UTC")
+            return burst, after_burst, many, cached, overnight, freebusy_calls(fake)
+        finally:
+            await client.aclose()
+
+    burst, after_burst, many, cached, overnight, total = asyncio.run(scenario())
+    assert burst == [False, True, True, False]
+    assert after_burst == 1
+    assert many == [True, False]
+    assert cached == 1
+    assert overnight is True
+    assert total == 2
+
+
+def test_freebusy_failure_reaches_the_caller_and_is_not_cached():
+    server = FakeCalendar().start()
+    url = server.url
+    server.stop()
+
+    async def scenario():
+        client = AsyncCalendarService(CalendarService(), base_url=url)
+        try:
+            with pytest.raises(httpx.HTTPError):
+                await asyncio.gather(*[client.is_busy("2030-03-04", "10:00", 20, tz_name="UTC") for _ in range(3)])
+            return client._busy_cache
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(scenario()) == {}
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock_motor
+import pytest
+
+from services.calendar_service import AsyncCalendarService, CalendarService
+from services.calendar_sync import CalendarMirror
+from tests.fake_calendar import EVENTS_PATH, FakeCalendar
+
+
+def iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.delenv('GOOGLE_CREDENTIALS', raising=False)
+    server = FakeCalendar().start()
+    yield server
+    server.stop()
+
+
+def run_with_mirror(fake, scenario):
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient()['calendar_sync_test']
+        client = AsyncCalendarService(CalendarService(), base_url=fake.url)
+        mirror = CalendarMirror(db, client, tz_name='UTC')
+        await mirror.ensure_indexes()
+        try:
+            return await scenario(mirror, db)
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_full_sync_mirrors_only_the_recent_window(fake):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    old = fake.add("Old booking", iso(now - timedelta(days=30)), iso(now - timedelta(days=30, minutes=-20)))
+    upcoming = fake.add("BOOKED: Client", iso(now + timedelta(days=2)), iso(now + timedelta(days=2, minutes=20)))
+
+    async def scenario(mirror, db):
+        await mirror.sync_once()
+        ids = {doc['id'] for doc in await db.calendar_events.find({}).to_list(None)}
+        events = await mirror.list_events(iso(now + timedelta(days=1)), iso(now + timedelta(days=3)))
+        return ids, events, mirror.ready
+
+    ids, events, ready = run_with_mirror(fake, scenario)
+    assert ready
+    assert ids == {upcoming['id']}
+    assert old['id'] not in ids
+    assert [e['id'] for e in events] == [upcoming['id']]
+    full_request = next(params for method, path, params in fake.requests if method == 'GET' and path == EVENTS_PATH)
+    assert 'timeMin' in full_request and 'syncToken' not in full_request
+
+
+def test_incremental_sync_applies_inserts_and_cancellations(fake):
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=3)
+    first = fake.add("BOOKED: A", iso(start), iso(start + timedelta(minutes=20)))
+
+    async def scenario(mirror, db):
+        await mirror.sync_once()
+        fake.cancel(first['id'])
+        second = fake.add("BOOKED: B", iso(start + timedelta(hours=1)), iso(start + timedelta(hours=1, minutes=20)))
+        changed = await mirror.sync_once()
+        ids = {doc['id'] for doc in await db.calendar_events.find({}).to_list(None)}
+        return second, changed, ids
+
+    second, changed, ids = run_with_mirror(fake, scenario)
+    assert ids == {second['id']}
+    assert changed == {start.date().isoformat()}
+    assert any(params.get('syncToken') for method, path, params in fake.requests if method == 'GET')
+
+
+def test_expired_token_resyncs_and_sweeps_vanished_events(fake):
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=5)
+    kept = fake.add("BOOKED: Kept", iso(start), iso(start + timedelta(minutes=40)))
+    vanished = fake.add("BOOKED: Gone", iso(start + timedelta(hours=2)), iso(start + timedelta(hours=2, minutes=20)))
+
+    async def scenario(mirror, db):
+        await mirror.sync_once()
+        # Removed without a change entry, then the token expires (HTTP 410)
+        del fake.events[vanished['id']]
+        fake.expire_tokens()
+        changed = await mirror.sync_once()
+        ids = {doc['id'] for doc in await db.calendar_events.find({}).to_list(None)}
+        return changed, ids
+
+    changed, ids = run_with_mirror(fake, scenario)
+    assert ids == {kept['id']}
+    assert start.date().isoformat() in changed
+
+
+def test_ranges_before_the_window_fall_through_to_google(fake):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    past = fake.add("BOOKED: Past", iso(now - timedelta(days=10)), iso(now - timedelta(days=10, minutes=-20)))
+
+    async def scenario(mirror, db):
+        await mirror.sync_once()
+        return await mirror.list_events(iso(now - timedelta(days=11)), iso(now - timedelta(days=9)))
+
+    events = run_with_mirror(fake, scenario)
+    assert [e['id'] for e in events] == [past['id']]
+
+
+def test_opaque_windows_are_made_transparent_once(fake):
+    start = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=2)
+    window = fake.add("REGULAR_TIMING", iso(start), iso(start + timedelta(hours=3)))
+    booking = fake.add("BOOKED: Client", iso(start), iso(start + timedelta(minutes=20)))
+
+    async def scenario(mirror, db):
+        await mirror.sync_once()
+        converted = await mirror.make_windows_transparent()
+        again = await mirror.make_windows_transparent()
+        doc = await db.calendar_events.find_one({"id": window['id']})
+        return converted, again, doc
+
+    converted, again, doc = run_with_mirror(fake, scenario)
+    assert (converted, again) == (1, 0)
+    assert doc['transparency'] == 'transparent'
+    assert fake.events[window['id']]['transparency'] == 'transparent'
+    assert fake.events[booking['id']].get('transparency', 'opaque') == 'opaque'
@@ -0,0 +1,143 @@
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+import services.circuit_breaker as circuit_breaker_module
+from services.calendar_service import AsyncCalendarService, CalendarService
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from tests.fake_calendar import FakeCalendar
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker_module, "time", clock)
+    return clock
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures_only(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    fail(breaker, 2)
+    breaker.before_call()
+    breaker.record_success()
+    fail(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED and not breaker.is_open
+
+    fail(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN and breaker.is_open
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.name == "test" and error.value.retry_after == 20
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    fail(breaker, 1)
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN and not breaker.is_open
+
+    breaker.before_call()
+    # Everyone else is still turned away while the probe is out
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+    breaker.before_call()
+
+
+def test_failed_probe_restarts_the_timeout(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    fail(breaker, 2)
+    clock.now += 31
+    fail(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 1
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_released_probe_lets_the_next_caller_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    fail(breaker, 1)
+    clock.now += 30
+    breaker.before_call()
+    breaker.release_probe()
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def unused_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def test_calendar_client_stops_calling_a_dead_server_and_recovers(clock):
+    fake = FakeCalendar().start()
+
+    async def scenario():
+        client = AsyncCalendarService(CalendarService(), base_url=unused_url())
+        client.breaker = CircuitBreaker("google_calendar", failure_threshold=2, reset_timeout=30)
+        try:
+            for _ in range(2):
+                with pytest.raises(httpx.ConnectError):
+                    await client._request('GET', '/calendars/primary/events')
+            with pytest.raises(CircuitOpenError):
+                await client._request('GET', '/calendars/primary/events')
+
+            # The server comes back; after the timeout one probe goes out and closes the circuit
+            await client.aclose()
+            client.base_url = fake.url
+            clock.now += 30
+            await client._request('GET', '/calendars/primary/events')
+            return client.breaker.state
+        finally:
+            await client.aclose()
+
+    try:
+        assert asyncio.run(scenario()) == CircuitBreaker.CLOSED
+        assert len(fake.requests) == 1
+    finally:
+        fake.stop()
+
+
+def test_client_errors_do_not_count_against_the_circuit():
+    fake = FakeCalendar().start()
+
+    async def scenario():
+        client = AsyncCalendarService(CalendarService(), base_url=fake.url)
+        client.breaker = CircuitBreaker("google_calendar", failure_threshold=1, reset_timeout=30)
+        try:
+            for _ in range(3):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await client._request('GET', '/calendars/primary/events/missing')
+            return client.breaker.state
+        finally:
+            await client.aclose()
+
+    try:
+        assert asyncio.run(scenario()) == CircuitBreaker.CLOSED
+    finally:
+        fake.stop()
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from services.discounts import DiscountEngine, DiscountRule, as_utc
+from tests.test_pricing import EARLIER, LATER, NOW, campaign, offer, promotion
+
+
+def test_promotion_beats_offer_with_the_same_code():
+    engine = DiscountEngine.compile([promotion("SPRING", 10)], [offer("SPRING", 40)], [campaign(50)])
+    assert engine.best("live-20", "spring", NOW).source == "promotion"
+    # Once the promotion is used up the offer with that code applies
+    engine = DiscountEngine.compile([promotion("SPRING", 10, used=1, limit=1)], [offer("SPRING", 40)], [campaign(50)])
+    assert engine.best("live-20", " spring ", NOW).source == "offer"
+
+
+def test_offer_code_beats_a_larger_campaign():
+    engine = DiscountEngine.compile([], [offer("SPRING", 5)], [campaign(50)])
+    assert engine.best("live-20", "SPRING", NOW).source == "offer"
+
+
+def test_largest_campaign_applies_without_a_code():
+    engine = DiscountEngine.compile([], [], [campaign(10), campaign(25), campaign(40, expiry=EARLIER)])
+    rule = engine.best("live-20", None, NOW)
+    assert (rule.source, rule.value) == ("campaign", 25.0)
+    # An unknown code falls back to the campaign too
+    assert engine.best("live-20", "NOPE", NOW).value == 25.0
+    assert [r.value for r in engine.expired_automatic(NOW)] == [40.0]
+
+
+def test_equal_campaigns_prefer_the_newer_one():
+    older = campaign(20, id="older", created_at=EARLIER)
+    newer = campaign(20, id="newer", created_at=NOW.isoformat())
+    assert DiscountEngine.compile([], [], [older, newer]).best("live-20", None, NOW).id == "newer"
+
+
+def test_exhausted_promotions_and_out_of_window_offers_are_ignored():
+    engine = DiscountEngine.compile(
+        [promotion("USED", 30, used=5, limit=5)],
+        [offer("OLD", 30, end=EARLIER), offer("SOON", 30, start=LATER, end=LATER)],
+        [campaign(10)],
+    )
+    for code in ("USED", "OLD", "SOON"):
+        rule = engine.best("live-20", code, NOW)
+        assert (code, rule.source) == (code, "campaign")
+    assert [rule.exhausted for rule in engine.code_rules("used")] == [True]
+
+
+def test_tiktok_live_gets_no_discount():
+    engine = DiscountEngine.compile([promotion("TEN", 10)], [], [campaign(25)])
+    assert engine.best("tiktok-live", "TEN", NOW) is None
+    assert engine.best("tiktok-live", None, NOW) is None
+
+
+def test_campaign_without_a_readable_expiry_counts_as_expired():
+    engine = DiscountEngine.compile([], [], [campaign(30, expiry="soon"), campaign(30, expiry=None)])
+    assert engine.best("live-20", None, NOW) is None
+
+
+def test_fixed_and_percentage_discounts():
+    assert DiscountRule.from_promotion(promotion("FIVE", 5, "fixed")).discount_on(40.0) == 5.0
+    assert DiscountRule.from_promotion(promotion("TEN", 10)).discount_on(40.0) == 4.0
+
+
+def test_stored_dates_are_read_as_utc():
+    naive = datetime(2030, 3, 4, 12, 0)
+    assert as_utc(naive) == as_utc("2030-03-04T12:00:00Z") == as_utc("2030-03-04T13:00:00+01:00") == NOW
+    assert as_utc(NOW + timedelta(hours=1)) > NOW
+    assert as_utc("not a date") is None and as_utc(None) is None
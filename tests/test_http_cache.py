@@ -0,0 +1,58 @@
+import pytest
+from fastapi import Request, Response
+
+from services.http_cache import CATALOG_CACHE_CONTROL, NO_CACHE, ResourceVersions, conditional, content_etag
+
+
+def request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/api/slots", "headers": headers})
+
+
+def test_first_request_gets_the_tag_and_the_body():
+    response = Response()
+    assert conditional(request(), response, 'W/"abc"', CATALOG_CACHE_CONTROL) is None
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.headers["cache-control"] == CATALOG_CACHE_CONTROL
+
+
+@pytest.mark.parametrize("if_none_match", ['W/"abc"', '"abc"', '"other", W/"abc"', "*"])
+def test_matching_if_none_match_gets_a_304(if_none_match):
+    not_modified = conditional(request(if_none_match), Response(), 'W/"abc"')
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == 'W/"abc"' and not_modified.headers["cache-control"] == NO_CACHE
+
+
+@pytest.mark.parametrize("if_none_match", ['W/"abd"', '"ab"', ""])
+def test_other_tags_get_the_body(if_none_match):
+    assert conditional(request(if_none_match), Response(), 'W/"abc"') is None
+
+
+def test_304_keeps_the_stale_marker():
+    response = Response(headers={"X-Data-Stale": "calendar"})
+    not_modified = conditional(request('W/"abc"'), response, 'W/"abc"')
+    assert not_modified.headers["x-data-stale"] == "calendar"
+
+
+def test_versions_change_the_tag_only_for_bumped_keys():
+    versions = ResourceVersions()
+
+    def day(date):
+        return versions.etag("slots", date, versions.version(f"day:{date}"))
+
+    before = day("2030-03-04"), day("2030-03-05")
+    versions.bump_days({"2030-03-04", None})
+    after = day("2030-03-04"), day("2030-03-05")
+    assert after[0] != before[0] and after[1] == before[1]
+    assert after[0].startswith('W/"')
+
+
+def test_tags_from_another_process_never_match():
+    assert ResourceVersions().etag("services", 0) != ResourceVersions().etag("services", 0)
+
+
+def test_content_etag_follows_the_data():
+    assert content_etag({"b": 1, "a": [1, 2]}) == content_etag({"a": [1, 2], "b": 1})
+    assert content_etag({"a": 1}) != content_etag({"a": 2})
+    assert content_etag(None) != content_etag([])
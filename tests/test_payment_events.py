@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock_motor
+
+from services.payment_events import PaymentEvents
+
+EVENT = {
+    "id": "WH-1",
+    "event_type": "PAYMENT.SALE.COMPLETED",
+    "resource": {"id": "SALE-1", "parent_payment": "PAYID-1", "state": "completed",
+                 "amount": {"total": "25.00", "currency": "USD"}},
+}
+
+
+def run(scenario):
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient()['payment_events_test']
+        events = PaymentEvents(db, lease=10)
+        await events.ensure_indexes()
+        return await scenario(events, db)
+    return asyncio.run(main())
+
+
+def test_redelivery_is_recorded_once():
+    async def scenario(events, db):
+        return await events.record(EVENT), await events.record(EVENT), await db.payment_events.count_documents({})
+
+    assert run(scenario) == (True, False, 1)
+
+
+def stored(db):
+    # claim() returns the event as it was before the claim
+    return db.payment_events.find_one({"event_id": "WH-1"}, {"_id": 0, "status": 1, "attempts": 1})
+
+
+def test_claim_runs_an_event_once_at_a_time():
+    async def scenario(events, db):
+        await events.record(EVENT)
+        await events.claim("WH-1")
+        first = await stored(db)
+        await events.claim("WH-1")
+        return first, await stored(db)
+
+    first, second = run(scenario)
+    assert first == {"status": "processing", "attempts": 1}
+    assert second == first
+
+
+def test_failed_events_are_claimed_again_but_processed_ones_are_not():
+    async def scenario(events, db):
+        await events.record(EVENT)
+        await events.claim("WH-1")
+        await events.finish("WH-1", "failed", error="boom")
+        await events.claim("WH-1")
+        retried = await stored(db)
+        await events.finish("WH-1", "processed")
+        await events.claim("WH-1")
+        return retried, await stored(db)
+
+    retried, after_processed = run(scenario)
+    assert retried == {"status": "processing", "attempts": 2}
+    assert after_processed == {"status": "processed", "attempts": 2}
+
+
+def test_stale_processing_claim_is_taken_over():
+    async def scenario(events, db):
+        await events.record(EVENT)
+        await events.claim("WH-1")
+        # A claim well inside the lease is left alone
+        await events.claim("WH-1")
+        fresh = await stored(db)
+        # The worker holding the claim died 11 minutes ago
+        stale = datetime.now(timezone.utc) - timedelta(minutes=11)
+        await db.payment_events.update_one({"event_id": "WH-1"}, {"$set": {"processing_since": stale}})
+        await events.claim("WH-1")
+        return fresh, await stored(db)
+
+    fresh, reclaimed = run(scenario)
+    assert fresh == {"status": "processing", "attempts": 1}
+    assert reclaimed == {"status": "processing", "attempts": 2}
+
+
+def test_completed_payment_and_payment_info():
+    async def scenario(events, db):
+        await events.record(EVENT)
+        return await events.completed_payment("PAYID-1"), await events.completed_payment(None)
+
+    completed, missing = run(scenario)
+    assert missing is None
+    assert PaymentEvents.payment_info(completed) == {
+        'success': True,
+        'payment_status': 'approved',
+        'transaction_id': 'PAYID-1',
+        'amount': 25.0,
+        'currency': 'USD',
+    }
+
+
+def test_retryable_lists_failed_unrun_and_stale_events_with_attempts_left():
+    async def scenario(events, db):
+        for event_id in ("WH-failed", "WH-done", "WH-stale", "WH-busy", "WH-new", "WH-exhausted"):
+            await events.record({**EVENT, "id": event_id})
+        for event_id in ("WH-failed", "WH-done", "WH-stale", "WH-busy", "WH-exhausted"):
+            await events.claim(event_id)
+        await events.finish("WH-failed", "failed", error="boom")
+        await events.finish("WH-done", "processed")
+        await events.finish("WH-exhausted", "failed", error="boom")
+        await db.payment_events.update_one({"event_id": "WH-exhausted"}, {"$set": {"attempts": 3}})
+        stale = datetime.now(timezone.utc) - timedelta(minutes=11)
+        await db.payment_events.update_one({"event_id": "WH-stale"}, {"$set": {"processing_since": stale}})
+        return await events.retryable(max_attempts=3)
+
+    assert sorted(run(scenario)) == ["WH-failed", "WH-new", "WH-stale"]
@@ -0,0 +1,180 @@
+import asyncio
+
+import httpx
+import pytest
+
+import services.payment_service as payment_service_module
+from services.payment_service import AsyncPayPalClient, PaymentService, PayPalError
+from tests.fake_paypal import PAYMENTS_PATH, TOKEN_PATH, VERIFY_WEBHOOK_PATH, FakePayPal
+
+WEBHOOK_HEADERS = {
+    "paypal-auth-algo": "SHA256withRSA",
+    "paypal-cert-url": "https://api.paypal.com/cert.pem",
+    "paypal-transmission-id": "TX-1",
+    "paypal-transmission-sig": "sig",
+    "paypal-transmission-time": "2030-03-04T12:00:00Z",
+}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(payment_service_module, "PAYPAL_RETRY_BACKOFF", 0)
+    server = FakePayPal().start()
+    yield server
+    server.stop()
+
+
+def run(fake, scenario, **kwargs):
+    async def main():
+        client = AsyncPayPalClient(base_url=fake.url, client_id=fake.client_id, client_secret=fake.client_secret, **kwargs)
+        try:
+            return await scenario(client)
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_token_is_fetched_once_and_shared_by_concurrent_calls(fake):
+    payment = fake.route('POST', PAYMENTS_PATH, {"intent": "sale"})[1]
+
+    async def scenario(client):
+        await asyncio.gather(*(client.request('GET', f"{PAYMENTS_PATH}/{payment['id']}") for _ in range(5)))
+        await client.request('GET', f"{PAYMENTS_PATH}/{payment['id']}")
+
+    run(fake, scenario)
+    assert len(fake.calls('POST', TOKEN_PATH)) == 1
+    assert len(fake.calls('GET', f"{PAYMENTS_PATH}/{payment['id']}")) == 6
+
+
+def test_token_is_refreshed_before_it_expires(fake):
+    # Shorter than the refresh margin: the token is kept for half its lifetime
+    fake.expires_in = 0.4
+
+    async def scenario(client):
+        await client.request('POST', PAYMENTS_PATH, json={})
+        await client.request('POST', PAYMENTS_PATH, json={})
+        await asyncio.sleep(0.25)
+        await client.request('POST', PAYMENTS_PATH, json={})
+
+    run(fake, scenario)
+    assert len(fake.calls('POST', TOKEN_PATH)) == 2
+
+
+def test_rejected_token_is_refreshed_once_and_the_call_resent(fake):
+    async def scenario(client):
+        await client.request('POST', PAYMENTS_PATH, json={})
+        fake.revoke_tokens()
+        return await client.request('POST', PAYMENTS_PATH, json={})
+
+    payment = run(fake, scenario)
+    assert payment["id"] == "PAYID-2"
+    assert len(fake.calls('POST', TOKEN_PATH)) == 2
+    # One rejected call, then the resend with the new token
+    assert len(fake.calls('POST', PAYMENTS_PATH)) == 3
+
+
+def test_second_401_is_raised_instead_of_refreshing_forever(fake):
+    async def scenario(client):
+        await client.request('POST', PAYMENTS_PATH, json={})
+        fake.fail(PAYMENTS_PATH, 401, 401, 401)
+        with pytest.raises(PayPalError) as error:
+            await client.request('POST', PAYMENTS_PATH, json={})
+        return error.value.status_code
+
+    assert run(fake, scenario) == 401
+    assert len(fake.calls('POST', TOKEN_PATH)) == 2
+
+
+def test_gets_are_retried_on_server_errors_and_dropped_connections(fake):
+    payment = fake.route('POST', PAYMENTS_PATH, {"intent": "sale"})[1]
+    path = f"{PAYMENTS_PATH}/{payment['id']}"
+    fake.fail(path, 503, None)
+
+    async def scenario(client):
+        return await client.request('GET', path)
+
+    assert run(fake, scenario)["id"] == payment["id"]
+    assert len(fake.calls('GET', path)) == 3
+
+
+def test_retries_stop_after_max_retries(fake):
+    fake.fail(PAYMENTS_PATH + "/PAYID-9", 503, 503, 503)
+
+    async def scenario(client):
+        with pytest.raises(PayPalError) as error:
+            await client.request('GET', PAYMENTS_PATH + "/PAYID-9")
+        return error.value.status_code
+
+    assert run(fake, scenario, max_retries=2) == 503
+    assert len(fake.calls('GET', PAYMENTS_PATH + "/PAYID-9")) == 3
+
+
+def test_posts_without_a_request_id_are_sent_once(fake):
+    fake.fail(PAYMENTS_PATH, 503)
+
+    async def scenario(client):
+        with pytest.raises(PayPalError):
+            await client.request('POST', PAYMENTS_PATH, json={})
+        fake.fail(PAYMENTS_PATH, None)
+        with pytest.raises(httpx.TransportError):
+            await client.request('POST', PAYMENTS_PATH, json={})
+
+    run(fake, scenario)
+    assert len(fake.calls('POST', PAYMENTS_PATH)) == 2
+    assert fake.payments == {}
+
+
+def test_posts_with_a_request_id_are_retried_and_deduplicated(fake):
+    fake.fail(PAYMENTS_PATH, 503, 429)
+
+    async def scenario(client):
+        first = await client.request('POST', PAYMENTS_PATH, json={}, request_id="create-B1")
+        again = await client.request('POST', PAYMENTS_PATH, json={}, request_id="create-B1")
+        return first, again
+
+    first, again = run(fake, scenario)
+    assert first["id"] == again["id"]
+    assert len(fake.payments) == 1
+    sent = fake.calls('POST', PAYMENTS_PATH)
+    assert len(sent) == 4
+    assert {headers["PayPal-Request-Id"] for headers in sent} == {"create-B1"}
+
+
+def test_create_and_verify_payment_against_the_stand_in(fake):
+    async def scenario(client):
+        service = PaymentService(client)
+        created = await service.create_paypal_payment(25.0, "USD", {"booking_id": "B1", "service_type": "live", "tax_amount": 2.0})
+        fake.approve(created["payment_id"])
+        verified = await service.verify_paypal_payment(created["payment_id"])
+        repeated = await service.verify_paypal_payment(created["payment_id"])
+        return created, verified, repeated
+
+    created, verified, repeated = run(fake, scenario)
+    assert created["success"] and created["approval_url"].endswith(created["payment_id"])
+    assert verified == repeated == {
+        "success": True, "payment_status": "approved", "transaction_id": created["payment_id"],
+        "amount": 25.0, "currency": "USD"
+    }
+    # The repeat verification sees the approved payment and does not execute it again
+    assert len(fake.calls('POST', f"{PAYMENTS_PATH}/{created['payment_id']}/execute")) == 1
+
+
+def test_verify_webhook(fake, monkeypatch):
+    fake.valid_signatures.add("TX-1")
+    event = {"id": "WH-1", "event_type": "PAYMENT.SALE.COMPLETED"}
+
+    async def scenario(client):
+        service = PaymentService(client)
+        signed = await service.verify_webhook(WEBHOOK_HEADERS, event)
+        forged = await service.verify_webhook({**WEBHOOK_HEADERS, "paypal-transmission-id": "TX-2"}, event)
+        fake.fail(VERIFY_WEBHOOK_PATH, 500)
+        unreachable = await service.verify_webhook(WEBHOOK_HEADERS, event)
+        monkeypatch.setattr(payment_service_module, "PAYPAL_WEBHOOK_ID", "")
+        unconfigured = await service.verify_webhook(WEBHOOK_HEADERS, event)
+        return signed, forged, unreachable, unconfigured
+
+    monkeypatch.setattr(payment_service_module, "PAYPAL_WEBHOOK_ID", "WEBHOOK-1")
+    assert run(fake, scenario) == (True, False, False, False)
+    sent = fake.calls('POST', VERIFY_WEBHOOK_PATH)
+    # Signature checks are not idempotent calls, so the 500 is not retried
+    assert len(sent) == 3
@@ -0,0 +1,191 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock_motor
+
+from services.payment_events import PaymentEvents
+from services.post_payment import PostPayment
+
+EVENT = {
+    "id": "WH-1",
+    "event_type": "PAYMENT.SALE.COMPLETED",
+    "resource": {"id": "SALE-1", "parent_payment": "PAYID-1", "state": "completed",
+                 "amount": {"total": "25.00", "currency": "USD"}},
+}
+PAYMENT_INFO = {"success": True, "payment_status": "approved", "transaction_id": "PAYID-1", "amount": 25.0, "currency": "USD"}
+
+
+class Steps:
+    """Records calls; `failures[name]` makes that step fail (False) that many times."""
+
+    def __init__(self, failures=None, errors=None, delay=0):
+        self.failures = dict(failures or {})
+        self.errors = dict(errors or {})
+        self.delay = delay
+        self.calls = []
+
+    def step(self, name):
+        async def run(booking):
+            self.calls.append((name, list(booking["post_payment_pending"])))
+            await asyncio.sleep(self.delay)
+            if self.errors.get(name):
+                self.errors[name] -= 1
+                raise AttributeError("'NoneType' object has no attribute 'get'")
+            if self.failures.get(name):
+                self.failures[name] -= 1
+                return False
+            return True
+        return run
+
+    def pairs(self):
+        return [(name, self.step(name)) for name in ("calendar", "zoom", "client_email", "admin_email")]
+
+    def ran(self, name):
+        return sum(1 for called, _ in self.calls if called == name)
+
+
+def run(steps, scenario):
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient()['post_payment_test']
+        events = PaymentEvents(db)
+        post_payment = PostPayment(db, events, steps.pairs(), max_attempts=3)
+        await events.ensure_indexes()
+        await post_payment.ensure_indexes()
+        await db.bookings.insert_one({"booking_id": "B1", "payment_id": "PAYID-1", "payment_status": "pending", "status": "pending"})
+        return await scenario(post_payment, events, db)
+    return asyncio.run(main())
+
+
+async def booking_state(db):
+    return await db.bookings.find_one(
+        {"booking_id": "B1"}, {"_id": 0, "payment_status": 1, "post_payment_pending": 1, "payment_info": 1}
+    )
+
+
+async def event_status(db):
+    return (await db.payment_events.find_one({"event_id": "WH-1"}))["status"]
+
+
+def test_calendar_write_failing_once_is_retried_by_the_sweeper():
+    steps = Steps(failures={"calendar": 1})
+
+    async def scenario(post_payment, events, db):
+        await events.record(EVENT)
+        await post_payment.process_event("WH-1")
+        after_webhook = await booking_state(db), await event_status(db)
+        retried = await post_payment.sweep_once()
+        return after_webhook, retried, await booking_state(db), await event_status(db)
+
+    (booking, status), retried, final, final_status = run(steps, scenario)
+    assert booking["payment_status"] == "paid"
+    assert booking["payment_info"] == PAYMENT_INFO
+    assert booking["post_payment_pending"] == ["calendar"]
+    assert status == "failed"
+    assert retried == 1
+    assert final["post_payment_pending"] == []
+    assert final_status == "processed"
+    # The steps that had finished are not run again
+    assert (steps.ran("calendar"), steps.ran("zoom"), steps.ran("client_email"), steps.ran("admin_email")) == (2, 1, 1, 1)
+
+
+def test_raising_step_stays_pending_and_later_steps_still_run():
+    steps = Steps(errors={"calendar": 1})
+
+    async def scenario(post_payment, events, db):
+        await post_payment.mark_paid({"booking_id": "B1"}, PAYMENT_INFO)
+        first = await post_payment.run_steps("B1")
+        pending = (await booking_state(db))["post_payment_pending"]
+        second = await post_payment.run_steps("B1")
+        return first, pending, second
+
+    first, pending, second = run(steps, scenario)
+    assert (first, pending, second) == (False, ["calendar"], True)
+
+
+def test_each_step_sees_what_is_still_pending():
+    steps = Steps(failures={"zoom": 1})
+
+    async def scenario(post_payment, events, db):
+        await post_payment.mark_paid({"booking_id": "B1"}, PAYMENT_INFO)
+        await post_payment.run_steps("B1")
+        await post_payment.run_steps("B1")
+
+    run(steps, scenario)
+    client_email_views = [pending for name, pending in steps.calls if name == "client_email"]
+    assert client_email_views == [["zoom", "client_email", "admin_email"]]
+    assert ("client_email", ["client_email", "admin_email"]) not in steps.calls
+
+
+def test_crash_after_the_paid_flip_is_resumed_once_the_lease_expires():
+    steps = Steps()
+
+    async def scenario(post_payment, events, db):
+        assert await post_payment.mark_paid({"booking_id": "B1"}, PAYMENT_INFO)
+        assert not await post_payment.mark_paid({"booking_id": "B1"}, PAYMENT_INFO)
+        # A worker took the lease and died before running anything
+        await db.bookings.update_one({"booking_id": "B1"}, {"$set": {"post_payment_since": datetime.now(timezone.utc)}})
+        while_leased = await post_payment.sweep_once()
+        expired = datetime.now(timezone.utc) - timedelta(minutes=11)
+        await db.bookings.update_one({"booking_id": "B1"}, {"$set": {"post_payment_since": expired}})
+        after_expiry = await post_payment.sweep_once()
+        return while_leased, after_expiry, await booking_state(db)
+
+    while_leased, after_expiry, booking = run(steps, scenario)
+    assert (while_leased, after_expiry) == (0, 1)
+    assert booking["post_payment_pending"] == []
+
+
+def test_concurrent_runs_execute_each_step_once():
+    steps = Steps(delay=0.01)
+
+    async def scenario(post_payment, events, db):
+        await post_payment.mark_paid({"booking_id": "B1"}, PAYMENT_INFO)
+        return await asyncio.gather(post_payment.run_steps("B1"), post_payment.run_steps("B1"))
+
+    results = run(steps, scenario)
+    assert sorted(results) == [False, True]
+    assert [name for name, _ in steps.calls] == ["calendar", "zoom", "client_email", "admin_email"]
+
+
+def test_inline_subset_leaves_the_rest_for_a_later_run():
+    steps = Steps()
+
+    async def scenario(post_payment, events, db):
+        await post_payment.mark_paid({"booking_id": "B1"}, PAYMENT_INFO)
+        inline = await post_payment.run_steps("B1", names=("calendar", "zoom"))
+        return inline, (await booking_state(db))["post_payment_pending"]
+
+    assert run(steps, scenario) == (True, ["client_email", "admin_email"])
+
+
+def test_sweeper_gives_up_after_max_attempts():
+    steps = Steps(failures={"calendar": 10})
+
+    async def scenario(post_payment, events, db):
+        await events.record(EVENT)
+        await post_payment.process_event("WH-1")
+        for _ in range(5):
+            await post_payment.sweep_once()
+        event = await db.payment_events.find_one({"event_id": "WH-1"})
+        return event["attempts"], steps.ran("calendar")
+
+    attempts, calendar_runs = run(steps, scenario)
+    assert attempts == 3
+    assert calendar_runs <= 6
+
+
+def test_events_for_other_types_or_unknown_payments_are_ignored():
+    steps = Steps()
+
+    async def scenario(post_payment, events, db):
+        await events.record({**EVENT, "id": "WH-refund", "event_type": "PAYMENT.SALE.REFUNDED"})
+        await events.record({**EVENT, "id": "WH-other", "resource": {**EVENT["resource"], "parent_payment": "PAYID-X"}})
+        await post_payment.process_event("WH-refund")
+        await post_payment.process_event("WH-other")
+        statuses = {doc["event_id"]: doc["status"] for doc in await db.payment_events.find({}).to_list(None)}
+        return statuses, (await booking_state(db))["payment_status"]
+
+    statuses, payment_status = run(steps, scenario)
+    assert statuses == {"WH-refund": "ignored", "WH-other": "ignored"}
+    assert payment_status == "pending"
+    assert steps.calls == []
@@ -0,0 +1,191 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock_motor
+import pytest
+
+import services.pricing as pricing_module
+from services.pricing import Pricing, PricingSnapshot
+
+NOW = datetime(2030, 3, 4, 12, 0, tzinfo=timezone.utc)
+LATER = (NOW + timedelta(days=7)).isoformat()
+EARLIER = (NOW - timedelta(days=7)).isoformat()
+
+SERVICES = [
+    {"key": "live-20", "amount": 45.0, "currency": "EUR", "name": "Live 20"},
+    {"key": "delivered-3", "amount": 19.99, "currency": "EUR", "name": "Delivered 3"},
+    {"key": "tiktok-live", "amount": 15.0, "currency": "EUR", "name": "TikTok Live"},
+]
+TAX = {"name": "VAT", "percentage": 21.0, "is_active": True}
+
+
+def promotion(code, value, discount_type="percentage", used=0, limit=100, **fields):
+    return {"id": f"promo-{code}-{value}", "code": code, "discount_type": discount_type, "discount_value": value,
+            "used_count": used, "usage_limit": limit, "is_active": True, "created_at": EARLIER, **fields}
+
+
+def offer(code, percent, start=EARLIER, end=LATER, **fields):
+    return {"id": f"offer-{code}-{percent}", "code": code, "type": "promo", "text": code, "discount_percent": percent,
+            "start_date": start, "end_date": end, "is_active": True, "created_at": EARLIER, **fields}
+
+
+def campaign(percent, expiry=LATER, **fields):
+    return {"id": f"campaign-{percent}-{expiry}", "discount_percentage": percent, "expiry_date": expiry,
+            "is_active": True, "created_at": EARLIER, **fields}
+
+
+def old_inline_total(base_amount, promo=None, campaign_pct=None, tax_pct=None, is_emergency=False):
+    """create_booking's calculation before the pricing snapshot, for parity checks."""
+    final_amount = base_amount
+    if promo:
+        if promo["discount_type"] == "percentage":
+            final_amount -= (float(promo["discount_value"]) / 100.0) * final_amount
+        else:
+            final_amount -= float(promo["discount_value"])
+    elif campaign_pct:
+        final_amount -= (float(campaign_pct) / 100.0) * final_amount
+    if final_amount < 0:
+        final_amount = 0.0
+    final_amount = round(final_amount, 2)
+    if tax_pct is not None:
+        tax_amount = round(final_amount * (tax_pct / 100), 2)
+        final_amount = round(final_amount + tax_amount, 2)
+    if is_emergency:
+        final_amount = round(final_amount * 1.30, 2)
+    return final_amount
+
+
+@pytest.mark.parametrize("service", SERVICES[:2], ids=lambda s: s["key"])
+@pytest.mark.parametrize("promo", [None, promotion("TEN", 10), promotion("FIVE", 5, "fixed"), promotion("ALL", 50, "fixed")],
+                         ids=["no-code", "percent", "fixed", "over-price"])
+@pytest.mark.parametrize("campaign_pct", [None, 15])
+@pytest.mark.parametrize("tax", [None, TAX], ids=["untaxed", "taxed"])
+@pytest.mark.parametrize("is_emergency", [False, True], ids=["regular", "emergency"])
+def test_quote_matches_the_old_inline_calculation(service, promo, campaign_pct, tax, is_emergency):
+    campaigns = [campaign(campaign_pct)] if campaign_pct else []
+    pricing = Pricing(1, SERVICES, [promo] if promo else [], campaigns, [], tax)
+
+    quote = pricing.quote(service["key"], promo["code"] if promo else None, is_emergency, now=NOW)
+
+    expected = old_inline_total(service["amount"], promo, campaign_pct, tax["percentage"] if tax else None, is_emergency)
+    assert quote["total"] == expected
+    assert quote["promo_code"] == (promo["code"] if promo else None)
+    assert quote["campaign_percentage"] == (0 if promo or not campaign_pct else campaign_pct)
+
+
+def test_quote_breaks_down_discount_then_tax_then_surcharge():
+    pricing = Pricing(1, SERVICES, [promotion("TEN", 10)], [], [], TAX)
+    quote = pricing.quote("live-20", "ten", is_emergency=True, now=NOW)
+    assert (quote["base_amount"], quote["discount_amount"], quote["subtotal"]) == (45.0, 4.5, 40.5)
+    assert (quote["tax_amount"], quote["emergency_surcharge"], quote["total"]) == (8.5, 14.7, 63.7)
+    assert quote["discount_source"] == "promotion"
+
+
+def test_unknown_service_uses_the_fallback_or_raises():
+    pricing = Pricing(1, SERVICES, [], [], [], None)
+    fallback = {"aura": {"amount": 30.0, "currency": "EUR", "name": "Aura"}}
+    assert pricing.quote("aura", fallback=fallback, now=NOW)["total"] == 30.0
+    with pytest.raises(ValueError):
+        pricing.quote("aura", now=NOW)
+
+
+def test_inactive_rules_are_not_loaded():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()['pricing_test']
+        await db.services.insert_many([dict(s) for s in SERVICES])
+        await db.promotions.insert_one(promotion("OFF", 30, is_active=False))
+        await db.offers.insert_one(offer("OFF", 30, is_active=False))
+        await db.campaigns.insert_one(campaign(20, is_active=False))
+        pricing = await PricingSnapshot(db).get()
+        return pricing.quote("live-20", "OFF", now=NOW)
+
+    quote = asyncio.run(scenario())
+    assert (quote["discount_source"], quote["total"]) == (None, 45.0)
+
+
+def test_tiktok_live_gets_no_discount():
+    pricing = Pricing(1, SERVICES, [promotion("TEN", 10)], [campaign(25)], [offer("SPRING", 20)], TAX)
+    for code in (None, "TEN", "SPRING"):
+        quote = pricing.quote("tiktok-live", code, now=NOW)
+        assert (quote["discount_amount"], quote["promo_code"], quote["subtotal"]) == (0.0, None, 15.0)
+
+
+def test_quote_all_is_cached_until_the_applicable_rules_change():
+    pricing = Pricing(1, SERVICES, [promotion("TEN", 10)], [campaign(20, expiry=(NOW + timedelta(hours=1)).isoformat())], [], TAX)
+
+    first = pricing.quote_all(now=NOW)
+    assert pricing.quote_all(now=NOW + timedelta(minutes=30)) is first
+    # An entered code is another rule set; the same code typed differently is not
+    with_code = pricing.quote_all("ten", now=NOW)
+    assert with_code is not first and pricing.quote_all("TEN", now=NOW) is with_code
+    assert with_code["live-20"]["promo_code"] == "TEN"
+    # The campaign expires: the rule ids change, so the quotes are recomputed
+    after_expiry = pricing.quote_all(now=NOW + timedelta(hours=2))
+    assert after_expiry is not first
+    assert first["live-20"]["subtotal"] == 36.0 and after_expiry["live-20"]["subtotal"] == 45.0
+    assert after_expiry["live-20"]["emergency_total"] == pricing.quote("live-20", is_emergency=True, now=NOW + timedelta(hours=2))["total"]
+
+
+def test_quote_all_covers_the_catalog_and_fallback_services():
+    pricing = Pricing(1, SERVICES, [], [campaign(10)], [], TAX)
+    fallback = {"aura": {"amount": 30.0, "currency": "EUR", "name": "Aura"}, "live-20": {"amount": 99.0, "currency": "EUR"}}
+
+    quotes = pricing.quote_all(fallback=fallback, now=NOW)
+
+    assert sorted(quotes) == ["aura", "delivered-3", "live-20", "tiktok-live"]
+    # A stored service wins over the fallback price
+    assert quotes["live-20"]["base_amount"] == 45.0 and quotes["aura"]["base_amount"] == 30.0
+    for key, quote in quotes.items():
+        emergency = pricing.quote(key, is_emergency=True, fallback=fallback, now=NOW)
+        assert quote["total"] == pricing.quote(key, fallback=fallback, now=NOW)["total"]
+        assert (quote["emergency_total"], quote["emergency_surcharge"]) == (emergency["total"], emergency["emergency_surcharge"])
+
+
+def test_quote_all_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(pricing_module, "QUOTE_CACHE_SIZE", 2)
+    pricing = Pricing(1, SERVICES, [promotion("A", 10), promotion("B", 20), promotion("C", 30)], [], [], None)
+    for code in ("A", "B", "C"):
+        pricing.quote_all(code, now=NOW)
+    assert len(pricing._quote_cache) == 1
+    assert pricing.quote_all("C", now=NOW)["live-20"]["discount_amount"] == 13.5
+
+
+def test_snapshot_reloads_after_invalidate():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()['pricing_test']
+        await db.services.insert_many([dict(s) for s in SERVICES])
+        snapshot = PricingSnapshot(db)
+        before = await snapshot.get()
+        await db.services.update_one({"key": "live-20"}, {"$set": {"amount": 50.0}})
+        cached = await snapshot.get()
+        snapshot.invalidate()
+        after = await snapshot.get()
+        return before, cached, after
+
+    before, cached, after = asyncio.run(scenario())
+    assert cached is before
+    assert after.quote("live-20", now=NOW)["total"] == 50.0
+
+
+def test_catalog_etags_change_when_a_reload_sees_new_data():
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()['pricing_test']
+        await db.services.insert_many([dict(s) for s in SERVICES])
+        await db.taxes.insert_one(dict(TAX))
+        # MAX_AGE of zero: every read reloads, as after the watcher or the age limit
+        snapshot = PricingSnapshot(db, max_age=0)
+        first = await snapshot.get()
+        unchanged = await snapshot.get()
+        # Edited straight in Mongo, without an API write bumping anything
+        await db.services.update_one({"key": "live-20"}, {"$set": {"amount": 50.0}})
+        edited = await snapshot.get()
+        await db.taxes.update_one({}, {"$set": {"percentage": 22.0}})
+        retaxed = await snapshot.get()
+        return first, unchanged, edited, retaxed
+
+    first, unchanged, edited, retaxed = asyncio.run(scenario())
+    assert unchanged is not first
+    assert (unchanged.services_etag, unchanged.tax_etag) == (first.services_etag, first.tax_etag)
+    assert edited.services_etag != first.services_etag and edited.tax_etag == first.tax_etag
+    assert retaxed.tax_etag != edited.tax_etag
+    assert [s["amount"] for s in edited.service_list if s["key"] == "live-20"] == [50.0]
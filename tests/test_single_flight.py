@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_computation():
+    calls = []
+
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def compute(key):
+            calls.append(key)
+            await release.wait()
+            return {"key": key}
+
+        waiters = [asyncio.create_task(flight.do(key, lambda key=key: compute(key))) for key in ("a", "a", "a", "b")]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        # Finished flights are not cached: the next call computes again
+        again = await flight.do("a", lambda: compute("a"))
+        return results, again
+
+    results, again = asyncio.run(scenario())
+    assert results == [{"key": "a"}] * 3 + [{"key": "b"}]
+    assert results[0] is results[1] is results[2]
+    assert again == {"key": "a"} and again is not results[0]
+    assert calls == ["a", "b", "a"]
+
+
+def test_exception_reaches_every_waiter_and_is_not_kept():
+    attempts = []
+
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def compute():
+            attempts.append(1)
+            await release.wait()
+            if len(attempts) == 1:
+                raise ConnectionError("calendar down")
+            return "ok"
+
+        waiters = [asyncio.create_task(flight.do("day", compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        return results, await flight.do("day", compute)
+
+    results, retried = asyncio.run(scenario())
+    assert [type(r) for r in results] == [ConnectionError] * 3
+    assert results[0] is results[1] is results[2]
+    assert retried == "ok" and len(attempts) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return 42
+
+        leaving = asyncio.create_task(flight.do("k", compute))
+        staying = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        return await staying
+
+    assert asyncio.run(scenario()) == 42
@@ -0,0 +1,65 @@
+import pytest
+
+from services.slot_engine import free_slots, merge_intervals, overlapping, subtract_intervals
+from tests.benchmark_slot_engine import CASES, naive_free_slots, scenario
+
+
+def test_merge_coalesces_adjacent_and_nested_intervals():
+    assert merge_intervals([(30, 40), (0, 10), (10, 20)]) == [(0, 20), (30, 40)]
+    assert merge_intervals([(0, 100), (10, 20), (50, 60)]) == [(0, 100)]
+    assert merge_intervals([(0, 30), (20, 50)]) == [(0, 50)]
+
+
+def test_merge_drops_zero_length_and_inverted_intervals():
+    assert merge_intervals([(10, 10), (5, 0), (20, 30)]) == [(20, 30)]
+    assert merge_intervals([]) == []
+
+
+def test_overlapping_treats_intervals_as_half_open():
+    intervals = [(0, 10), (10, 20), (15, 25), (30, 40)]
+    assert overlapping((10, 20), intervals) == [(10, 20), (15, 25)]
+    assert overlapping((20, 30), intervals) == [(15, 25)]
+
+
+def test_subtract_intervals():
+    assert subtract_intervals((0, 100), []) == [(0, 100)]
+    assert subtract_intervals((0, 100), [(10, 20), (20, 30), (50, 60)]) == [(0, 10), (30, 50), (60, 100)]
+    assert subtract_intervals((0, 100), [(-10, 5), (95, 200)]) == [(5, 95)]
+    assert subtract_intervals((0, 100), [(0, 100)]) == []
+    assert subtract_intervals((0, 100), [(20, 80), (30, 40)]) == [(0, 20), (80, 100)]
+    assert subtract_intervals((0, 100), [(50, 50)]) == [(0, 100)]
+
+
+def test_free_slots_skips_busy_time_and_stays_on_the_grid():
+    windows = [(600, 720, 'regular')]
+    result = free_slots(windows, [(625, 630)], 20)
+    assert result[20] == [(600, 'regular'), (640, 'regular'), (660, 'regular'), (680, 'regular'), (700, 'regular')]
+
+
+def test_free_slots_edge_cases():
+    windows = [(600, 660, 'regular')]
+    # Busy blocks touching the slot edges do not block it
+    assert free_slots(windows, [(580, 600), (620, 640)], 20)[20] == [(600, 'regular'), (640, 'regular')]
+    # Zero-length busy blocks block nothing
+    assert free_slots(windows, [(610, 610)], 20)[20] == [(600, 'regular'), (620, 'regular'), (640, 'regular')]
+    # Non-positive durations yield no slots
+    assert free_slots(windows, [], [0, -20]) == {0: [], -20: []}
+    # A window shorter than the duration yields none
+    assert free_slots([(600, 610, 'regular')], [], 20)[20] == []
+
+
+def test_free_slots_deduplicates_starts_from_overlapping_windows():
+    # Windows are taken by (start, end): the shorter one wins a shared start
+    windows = [(600, 680, 'regular'), (600, 640, 'emergency'), (660, 720, 'emergency')]
+    assert free_slots(windows, [], 20)[20] == [
+        (600, 'emergency'), (620, 'emergency'), (640, 'regular'), (660, 'regular'), (680, 'emergency'), (700, 'emergency')
+    ]
+
+
+@pytest.mark.parametrize("label,n_windows,n_busy,durations", CASES)
+def test_free_slots_matches_the_old_nested_loop(label, n_windows, n_busy, durations):
+    for seed in range(5):
+        windows, busy = scenario(n_windows, n_busy, seed=seed)
+        result = free_slots(windows, busy, durations)
+        for duration in durations:
+            assert result[duration] == naive_free_slots(windows, busy, duration), (label, seed, duration)
@@ -0,0 +1,90 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import mongomock_motor
+
+from services.slot_holds import SlotHolds
+
+DATE = "2030-03-04"
+
+
+def run(scenario):
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient()['slot_holds_test']
+        holds = SlotHolds(db, ttl=1800)
+        await holds.ensure_indexes()
+        return await scenario(holds, db)
+    return asyncio.run(main())
+
+
+def test_same_start_is_claimed_once():
+    async def scenario(holds, db):
+        first = await holds.claim(DATE, 600, 20, "A")
+        second = await holds.claim(DATE, 600, 20, "B")
+        return first, second, await holds.active_for([DATE])
+
+    first, second, active = run(scenario)
+    assert (first, second) == (True, False)
+    assert active == {DATE: [(600, 620)]}
+
+
+def test_overlapping_durations_conflict_but_adjacent_slots_do_not():
+    async def scenario(holds, db):
+        return [
+            await holds.claim(DATE, 600, 40, "A"),   # 10:00-10:40
+            await holds.claim(DATE, 620, 20, "B"),   # inside A
+            await holds.claim(DATE, 580, 40, "C"),   # straddles A's start
+            await holds.claim(DATE, 640, 20, "D"),   # starts where A ends
+            await holds.claim(DATE, 560, 20, "E"),   # ends where C would have started
+        ]
+
+    assert run(scenario) == [True, False, False, True, True]
+
+
+def test_concurrent_claims_for_overlapping_slots_admit_one():
+    async def scenario(holds, db):
+        results = await asyncio.gather(*[
+            holds.claim(DATE, 600 + offset, 40, f"B{offset}") for offset in (0, 10, 20, 30)
+        ])
+        return results, await holds.active_for([DATE])
+
+    results, active = run(scenario)
+    assert sum(results) == 1
+    assert len(active[DATE]) == 1
+
+
+def test_expired_holds_do_not_block_and_are_pulled():
+    async def scenario(holds, db):
+        past = datetime.now(timezone.utc) - timedelta(minutes=1)
+        await holds.claim(DATE, 600, 20, "old", expires_at=past)
+        active_before = await holds.active_for([DATE])
+        claimed = await holds.claim(DATE, 600, 20, "new")
+        day = await db.slot_hold_days.find_one({"_id": DATE})
+        return active_before, claimed, [h["booking_id"] for h in day["holds"]]
+
+    active_before, claimed, booking_ids = run(scenario)
+    assert active_before == {}
+    assert claimed is True
+    assert booking_ids == ["new"]
+
+
+def test_confirm_extends_and_release_frees_the_slot():
+    async def scenario(holds, db):
+        await holds.claim(DATE, 600, 20, "A")
+        ends_at = datetime.now(timezone.utc) + timedelta(days=30)
+        confirmed = await holds.confirm("A", ends_at)
+        missing = await holds.confirm("nobody", ends_at)
+        released = await holds.release("A")
+        reclaimed = await holds.claim(DATE, 600, 20, "B")
+        return confirmed, missing, released, reclaimed
+
+    assert run(scenario) == (True, False, True, True)
+
+
+def test_lapsed_checkout_hold_cannot_be_confirmed():
+    async def scenario(holds, db):
+        past = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await holds.claim(DATE, 600, 20, "A", expires_at=past)
+        return await holds.confirm("A", datetime.now(timezone.utc) + timedelta(hours=1))
+
+    assert run(scenario) is False
@@ -0,0 +1,39 @@
+import asyncio
+
+import mongomock_motor
+
+from services import slot_inventory as slot_inventory_module
+from services.slot_inventory import SlotInventory
+
+
+def test_refresh_scheduled_during_a_refresh_writes_last(monkeypatch):
+    monkeypatch.setattr(slot_inventory_module, "REFRESH_DEBOUNCE", 0)
+
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient()['slot_inventory_test']
+        state = {"version": 1}
+        first_started = asyncio.Event()
+        release_first = asyncio.Event()
+
+        async def builder(date):
+            version = state["version"]
+            if version == 1:
+                first_started.set()
+                # The stale computation finishes after the newer one was scheduled
+                await release_first.wait()
+            return {("all", 20): [{"version": version}]}
+
+        inventory = SlotInventory(db, builder)
+        inventory.schedule({"2030-01-07"})
+        await first_started.wait()
+        state["version"] = 2
+        inventory.schedule({"2030-01-07"})
+        await asyncio.sleep(0.01)
+        release_first.set()
+        while inventory._tasks:
+            await asyncio.gather(*list(inventory._tasks))
+        return await inventory.get("2030-01-07", None, 20), inventory._locks
+
+    slots, locks = asyncio.run(main())
+    assert slots == [{"version": 2}]
+    assert locks == {}